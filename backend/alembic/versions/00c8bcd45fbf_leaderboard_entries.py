@@ -0,0 +1,77 @@
+"""leaderboard entries
+
+Revision ID: 00c8bcd45fbf
+Revises: c7a07f8ad086
+Create Date: 2026-10-16 12:41:52.906115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00c8bcd45fbf'
+down_revision: Union[str, Sequence[str], None] = 'c7a07f8ad086'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('leaderboard_entries',
+    sa.Column('test_id', sa.UUID(), nullable=False),
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('attempt_id', sa.UUID(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('accuracy', sa.Float(), nullable=False),
+    sa.Column('net_correct', sa.Integer(), nullable=False),
+    # Same type as attempts.submitted_at, so values copy across unchanged
+    sa.Column('submitted_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ),
+    sa.ForeignKeyConstraint(['attempt_id'], ['attempts.id'], ),
+    sa.PrimaryKeyConstraint('test_id', 'student_id')
+    )
+    op.create_index(
+        'ix_leaderboard_entries_rank',
+        'leaderboard_entries',
+        [
+            'test_id',
+            sa.text('score DESC'),
+            sa.text('accuracy DESC'),
+            sa.text('net_correct DESC'),
+            'submitted_at',
+            'student_id',
+        ],
+    )
+
+    # Backfill: best SCORED attempt per (test, student), DECISIONS.md §7
+    op.execute("""
+        INSERT INTO leaderboard_entries
+            (test_id, student_id, attempt_id, score, accuracy,
+             net_correct, submitted_at, updated_at)
+        SELECT test_id, student_id, attempt_id, score, accuracy,
+               net_correct, submitted_at, now()
+        FROM (
+            SELECT a.test_id, a.student_id, a.id AS attempt_id,
+                   s.score, s.accuracy, s.net_correct, a.submitted_at,
+                   row_number() OVER (
+                       PARTITION BY a.test_id, a.student_id
+                       ORDER BY s.score DESC, s.accuracy DESC,
+                                s.net_correct DESC, a.submitted_at ASC NULLS LAST
+                   ) AS rn
+            FROM attempts a
+            JOIN attempt_scores s ON s.attempt_id = a.id
+            WHERE a.status = 'SCORED'
+        ) ranked
+        WHERE rn = 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_leaderboard_entries_rank', table_name='leaderboard_entries')
+    op.drop_table('leaderboard_entries')
@@ -0,0 +1,69 @@
+"""student search indexes
+
+Revision ID: 019eb9190480
+Revises: ffa54d27c51b
+Create Date: 2026-10-16 14:48:10.773210
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '019eb9190480'
+down_revision: Union[str, Sequence[str], None] = 'ffa54d27c51b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = ['full_name', 'email', 'phone']
+
+log = logging.getLogger('alembic.runtime.migration')
+
+
+def _trgm_available(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).first() is not None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    if not _trgm_available(bind):
+        # Search still works, substring terms just scan students
+        log.warning(
+            'pg_trgm is not available: student search indexes not created'
+        )
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f'ix_students_{column}_trgm',
+                'students',
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS ix_students_{column}_trgm'
+            )
@@ -0,0 +1,83 @@
+"""student identity indexes
+
+Revision ID: 43154cc9498d
+Revises: 438070e37047
+Create Date: 2026-10-16 09:12:41.207318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '43154cc9498d'
+down_revision: Union[str, Sequence[str], None] = '438070e37047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _check_duplicates() -> None:
+    """Refuse to start while students share an email or phone.
+
+    A unique index built CONCURRENTLY over duplicates fails only at the
+    end, and leaves an INVALID index behind that still slows writes.
+    Duplicates have to be merged first (POST /api/students/{id}/merge).
+    """
+    bind = op.get_bind()
+    found = {}
+    for column in ('email', 'phone'):
+        found[column] = bind.execute(sa.text(
+            f'SELECT count(*) FROM ('
+            f'  SELECT {column} FROM students WHERE {column} IS NOT NULL'
+            f'  GROUP BY {column} HAVING count(*) > 1'
+            f') AS duplicated'
+        )).scalar()
+
+    if any(found.values()):
+        raise RuntimeError(
+            'students has duplicate identities, merge them before upgrading: '
+            + ', '.join(f'{n} {column}s' for column, n in found.items() if n)
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so a large students table stays writable.
+    # Stored values are already normalized by utils.normalize_email /
+    # normalize_phone at ingest time.
+    _check_duplicates()
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_students_email',
+            'students',
+            ['email'],
+            unique=True,
+            postgresql_where=sa.text('email IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'uq_students_phone',
+            'students',
+            ['phone'],
+            unique=True,
+            postgresql_where=sa.text('phone IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'uq_students_phone',
+            table_name='students',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'uq_students_email',
+            table_name='students',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,57 @@
+"""ingest jobs
+
+Revision ID: 5b2e8d1c7a94
+Revises: 019eb9190480
+Create Date: 2026-10-16 15:20:37.418862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8d1c7a94'
+down_revision: Union[str, Sequence[str], None] = '019eb9190480'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingest_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('chunk_size', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('summary', sa.JSON(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('worker_id', sa.String(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_ingest_jobs_status_created',
+        'ingest_jobs',
+        ['status', 'created_at'],
+    )
+    op.create_table('ingest_job_chunks',
+    sa.Column('job_id', sa.UUID(), nullable=False),
+    sa.Column('offset', sa.Integer(), nullable=False),
+    sa.Column('results', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['ingest_jobs.id'], ),
+    sa.PrimaryKeyConstraint('job_id', 'offset')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ingest_job_chunks')
+    op.drop_index('ix_ingest_jobs_status_created', table_name='ingest_jobs')
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,153 @@
+"""attempt payloads
+
+Revision ID: 77f16df42555
+Revises: b7d3a9e5f120
+Create Date: 2026-10-17 09:12:31.604417
+
+"""
+import json
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77f16df42555'
+down_revision: Union[str, Sequence[str], None] = 'b7d3a9e5f120'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same format as payloads.py at the time of this revision
+ENCODING = 'zlib-json-1'
+BATCH = 1000
+
+attempts = sa.table(
+    'attempts',
+    sa.column('id', sa.UUID()),
+    sa.column('test_id', sa.UUID()),
+    sa.column('answers', sa.JSON()),
+    sa.column('raw_payload', sa.JSON()),
+)
+tests = sa.table(
+    'tests',
+    sa.column('id', sa.UUID()),
+    sa.column('name', sa.String()),
+    sa.column('max_marks', sa.Integer()),
+    sa.column('negative_marking', sa.JSON()),
+    sa.column('answer_key', sa.JSON()),
+    sa.column('version', sa.Integer()),
+)
+attempt_payloads = sa.table(
+    'attempt_payloads',
+    sa.column('attempt_id', sa.UUID()),
+    sa.column('test_version', sa.Integer()),
+    sa.column('encoding', sa.String()),
+    sa.column('data', sa.LargeBinary()),
+)
+
+
+def _batches(conn, stmt, id_column):
+    last = None
+    while True:
+        page = stmt if last is None else stmt.where(id_column > last)
+        rows = conn.execute(page.order_by(id_column).limit(BATCH)).all()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def _compact(row):
+    doc = {k: v for k, v in row.raw_payload.items() if k not in ('test', 'answers')}
+    definition = row.raw_payload.get('test') or {}
+
+    same = (
+        definition.get('max_marks') == row.max_marks
+        and definition.get('negative_marking') == row.negative_marking
+        and (definition.get('answer_key') or {}) == (row.answer_key or {})
+    )
+    if not same:
+        doc['test'] = definition
+
+    return {
+        'attempt_id': row.id,
+        # Unknown for old rows unless the test still matches the event
+        'test_version': row.version if same else None,
+        'encoding': ENCODING,
+        'data': zlib.compress(json.dumps(doc, separators=(',', ':')).encode(), 6),
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('attempt_payloads',
+    sa.Column('attempt_id', sa.UUID(), nullable=False),
+    sa.Column('test_version', sa.Integer(), nullable=True),
+    sa.Column('encoding', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['attempt_id'], ['attempts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('attempt_id')
+    )
+
+    conn = op.get_bind()
+    stmt = (
+        sa.select(
+            attempts.c.id,
+            attempts.c.raw_payload,
+            tests.c.max_marks,
+            tests.c.negative_marking,
+            tests.c.answer_key,
+            tests.c.version,
+        )
+        .select_from(attempts.outerjoin(tests, attempts.c.test_id == tests.c.id))
+    )
+    for rows in _batches(conn, stmt, attempts.c.id):
+        # Attempts ingested without a payload get no attempt_payloads row
+        compacted = [_compact(row) for row in rows if row.raw_payload is not None]
+        if compacted:
+            conn.execute(attempt_payloads.insert(), compacted)
+
+    op.drop_column('attempts', 'raw_payload')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('attempts', sa.Column('raw_payload', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    stmt = (
+        sa.select(
+            attempts.c.id,
+            attempts.c.answers,
+            attempt_payloads.c.data,
+            tests.c.name,
+            tests.c.max_marks,
+            tests.c.negative_marking,
+            tests.c.answer_key,
+        )
+        .select_from(
+            attempts
+            .join(attempt_payloads, attempt_payloads.c.attempt_id == attempts.c.id)
+            .outerjoin(tests, attempts.c.test_id == tests.c.id)
+        )
+    )
+    for rows in _batches(conn, stmt, attempts.c.id):
+        for row in rows:
+            doc = json.loads(zlib.decompress(row.data))
+            doc.setdefault('test', {
+                'name': row.name,
+                'max_marks': row.max_marks,
+                'negative_marking': row.negative_marking,
+                'answer_key': row.answer_key,
+            })
+            doc['answers'] = row.answers
+            conn.execute(
+                attempts.update()
+                .where(attempts.c.id == row.id)
+                .values(raw_payload=doc)
+            )
+
+    op.drop_table('attempt_payloads')
@@ -0,0 +1,40 @@
+"""attempt duplicate_of index
+
+Revision ID: 8080b7f10df5
+Revises: 77f16df42555
+Create Date: 2026-10-17 10:41:52.177903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8080b7f10df5'
+down_revision: Union[str, Sequence[str], None] = '77f16df42555'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_attempts_duplicate_of',
+            'attempts',
+            ['duplicate_of_attempt_id'],
+            postgresql_where=sa.text('duplicate_of_attempt_id IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_attempts_duplicate_of',
+            table_name='attempts',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,48 @@
+"""recompute runs
+
+Revision ID: 8e41f0a6d2c3
+Revises: 5b2e8d1c7a94
+Create Date: 2026-10-16 16:02:11.530648
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41f0a6d2c3'
+down_revision: Union[str, Sequence[str], None] = '5b2e8d1c7a94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('recompute_runs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('test_id', sa.UUID(), nullable=False),
+    sa.Column('test_version', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('last_attempt_id', sa.UUID(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_recompute_runs_test_created',
+        'recompute_runs',
+        ['test_id', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_recompute_runs_test_created', table_name='recompute_runs')
+    op.drop_table('recompute_runs')
@@ -0,0 +1,36 @@
+"""test definitions
+
+Revision ID: a93f4c1d7e52
+Revises: f2c6b05e7a18
+Create Date: 2026-10-17 19:12:05.418330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93f4c1d7e52'
+down_revision: Union[str, Sequence[str], None] = 'f2c6b05e7a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('test_definitions',
+    sa.Column('test_id', sa.UUID(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('negative_marking', sa.JSON(), nullable=False),
+    sa.Column('answer_key', sa.JSON(), nullable=True),
+    sa.Column('replaced_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ),
+    sa.PrimaryKeyConstraint('test_id', 'version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('test_definitions')
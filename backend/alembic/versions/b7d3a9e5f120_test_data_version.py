@@ -0,0 +1,31 @@
+"""test data version
+
+Revision ID: b7d3a9e5f120
+Revises: 8e41f0a6d2c3
+Create Date: 2026-10-16 17:10:45.220187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3a9e5f120'
+down_revision: Union[str, Sequence[str], None] = '8e41f0a6d2c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'tests',
+        sa.Column('data_version', sa.BigInteger(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tests', 'data_version')
@@ -0,0 +1,38 @@
+"""leaderboard entries updated index
+
+Revision ID: c41e9d2a7b63
+Revises: 8080b7f10df5
+Create Date: 2026-10-17 13:05:18.442190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9d2a7b63'
+down_revision: Union[str, Sequence[str], None] = '8080b7f10df5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_leaderboard_entries_updated',
+            'leaderboard_entries',
+            ['test_id', 'updated_at'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_leaderboard_entries_updated',
+            table_name='leaderboard_entries',
+            postgresql_concurrently=True,
+        )
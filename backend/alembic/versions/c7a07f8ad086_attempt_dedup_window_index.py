@@ -0,0 +1,38 @@
+"""attempt dedup window index
+
+Revision ID: c7a07f8ad086
+Revises: d6d49473ec1a
+Create Date: 2026-10-16 11:26:05.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a07f8ad086'
+down_revision: Union[str, Sequence[str], None] = 'd6d49473ec1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_attempts_student_test_started',
+            'attempts',
+            ['student_id', 'test_id', 'started_at'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_attempts_student_test_started',
+            table_name='attempts',
+            postgresql_concurrently=True,
+        )
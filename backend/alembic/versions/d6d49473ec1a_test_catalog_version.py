@@ -0,0 +1,33 @@
+"""test catalog version
+
+Revision ID: d6d49473ec1a
+Revises: 43154cc9498d
+Create Date: 2026-10-16 10:03:17.554120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6d49473ec1a'
+down_revision: Union[str, Sequence[str], None] = '43154cc9498d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'tests',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    )
+    op.create_index('ix_tests_name', 'tests', ['name'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tests_name', table_name='tests')
+    op.drop_column('tests', 'version')
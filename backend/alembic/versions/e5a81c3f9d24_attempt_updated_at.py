@@ -0,0 +1,30 @@
+"""attempt updated_at
+
+Revision ID: e5a81c3f9d24
+Revises: c41e9d2a7b63
+Create Date: 2026-10-17 15:22:07.318524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a81c3f9d24'
+down_revision: Union[str, Sequence[str], None] = 'c41e9d2a7b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable with no server default: no table rewrite. Existing rows get
+    # a stamp the next time they are written.
+    op.add_column('attempts', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('attempts', 'updated_at')
@@ -0,0 +1,36 @@
+"""leaderboard removals
+
+Revision ID: f2c6b05e7a18
+Revises: e5a81c3f9d24
+Create Date: 2026-10-17 16:48:39.902157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6b05e7a18'
+down_revision: Union[str, Sequence[str], None] = 'e5a81c3f9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('leaderboard_removals',
+    sa.Column('test_id', sa.UUID(), nullable=False),
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('removed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['test_id'], ['tests.id'], ),
+    sa.PrimaryKeyConstraint('test_id', 'student_id')
+    )
+    op.create_index('ix_leaderboard_removals_removed', 'leaderboard_removals', ['test_id', 'removed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_leaderboard_removals_removed', table_name='leaderboard_removals')
+    op.drop_table('leaderboard_removals')
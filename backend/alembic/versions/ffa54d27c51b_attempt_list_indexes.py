@@ -0,0 +1,53 @@
+"""attempt list indexes
+
+Revision ID: ffa54d27c51b
+Revises: 00c8bcd45fbf
+Create Date: 2026-10-16 14:02:33.610927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ffa54d27c51b'
+down_revision: Union[str, Sequence[str], None] = '00c8bcd45fbf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Keyset pages of GET /api/attempts: ORDER BY started_at DESC NULLS LAST, id DESC
+ORDER = [sa.text('started_at DESC NULLS LAST'), sa.text('id DESC')]
+
+INDEXES = {
+    'ix_attempts_started_id': [],
+    'ix_attempts_test_started_id': ['test_id'],
+    'ix_attempts_student_started_id': ['student_id'],
+    'ix_attempts_status_started_id': ['status'],
+    'ix_attempts_test_status_started_id': ['test_id', 'status'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, prefix in INDEXES.items():
+            op.create_index(
+                name,
+                'attempts',
+                [*prefix, *ORDER],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name,
+                table_name='attempts',
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,329 @@
+import os
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import Attempt, AttemptScore
+from catalog import catalog
+import metrics
+from scoring import SKIP_CODE
+
+
+# Attempts per yield_per fetch and per encoded matrix
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "5000"))
+
+# Scores computed this long before the last one folded are read again on
+# advance, so a transaction that stamped its scores before another one but
+# committed after it is still picked up (like RANK_SYNC_OVERLAP_SECONDS)
+ANALYTICS_SYNC_OVERLAP_SECONDS = float(os.getenv("ANALYTICS_SYNC_OVERLAP_SECONDS", "30"))
+
+
+# =========================================================
+# Sufficient statistics
+# =========================================================
+
+class OptionCodes(dict):
+    """Answer -> matrix code. Skips are SKIP_CODE; every other answer,
+    including options that are never correct, gets the next code the
+    first time it is seen."""
+
+    def __init__(self, labels=()):
+        super().__init__({None: SKIP_CODE, "SKIP": SKIP_CODE})
+        self.labels = []
+        for label in labels:
+            self[label]
+
+    def __missing__(self, answer):
+        code = self[answer] = len(self.labels)
+        self.labels.append(answer)
+        return code
+
+
+class ItemStats:
+    """Per-question sums for one test version, over its SCORED attempts.
+
+    Everything is a count or a sum, so attempts can be folded in batch by
+    batch and two ItemStats of the same test version simply add up.
+    Never mutated once built: a fold returns a new object, so concurrent
+    readers of the cache see either the old or the new totals.
+    """
+
+    __slots__ = (
+        "test_version", "questions", "labels", "key_codes", "attempts",
+        "score_sum", "score_sq_sum", "skipped", "correct", "correct_score_sum",
+        "option_counts", "watermark", "recent",
+    )
+
+    def __init__(self, plan, test_version):
+        codes = OptionCodes(plan.answers)
+
+        self.test_version = test_version
+        self.questions = plan.questions
+        self.labels = codes.labels
+        self.key_codes = np.array([codes[a] for a in plan.answers], dtype=np.int16)
+        self.attempts = 0
+        self.score_sum = 0.0
+        self.score_sq_sum = 0.0
+
+        q = len(self.questions)
+        self.skipped = np.zeros(q, dtype=np.int64)
+        self.correct = np.zeros(q, dtype=np.int64)
+        self.correct_score_sum = np.zeros(q, dtype=np.float64)
+        self.option_counts = np.zeros((q, len(self.labels)), dtype=np.int64)
+
+        # Latest attempt_scores.computed_at folded in, and attempt id ->
+        # computed_at of the attempts folded within the overlap before it
+        self.watermark = None
+        self.recent = {}
+
+    def fold(self, answer_maps, scores, stamps):
+        """New ItemStats with these attempts added; `stamps` are their
+        (attempt_id, computed_at)."""
+        codes = OptionCodes(self.labels)
+        lookup = codes.__getitem__
+        questions = self.questions
+
+        matrix = np.fromiter(
+            (
+                lookup(get_answer(q))
+                for get_answer in (a.get for a in answer_maps)
+                for q in questions
+            ),
+            dtype=np.int16,
+            count=len(answer_maps) * len(questions),
+        ).reshape(len(answer_maps), len(questions))
+        scores = np.asarray(scores, dtype=np.float64)
+
+        q, k = len(questions), len(codes.labels)
+
+        # Column 0 is SKIP, then one per option code, per question
+        offsets = (matrix + 1) + np.arange(q, dtype=np.int64) * (k + 1)
+        counts = np.bincount(offsets.ravel(), minlength=q * (k + 1)).reshape(q, k + 1)
+        hits = matrix == self.key_codes
+
+        new = object.__new__(ItemStats)
+        new.test_version = self.test_version
+        new.questions = questions
+        new.labels = codes.labels
+        new.key_codes = self.key_codes
+        new.attempts = self.attempts + len(answer_maps)
+        new.score_sum = self.score_sum + float(scores.sum())
+        new.score_sq_sum = self.score_sq_sum + float((scores * scores).sum())
+        new.skipped = self.skipped + counts[:, 0]
+        new.correct = self.correct + hits.sum(axis=0)
+        new.correct_score_sum = self.correct_score_sum + scores @ hits
+        new.option_counts = counts[:, 1:]
+        new.option_counts[:, :self.option_counts.shape[1]] += self.option_counts
+        new.watermark = max(
+            filter(None, (self.watermark, *(at for _, at in stamps))), default=None
+        )
+        new.recent = {}
+        if new.watermark is not None:
+            since = new.watermark - timedelta(seconds=ANALYTICS_SYNC_OVERLAP_SECONDS)
+            for stamp in (self.recent.items(), stamps):
+                new.recent.update((i, at) for i, at in stamp if at is not None and at > since)
+        return new
+
+    def report(self):
+        """Per-question p-value, skip rate, discrimination and option shares.
+
+        discrimination is the point-biserial correlation between getting
+        the question right and the total score (None when everyone or no
+        one got it right, or all scores are equal).
+        """
+        n = self.attempts
+        items = []
+
+        if n:
+            mean = self.score_sum / n
+            sd = np.sqrt(max(self.score_sq_sum / n - mean * mean, 0.0))
+
+            p = self.correct / n
+            right = np.divide(
+                self.correct_score_sum, self.correct,
+                out=np.zeros_like(p), where=self.correct > 0,
+            )
+            wrong = np.divide(
+                self.score_sum - self.correct_score_sum, n - self.correct,
+                out=np.zeros_like(p), where=self.correct < n,
+            )
+            defined = (self.correct > 0) & (self.correct < n) & (sd > 0)
+            discrimination = np.divide(
+                (right - wrong) * np.sqrt(p * (1 - p)), sd,
+                out=np.zeros_like(p), where=defined,
+            )
+
+            skip_rate = self.skipped / n
+            shares = self.option_counts / n
+
+        for i, question in enumerate(self.questions):
+            item = {
+                "question": question,
+                "correct_answer": self.labels[self.key_codes[i]],
+                "p_value": None,
+                "skip_rate": None,
+                "discrimination": None,
+                "options": {},
+            }
+            if n:
+                item.update(
+                    p_value=round(float(p[i]), 4),
+                    skip_rate=round(float(skip_rate[i]), 4),
+                    discrimination=(
+                        round(float(discrimination[i]), 4) if defined[i] else None
+                    ),
+                    options={
+                        label: round(float(shares[i, j]), 4)
+                        for j, label in enumerate(self.labels)
+                        if self.option_counts[i, j]
+                    },
+                )
+            items.append(item)
+
+        return {
+            "test_version": self.test_version,
+            "attempts": n,
+            "questions": items,
+        }
+
+
+# =========================================================
+# Reads
+# =========================================================
+
+class Rescored(Exception):
+    """An attempt already folded in was read again with a new score."""
+
+
+def _scored(test_id):
+    return (
+        select(Attempt.id, Attempt.answers, AttemptScore.score, AttemptScore.computed_at)
+        .join(AttemptScore, AttemptScore.attempt_id == Attempt.id)
+        .where(Attempt.test_id == test_id, Attempt.status == "SCORED")
+    )
+
+
+def _fold_rows(db, stats, stmt, batch_size):
+    recent = stats.recent
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for rows in result.tuples().partitions():
+            fresh = []
+            for row in rows:
+                seen = recent.get(row[0])
+                if seen is None:
+                    fresh.append(row)
+                elif seen != row[3]:
+                    raise Rescored(row[0])
+            if fresh:
+                ids, answers, scores, computed = zip(*fresh)
+                stats = stats.fold(answers, scores, list(zip(ids, computed)))
+    finally:
+        result.close()
+    return stats
+
+
+def scored_totals(db, test_id):
+    """(count, sum of scores) of the test's SCORED attempts."""
+    count, total = db.execute(
+        select(func.count(), func.sum(AttemptScore.score))
+        .select_from(Attempt)
+        .join(AttemptScore, AttemptScore.attempt_id == Attempt.id)
+        .where(Attempt.test_id == test_id, Attempt.status == "SCORED")
+    ).one()
+    return count, total or 0
+
+
+def build(db, entry, batch_size=ANALYTICS_BATCH_SIZE):
+    """ItemStats over every SCORED attempt of the test."""
+    return _fold_rows(
+        db, ItemStats(entry.plan, entry.version), _scored(entry.id), batch_size
+    )
+
+
+def advance(db, entry, stats, batch_size=ANALYTICS_BATCH_SIZE):
+    """`stats` plus the attempts scored since its watermark, or None when
+    that is not the whole change.
+
+    New attempts are the only change that keeps the old sums valid. Scores
+    computed within the overlap before the watermark are read again: the
+    ones already folded (same attempt, same computed_at) are skipped, and
+    one with a new computed_at was rescored. A rescore further back, or a
+    flagged or deduped attempt, leaves the folded count or score sum off
+    the SCORED totals. Any of these and the caller rebuilds.
+    """
+    totals = scored_totals(db, entry.id)
+
+    stmt = _scored(entry.id)
+    if stats.watermark is not None:
+        since = stats.watermark - timedelta(seconds=ANALYTICS_SYNC_OVERLAP_SECONDS)
+        stmt = stmt.where(AttemptScore.computed_at > since)
+    try:
+        advanced = _fold_rows(db, stats, stmt, batch_size)
+    except Rescored:
+        return None
+
+    if (advanced.attempts, advanced.score_sum) != totals:
+        return None
+    return advanced
+
+
+# =========================================================
+# Cache
+# =========================================================
+
+class AnalyticsCache:
+    """Latest ItemStats per test, in process.
+
+    Keyed by test id and checked against the test's version: a new answer
+    key or marking scheme starts over, new SCORED attempts are folded in
+    (advance), anything else (a rescore, flag or dedup) is rebuilt from
+    the attempts.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, test_id):
+        """Current ItemStats for the test; None if it does not exist."""
+        entry = catalog.get_by_id(db, test_id, validate=True)
+        if entry is None:
+            return None
+
+        start = time.perf_counter()
+        stats = self._entries.get(entry.id)
+        mode = "incremental"
+
+        if stats is not None and stats.test_version == entry.version:
+            stats = advance(db, entry, stats)
+        else:
+            stats = None
+
+        if stats is None:
+            mode = "full"
+            stats = build(db, entry)
+
+        metrics.ANALYTICS_REFRESH_SECONDS.labels(mode).observe(time.perf_counter() - start)
+
+        with self._lock:
+            if entry.id not in self._entries and len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[entry.id] = stats
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+analytics_cache = AnalyticsCache()
+
+
+def item_analytics(db, test_id):
+    stats = analytics_cache.get(db, test_id)
+    return stats.report() if stats is not None else None
@@ -0,0 +1,479 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, func, literal, or_, select, true, tuple_, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from models import Student, Test, TestDefinition, Attempt, AttemptPayload, AttemptScore, Flag
+from catalog import catalog
+import payloads
+from scoring import question_breakdown
+from search import student_search
+from utils import as_uuid
+
+
+COUNT_CACHE_TTL_SECONDS = 30
+
+
+# =========================================================
+# Filters
+# =========================================================
+
+def apply_filters(
+    stmt,
+    test_id=None,
+    student_id=None,
+    status=None,
+    has_duplicates=None,
+    date_from=None,
+    date_to=None,
+    search=None,
+    students_joined=False,
+):
+    """The list_attempts filters, applied to any select over attempts."""
+    if test_id:
+        stmt = stmt.where(Attempt.test_id == test_id)
+    if student_id:
+        stmt = stmt.where(Attempt.student_id == student_id)
+    if status:
+        stmt = stmt.where(Attempt.status == status)
+    if has_duplicates is not None:
+        stmt = stmt.where(
+            Attempt.duplicate_of_attempt_id.isnot(None)
+            if has_duplicates
+            else Attempt.duplicate_of_attempt_id.is_(None)
+        )
+    if date_from:
+        stmt = stmt.where(Attempt.started_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Attempt.started_at <= date_to)
+    if search:
+        if not students_joined:
+            stmt = stmt.join(Student, Attempt.student_id == Student.id)
+        stmt = stmt.where(student_search(search))
+    return stmt
+
+
+# =========================================================
+# Ordering / cursors
+# =========================================================
+
+def page_order():
+    """Newest first; id breaks started_at ties so the order is total."""
+    return [Attempt.started_at.desc().nulls_last(), Attempt.id.desc()]
+
+
+def encode_cursor(started_at, attempt_id):
+    raw = json.dumps([
+        started_at.isoformat() if started_at else None,
+        str(attempt_id),
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (started_at, attempt_id); ValueError if malformed."""
+    try:
+        started_at, attempt_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (
+            datetime.fromisoformat(started_at) if started_at else None,
+            as_uuid(attempt_id),
+        )
+    except (TypeError, ValueError, json.JSONDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def after_cursor(started_at, attempt_id):
+    """Rows strictly after the cursor in page_order(), as a single range
+    on the (started_at, id) indexes.
+
+    Rows without started_at come last (NULLS LAST) but never pass the
+    row comparison; list_page reads them separately once the dated rows
+    run out.
+    """
+    if started_at is None:
+        return and_(Attempt.started_at.is_(None), Attempt.id < attempt_id)
+
+    return tuple_(Attempt.started_at, Attempt.id) < tuple_(started_at, attempt_id)
+
+
+# =========================================================
+# Page projection
+# =========================================================
+
+def list_page(db, filters, page, page_size, cursor=None):
+    """Only the columns the list view renders; no ORM entities.
+
+    Returns (rows, next_cursor). With a cursor the page is a keyset
+    range scan on the (filter, started_at, id) indexes; without one it
+    falls back to OFFSET.
+    """
+    stmt = (
+        select(
+            Attempt.id,
+            Attempt.started_at,
+            Student.full_name,
+            Test.name,
+            Attempt.status,
+            AttemptScore.score,
+            Attempt.duplicate_of_attempt_id,
+        )
+        .select_from(Attempt)
+        .outerjoin(Student, Attempt.student_id == Student.id)
+        .outerjoin(Test, Attempt.test_id == Test.id)
+        .outerjoin(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+    )
+    stmt = apply_filters(stmt, students_joined=True, **filters)
+
+    def fetch(stmt, limit):
+        return db.execute(stmt.order_by(*page_order()).limit(limit)).tuples().all()
+
+    if cursor is None:
+        rows = fetch(stmt.offset((page - 1) * page_size), page_size + 1)
+    else:
+        rows = fetch(stmt.where(after_cursor(*cursor)), page_size + 1)
+        if cursor[0] is not None and len(rows) <= page_size:
+            rows += fetch(
+                stmt.where(Attempt.started_at.is_(None)), page_size + 1 - len(rows)
+            )
+
+    next_cursor = None
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        next_cursor = encode_cursor(last[1], last[0])
+
+    return rows[:page_size], next_cursor
+
+
+def page_items(rows):
+    """list_page tuples -> the list view's items, as plain dicts."""
+    return [
+        {
+            "attempt_id": str(attempt_id),
+            "student": student,
+            "test": test,
+            "status": status,
+            "score": score,
+            "has_duplicates": duplicate_of is not None,
+        }
+        for attempt_id, _, student, test, status, score, duplicate_of in rows
+    ]
+
+
+# =========================================================
+# Totals
+# =========================================================
+
+def count_statement(filters):
+    return apply_filters(
+        select(func.count()).select_from(Attempt),
+        **filters,
+    )
+
+
+def exact_count(db, filters):
+    return db.execute(count_statement(filters)).scalar()
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a select, compiled and executed like any
+    statement, so filter values stay bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+def estimated_count(db, filters):
+    """Planner row estimate on Postgres; exact count elsewhere."""
+    if db.get_bind().dialect.name != "postgresql":
+        return exact_count(db, filters)
+
+    plan = db.execute(Explain(apply_filters(select(Attempt.id), **filters))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountCache:
+    """Exact counts per filter combination, reused for ttl seconds."""
+
+    def __init__(self, ttl=COUNT_CACHE_TTL_SECONDS, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, filters):
+        key = tuple(sorted((k, str(v)) for k, v in filters.items() if v is not None))
+        now = time.monotonic()
+
+        hit = self._entries.get(key)
+        if hit is not None and now - hit[1] < self.ttl:
+            return hit[0]
+
+        total = exact_count(db, filters)
+
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[key] = (total, now)
+        return total
+
+
+count_cache = CountCache()
+
+
+def count(db, filters, mode):
+    if mode == "none":
+        return None
+    if mode == "estimated":
+        return estimated_count(db, filters)
+    if mode == "cached":
+        return count_cache.get(db, filters)
+    return exact_count(db, filters)
+
+
+# =========================================================
+# Detail
+# =========================================================
+
+# Loaded only when asked for with ?fields=
+DETAIL_FIELDS = ("answers", "raw_payload", "breakdown")
+
+
+def parse_fields(value):
+    """"answers,breakdown" -> {"answers", "breakdown"}; ValueError on unknown names."""
+    fields = {f.strip() for f in (value or "").split(",") if f.strip()}
+    unknown = fields.difference(DETAIL_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+
+def _thread_root(attempt_id):
+    """Id of the canonical attempt of the attempt's duplicate thread."""
+    root_of = aliased(Attempt)
+    return (
+        select(func.coalesce(root_of.duplicate_of_attempt_id, root_of.id))
+        .where(root_of.id == attempt_id)
+        .scalar_subquery()
+    )
+
+
+def detail_version(db, attempt_id):
+    """Cache version of the attempt's detail view; None if not found.
+
+    Made of the rows the view shows: the attempt's updated_at (status,
+    flags, dedup, merge), its score's computed_at, the size and latest
+    write of its duplicate thread, and the test's version (the key behind
+    breakdown and raw_payload), so writes to other attempts of the same
+    test leave it alone.
+    """
+    member = aliased(Attempt)
+    root = _thread_root(attempt_id)
+    in_thread = or_(member.id == root, member.duplicate_of_attempt_id == root)
+
+    row = db.execute(
+        select(
+            Attempt.updated_at,
+            AttemptScore.computed_at,
+            Test.version,
+            select(func.count()).where(in_thread).scalar_subquery(),
+            select(func.max(member.updated_at)).where(in_thread).scalar_subquery(),
+        )
+        .select_from(Attempt)
+        .outerjoin(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+        .outerjoin(Test, Attempt.test_id == Test.id)
+        .where(Attempt.id == attempt_id)
+    ).first()
+
+    return None if row is None else "|".join(map(str, row))
+
+
+def _related(attempt_id):
+    """Flags of the attempt and every attempt in its duplicate thread
+    (the canonical attempt plus all marked duplicates of it), as
+    (kind, id, label, at) rows."""
+    member = aliased(Attempt)
+    root = _thread_root(attempt_id)
+
+    return union_all(
+        select(
+            literal("flag").label("kind"),
+            Flag.id.label("related_id"),
+            Flag.reason.label("label"),
+            Flag.created_at.label("at"),
+        ).where(Flag.attempt_id == attempt_id),
+        select(
+            literal("duplicate"),
+            member.id,
+            member.status,
+            member.started_at,
+        ).where(or_(member.id == root, member.duplicate_of_attempt_id == root)),
+    ).subquery("related")
+
+
+def detail(db, attempt_id, fields=frozenset()):
+    """Everything the detail view shows, in one statement; None if not found.
+
+    Attempt, student, test and score are one row, outer-joined with the
+    flag and duplicate-thread rows, so the attempt columns repeat once
+    per related row (a handful). Heavy columns are selected only for the
+    requested `fields`.
+    """
+    related = _related(attempt_id)
+
+    columns = [
+        Attempt.id,
+        Attempt.source_event_id,
+        Attempt.status,
+        Attempt.started_at,
+        Attempt.submitted_at,
+        Attempt.duplicate_of_attempt_id,
+        Attempt.test_id,
+        Student.id.label("student_id"),
+        Student.full_name,
+        Student.email,
+        Student.phone,
+        Test.name.label("test_name"),
+        Test.max_marks,
+        Test.version.label("test_version"),
+        AttemptScore.correct,
+        AttemptScore.wrong,
+        AttemptScore.skipped,
+        AttemptScore.accuracy,
+        AttemptScore.net_correct,
+        AttemptScore.score,
+        AttemptScore.explanation,
+        AttemptScore.computed_at,
+        related.c.kind,
+        related.c.related_id,
+        related.c.label,
+        related.c.at,
+    ]
+    if fields:
+        columns.append(Attempt.answers)
+    if "raw_payload" in fields:
+        columns += [
+            AttemptPayload.encoding,
+            AttemptPayload.data,
+            AttemptPayload.test_version.label("payload_test_version"),
+            Test.negative_marking,
+            Test.answer_key,
+            # The definition the payload was ingested against, once replaced
+            TestDefinition.version.label("archived_version"),
+            TestDefinition.negative_marking.label("archived_negative_marking"),
+            TestDefinition.answer_key.label("archived_answer_key"),
+        ]
+
+    stmt = (
+        select(*columns)
+        .select_from(Attempt)
+        .outerjoin(Student, Attempt.student_id == Student.id)
+        .outerjoin(Test, Attempt.test_id == Test.id)
+        .outerjoin(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+        .outerjoin(related, true())
+        .where(Attempt.id == attempt_id)
+        .order_by(related.c.kind, related.c.at)
+    )
+    if "raw_payload" in fields:
+        stmt = (
+            stmt
+            .outerjoin(AttemptPayload, AttemptPayload.attempt_id == Attempt.id)
+            .outerjoin(TestDefinition, and_(
+                TestDefinition.test_id == Attempt.test_id,
+                TestDefinition.version == AttemptPayload.test_version,
+            ))
+        )
+
+    rows = db.execute(stmt).all()
+    if not rows:
+        return None
+
+    a = rows[0]
+    thread = [
+        {"attempt_id": str(r.related_id), "status": r.label, "started_at": r.at}
+        for r in rows
+        if r.kind == "duplicate"
+    ]
+
+    result = {
+        "attempt_id": str(a.id),
+        "source_event_id": a.source_event_id,
+        "status": a.status,
+        "started_at": a.started_at,
+        "submitted_at": a.submitted_at,
+        "duplicate_of": str(a.duplicate_of_attempt_id) if a.duplicate_of_attempt_id else None,
+        "student": {
+            "id": str(a.student_id) if a.student_id else None,
+            "name": a.full_name,
+            "email": a.email,
+            "phone": a.phone,
+        },
+        "test": {
+            "id": str(a.test_id) if a.test_id else None,
+            "name": a.test_name,
+            "max_marks": a.max_marks,
+            "version": a.test_version,
+        },
+        "score": None if a.score is None else {
+            "correct": a.correct,
+            "wrong": a.wrong,
+            "skipped": a.skipped,
+            "accuracy": a.accuracy,
+            "net_correct": a.net_correct,
+            "score": a.score,
+            "explanation": a.explanation,
+            "computed_at": a.computed_at,
+        },
+        # Just the attempt itself when it has no duplicates
+        "duplicate_thread": thread if len(thread) > 1 else [],
+        "flags": [
+            {"id": str(r.related_id), "reason": r.label, "created_at": r.at}
+            for r in rows
+            if r.kind == "flag"
+        ],
+    }
+
+    if "answers" in fields:
+        result["answers"] = a.answers
+
+    if "breakdown" in fields:
+        entry = catalog.get_by_id(db, a.test_id)
+        result["breakdown"] = question_breakdown(entry.plan, a.answers) if entry else None
+
+    if "raw_payload" in fields:
+        result["raw_payload"] = None
+        result["payload_test_version"] = None
+        result["raw_payload_lossy"] = False
+        if a.data is not None:
+            if a.payload_test_version is None or a.payload_test_version == a.test_version:
+                marking, key = a.negative_marking, a.answer_key
+            elif a.archived_version is not None:
+                marking, key = a.archived_negative_marking, a.archived_answer_key
+            else:
+                # Replaced before test_definitions kept old versions
+                marking = key = None
+            test = None if marking is None else {
+                "name": a.test_name,
+                "max_marks": a.max_marks,
+                "negative_marking": marking,
+                "answer_key": key,
+            }
+            result["raw_payload"] = payloads.restore(a, a.answers, test)
+            result["raw_payload_lossy"] = result["raw_payload"]["test"] is None
+            result["payload_test_version"] = a.payload_test_version
+
+    return result
@@ -0,0 +1,80 @@
+"""Compare a benchmark results file against a stored baseline.
+
+    cd backend
+    python -m benchmarks.compare results.json benchmarks/baseline.json --tolerance 0.15
+
+A benchmark regresses when its median is more than `tolerance` slower
+than the baseline's. Exits 1 if any did, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+DEFAULT_TOLERANCE = 0.15
+
+# Results are only comparable when these match
+COMPARABLE_META = ("scale", "seed", "dialect")
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """(rows, warnings); each row has name, baseline/current median and ratio."""
+    warnings = [
+        f"{key} differs: baseline {baseline['meta'].get(key)!r}, current {results['meta'].get(key)!r}"
+        for key in COMPARABLE_META
+        if baseline["meta"].get(key) != results["meta"].get(key)
+    ]
+
+    rows = []
+    for name, stats in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            warnings.append(f"{name}: not in baseline")
+            continue
+
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else None
+        rows.append({
+            "name": name,
+            "baseline_ms": base["median_ms"],
+            "current_ms": stats["median_ms"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "regressed": ratio is not None and ratio > 1 + tolerance,
+        })
+
+    return rows, warnings
+
+
+def report(rows, warnings, out=sys.stdout):
+    for warning in warnings:
+        print(f"warning: {warning}", file=out)
+
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else "ok"
+        print(
+            f"{row['name']:<32} {row['baseline_ms']:>10.3f} -> {row['current_ms']:>10.3f} ms"
+            f"  x{row['ratio']}  {flag}",
+            file=out,
+        )
+
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    return 1 if regressions else 0
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("results")
+    parser.add_argument("baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    rows, warnings = compare(load(args.results), load(args.baseline), args.tolerance)
+    return report(rows, warnings)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
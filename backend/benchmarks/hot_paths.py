@@ -0,0 +1,412 @@
+"""Hot-path benchmarks on synthetic data.
+
+    cd backend
+    python -m benchmarks.hot_paths --scale 10k \\
+        --database-url sqlite:///bench.db --reset \\
+        --out results.json --baseline benchmarks/baseline.json
+
+Loads `--scale` attempts (see benchmarks.synthetic) through the bulk
+ingest path, timing each batch, then times:
+
+- ingest_attempts row by row (a small separate sample)
+- dedup.is_duplicate and the ingest window index
+- scoring.compute_score, score_plan and score_batch
+- leaderboard pages (materialized, keyset-deep and live)
+- list_attempts queries with filters and search
+
+Use a database of its own: --reset drops every table and migrates it
+from scratch. Results are
+written as JSON; with --baseline they are compared and the exit code is
+1 on a regression (see benchmarks.compare).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks.compare import DEFAULT_TOLERANCE, compare, load, report
+from benchmarks.synthetic import SyntheticData, parse_scale
+
+
+# =========================================================
+# Timing
+# =========================================================
+
+def measure(fn, repeat, warmup=1):
+    """Wall time of `repeat` calls to fn, after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def stats(samples, ops=1):
+    """Summary of per-run samples; ops is the work items in one run."""
+    samples = sorted(samples)
+    median = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))]
+
+    return {
+        "runs": len(samples),
+        "ops": ops,
+        "median_ms": round(median * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "min_ms": round(samples[0] * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "ops_per_s": round(ops / median, 1) if median else None,
+    }
+
+
+# =========================================================
+# Database
+# =========================================================
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate(url):
+    """alembic upgrade head, without alembic.ini (its URL and logging setup)."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    # ConfigParser interpolation: a literal % must be doubled
+    config.set_main_option(
+        "sqlalchemy.url", url.render_as_string(hide_password=False).replace("%", "%%")
+    )
+    command.upgrade(config, "head")
+
+
+def prepare_database(reset):
+    """Empty schema: the migrations on Postgres, the models on SQLite."""
+    from sqlalchemy import inspect, text
+    from sqlalchemy.exc import DBAPIError
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    from database import engine
+    from models import Base
+
+    has_tables = inspect(engine).has_table("attempts")
+    if has_tables and not reset:
+        sys.exit("database already has tables; pass --reset to drop them (bench databases only)")
+
+    with engine.begin() as conn:
+        Base.metadata.drop_all(conn)
+
+        if engine.dialect.name != "sqlite":
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+    if engine.dialect.name != "sqlite":
+        migrate(engine.url)
+        return
+
+    # The migrations are Postgres-only. SQLite also rejects NULLS LAST in
+    # index definitions; those indexes are skipped and their queries scan
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(table))
+            for index in table.indexes:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(CreateIndex(index))
+                except DBAPIError:
+                    print(f"skipped index {index.name}", file=sys.stderr)
+
+
+def load_data(data, batch_size):
+    """Bulk-ingest every synthetic event; one sample per batch."""
+    from database import SessionLocal
+    from main import ingest_attempts
+    from schemas import AttemptEvent
+
+    samples = []
+    db = SessionLocal()
+    try:
+        for batch in data.batches(batch_size):
+            payload = [AttemptEvent.model_validate(event) for event in batch]
+
+            start = time.perf_counter()
+            ingest_attempts(payload, bulk=True, run_async=False, chunk_size=batch_size, db=db)
+            samples.append(time.perf_counter() - start)
+    finally:
+        db.close()
+
+    return stats(samples, batch_size)
+
+
+# =========================================================
+# Benchmarks
+# =========================================================
+
+def bench_row_ingest(data, events, repeat):
+    from database import SessionLocal
+    from main import ingest_attempts
+    from schemas import AttemptEvent
+
+    sample = SyntheticData(events * (repeat + 1), seed=data.seed + 1)
+    batches = sample.batches(events)
+
+    def run():
+        payload = [AttemptEvent.model_validate(event) for event in next(batches)]
+        db = SessionLocal()
+        try:
+            ingest_attempts(payload, bulk=False, run_async=False, chunk_size=events, db=db)
+        finally:
+            db.close()
+
+    return stats(measure(run, repeat), events)
+
+
+def sample_pairs(data, size):
+    """(new, existing) attempt pairs in the same shape dedup sees:
+    consecutive events, which include the near-duplicates."""
+    from utils import parse_timestamp
+
+    pairs = []
+    previous = None
+    for event in data.events():
+        try:
+            attempt = SimpleNamespace(
+                started_at=parse_timestamp(event["started_at"]),
+                answers=event["answers"],
+                key=(event["student"]["full_name"], event["test"]["name"]),
+            )
+        except ValueError:
+            continue
+
+        if previous is not None:
+            pairs.append((attempt, previous))
+        previous = attempt
+
+        if len(pairs) == size:
+            break
+    return pairs
+
+
+def bench_dedup(data, size, repeat):
+    from dedup import AttemptWindowIndex, is_duplicate
+
+    pairs = sample_pairs(data, size)
+
+    def pairwise():
+        for new, existing in pairs:
+            is_duplicate(new, existing)
+
+    def window_index():
+        index = AttemptWindowIndex()
+        for new, _ in pairs:
+            index.check_and_add(new.key, new)
+
+    return {
+        "dedup_is_duplicate": stats(measure(pairwise, repeat), len(pairs)),
+        "dedup_window_index": stats(measure(window_index, repeat), len(pairs)),
+    }
+
+
+def bench_scoring(data, size, repeat):
+    from scoring import compile_plan, compute_score, score_batch, score_plan
+
+    test = SimpleNamespace(**data.tests[0])
+    plan = compile_plan(test)
+
+    answer_maps = []
+    for event in data.events():
+        if event["test"]["name"] == test.name:
+            answer_maps.append(event["answers"])
+        if len(answer_maps) == size:
+            break
+
+    def per_attempt():
+        for answers in answer_maps:
+            compute_score(test, answers)
+
+    def compiled():
+        for answers in answer_maps:
+            score_plan(plan, answers)
+
+    return {
+        "scoring_compute_score": stats(measure(per_attempt, repeat), len(answer_maps)),
+        "scoring_score_plan": stats(measure(compiled, repeat), len(answer_maps)),
+        "scoring_score_batch": stats(
+            measure(lambda: score_batch(plan, answer_maps), repeat), len(answer_maps)
+        ),
+    }
+
+
+def bench_leaderboard(db, test_id, repeat, page_size=50, depth=10):
+    import leaderboard
+
+    def deep():
+        cursor = None
+        for _ in range(depth):
+            _, rows, next_cursor = leaderboard.page(db, test_id, 1, page_size, cursor)
+            if not next_cursor:
+                break
+            cursor = leaderboard.decode_cursor(next_cursor)
+
+    return {
+        "leaderboard_page": stats(
+            measure(lambda: leaderboard.page(db, test_id, 1, page_size), repeat)
+        ),
+        f"leaderboard_keyset_{depth}_pages": stats(measure(deep, repeat), depth),
+        "leaderboard_live_page": stats(
+            measure(lambda: leaderboard.live_page(db, test_id, 1, page_size), repeat)
+        ),
+    }
+
+
+def list_filters(db, test_id):
+    """Filter sets the dashboard sends, filled from the loaded data."""
+    from sqlalchemy import func, select
+
+    from models import Attempt, Student
+
+    email, phone = db.execute(
+        select(Student.email, Student.phone)
+        .where(Student.email.isnot(None), Student.phone.isnot(None))
+        .limit(1)
+    ).one()
+    latest = db.execute(select(func.max(Attempt.started_at))).scalar()
+
+    none = {
+        "test_id": None, "student_id": None, "status": None, "has_duplicates": None,
+        "date_from": None, "date_to": None, "search": None,
+    }
+    return {
+        "all": none,
+        "by_test": {**none, "test_id": test_id},
+        "deduped": {**none, "status": "DEDUPED"},
+        "has_duplicates": {**none, "has_duplicates": True},
+        "last_week": {**none, "date_from": latest - timedelta(days=7), "date_to": latest},
+        "search_name": {**none, "search": "sharma"},
+        "search_email": {**none, "search": email},
+        "search_phone": {**none, "search": f"{phone[:5]} {phone[5:]}"},
+    }
+
+
+def bench_list_attempts(db, test_id, repeat, page_size=10):
+    import attempt_queries
+
+    results = {}
+    for name, filters in list_filters(db, test_id).items():
+        def run(filters=filters):
+            attempt_queries.count(db, filters, "exact")
+            attempt_queries.list_page(db, filters, 1, page_size)
+
+        results[f"list_attempts_{name}"] = stats(measure(run, repeat))
+    return results
+
+
+# =========================================================
+# Runner
+# =========================================================
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import logging
+
+    from sqlalchemy import func, select
+
+    from database import SessionLocal, engine
+    from logger import logger
+    from models import Attempt
+
+    # Per-attempt info logs would dominate every ingest timing
+    logger.setLevel(logging.WARNING)
+
+    data = SyntheticData(parse_scale(args.scale), seed=args.seed)
+    prepare_database(args.reset)
+
+    benchmarks = {"ingest_bulk": load_data(data, args.batch_size)}
+    benchmarks["ingest_rows"] = bench_row_ingest(data, args.row_events, args.repeat)
+    benchmarks.update(bench_dedup(data, args.sample, args.repeat))
+    benchmarks.update(bench_scoring(data, args.sample, args.repeat))
+
+    db = SessionLocal()
+    try:
+        # The busiest test, as on a real leaderboard
+        test_id = db.execute(
+            select(Attempt.test_id)
+            .group_by(Attempt.test_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+
+        benchmarks.update(bench_leaderboard(db, test_id, args.repeat))
+        benchmarks.update(bench_list_attempts(db, test_id, args.repeat))
+    finally:
+        db.close()
+
+    return {
+        "meta": {
+            "scale": data.attempts,
+            "seed": data.seed,
+            "dialect": engine.dialect.name,
+            "batch_size": args.batch_size,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.hot_paths")
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m or a number of attempts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--row-events", type=int, default=100)
+    parser.add_argument("--sample", type=int, default=2000, help="attempts per in-memory benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="results JSON; stdout when omitted")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    # database.py builds its engines from the environment at import
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("set DATABASE_URL or pass --database-url")
+
+    results = run(args)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        rows, warnings = compare(results, load(args.baseline), args.tolerance)
+        return report(rows, warnings, out=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
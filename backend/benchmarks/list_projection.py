@@ -0,0 +1,146 @@
+"""GET /api/attempts page cost: ORM entities vs the column projection.
+
+    cd backend
+    python -m benchmarks.list_projection --pages 200
+
+Runs against DATABASE_URL (load it first, e.g. with benchmarks.hot_paths).
+For each filter set, renders the same pages both ways and reports CPU
+time (time.process_time) and peak Python allocations (tracemalloc) per
+page, after checking the response bodies are byte-identical:
+
+- orm: Attempt entities with joinedload(student, test, score, flags),
+  a dict per row, then jsonable_encoder + JSONResponse as FastAPI does
+  for a returned dict (the list view before the projection)
+- lean: attempt_queries.list_page tuples -> page_items -> JSONResponse
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+
+def orm_page(db, filters, page, page_size):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+
+    import attempt_queries
+    from models import Attempt
+
+    stmt = attempt_queries.apply_filters(
+        select(Attempt).options(
+            joinedload(Attempt.student),
+            joinedload(Attempt.test),
+            joinedload(Attempt.score),
+            joinedload(Attempt.flags),
+        ),
+        **filters,
+    )
+    attempts = db.execute(
+        stmt.order_by(*attempt_queries.page_order())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    ).unique().scalars().all()
+
+    body = JSONResponse(jsonable_encoder({
+        "data": [
+            {
+                "attempt_id": str(a.id),
+                "student": a.student.full_name if a.student else None,
+                "test": a.test.name if a.test else None,
+                "status": a.status,
+                "score": a.score.score if a.score else None,
+                "has_duplicates": a.duplicate_of_attempt_id is not None,
+            }
+            for a in attempts
+        ],
+    })).body
+
+    # Entities stay in the identity map until the session lets them go
+    db.expunge_all()
+    return body
+
+
+def lean_page(db, filters, page, page_size):
+    from fastapi.responses import JSONResponse
+
+    import attempt_queries
+
+    rows, _ = attempt_queries.list_page(db, filters, page, page_size)
+    return JSONResponse({"data": attempt_queries.page_items(rows)}).body
+
+
+def profile(render, db, filters, pages, page_size):
+    """(cpu ms per page, peak KiB per page, bodies)."""
+    bodies = []
+    cpu = 0.0
+    peak = 0
+
+    for page in range(1, pages + 1):
+        tracemalloc.start()
+        start = time.process_time()
+        bodies.append(render(db, filters, page, page_size))
+        cpu += time.process_time() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return cpu * 1000 / pages, peak / 1024, bodies
+
+
+def run(args):
+    from sqlalchemy import select
+
+    from database import SessionLocal
+    from models import Attempt
+
+    db = SessionLocal()
+    try:
+        test_id = db.execute(select(Attempt.test_id).limit(1)).scalar()
+        none = {
+            "test_id": None, "student_id": None, "status": None, "has_duplicates": None,
+            "date_from": None, "date_to": None, "search": None,
+        }
+        cases = {
+            "all": none,
+            "by_test": {**none, "test_id": test_id},
+            "search": {**none, "search": args.search},
+        }
+
+        results = {}
+        for name, filters in cases.items():
+            # Warm the connection and the statement caches
+            orm_page(db, filters, 1, args.page_size)
+            lean_page(db, filters, 1, args.page_size)
+
+            orm_cpu, orm_peak, orm_bodies = profile(orm_page, db, filters, args.pages, args.page_size)
+            lean_cpu, lean_peak, lean_bodies = profile(lean_page, db, filters, args.pages, args.page_size)
+
+            results[name] = {
+                "pages": args.pages,
+                "page_size": args.page_size,
+                "identical": orm_bodies == lean_bodies,
+                "orm": {"cpu_ms_per_page": round(orm_cpu, 3), "peak_kib": round(orm_peak, 1)},
+                "lean": {"cpu_ms_per_page": round(lean_cpu, 3), "peak_kib": round(lean_peak, 1)},
+                "cpu_speedup": round(orm_cpu / lean_cpu, 2) if lean_cpu else None,
+            }
+        return results
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.list_projection")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--search", default="sharma")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    return 0 if all(r["identical"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Concurrent dashboard load against the read endpoints.
+
+    cd backend
+    python -m benchmarks.read_load --base-url http://localhost:8000 --users 300
+
+Each simulated user loops over /api/attempts, /api/leaderboard and
+/api/tests for --duration seconds; prints per-endpoint throughput and
+latency percentiles as JSON.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, round(p / 100 * (len(values) - 1)))
+    return round(values[index] * 1000, 2)
+
+
+async def user(client, requests, deadline, latencies, errors):
+    i = 0
+    while time.monotonic() < deadline:
+        name, path, params = requests[i % len(requests)]
+        i += 1
+
+        start = time.monotonic()
+        try:
+            response = await client.get(path, params=params)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+
+        if ok:
+            latencies[name].append(time.monotonic() - start)
+        else:
+            errors[name] += 1
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        test_id = args.test_id
+        if not test_id:
+            tests = (await client.get("/api/tests")).json()
+            if not tests:
+                sys.exit("no tests to benchmark; ingest some attempts first")
+            test_id = tests[0]["id"]
+
+        requests = [
+            ("attempts", "/api/attempts", {"page_size": 10, "count": "cached"}),
+            ("leaderboard", "/api/leaderboard", {"test_id": test_id, "page_size": 10}),
+            ("tests", "/api/tests", {}),
+        ]
+        latencies = {name: [] for name, _, _ in requests}
+        errors = {name: 0 for name, _, _ in requests}
+
+        start = time.monotonic()
+        deadline = start + args.duration
+
+        await asyncio.gather(*[
+            # Stagger the users so they do not all hit the same endpoint
+            user(client, requests[n % 3:] + requests[:n % 3], deadline, latencies, errors)
+            for n in range(args.users)
+        ])
+        elapsed = time.monotonic() - start
+
+    return {
+        "users": args.users,
+        "duration_s": round(elapsed, 2),
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "errors": errors[name],
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "p99_ms": percentile(values, 99),
+                "max_ms": percentile(values, 100),
+            }
+            for name, values in latencies.items()
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.read_load")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--test-id")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Deterministic synthetic ingest payloads for the benchmarks.
+
+    cd backend
+    python -m benchmarks.synthetic --scale 10k --out attempts.ndjson
+
+Events have the AttemptEvent shape and exercise the same paths real
+exports do:
+
+- students are seen under gmail aliases ("first.last+tag@gmail.com",
+  mixed case) and differently formatted phone numbers, some events
+  carry only one of the two
+- tests have 50-200 questions and their own negative marking
+- students retake tests days apart, and a share of attempts is
+  re-submitted 1-6 minutes later with >= 92% identical answers, so it
+  is caught by dedup
+- a few attempts have no submitted_at or a malformed started_at
+
+The same seed and scale always produce the same events.
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+OPTIONS = "ABCD"
+
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Nikhil",
+    "Priya", "Rahul", "Riya", "Rohan", "Saanvi", "Siddharth", "Sneha", "Vivaan",
+)
+LAST_NAMES = (
+    "Agarwal", "Bose", "Chopra", "Das", "Gupta", "Iyer", "Jain", "Kapoor",
+    "Menon", "Nair", "Patel", "Rao", "Reddy", "Sharma", "Singh", "Verma",
+)
+DOMAINS = ("gmail.com", "gmail.com", "gmail.com", "yahoo.com", "outlook.com")
+
+START = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def parse_scale(value):
+    """"10k" / "100k" / "1m" or a plain number of attempts."""
+    value = str(value).lower()
+    return SCALES[value] if value in SCALES else int(value)
+
+
+class SyntheticData:
+    """Students, tests and attempt events for `attempts` attempts.
+
+    Roughly four attempts per student and 20k per test; near_duplicate_rate
+    of the attempts are quick re-submissions of the previous one.
+    """
+
+    def __init__(
+        self,
+        attempts,
+        seed=42,
+        near_duplicate_rate=0.1,
+        retake_rate=0.3,
+        partial_rate=0.03,
+        malformed_rate=0.005,
+    ):
+        self.attempts = attempts
+        self.seed = seed
+        self.near_duplicate_rate = near_duplicate_rate
+        self.retake_rate = retake_rate
+        self.partial_rate = partial_rate
+        self.malformed_rate = malformed_rate
+
+        rng = random.Random(seed)
+        self.students = [self._student(rng, n) for n in range(max(1, attempts // 4))]
+        self.tests = [self._test(rng, n) for n in range(max(3, attempts // 20_000))]
+
+    # -----------------------------------------------------
+    # Entities
+    # -----------------------------------------------------
+
+    @staticmethod
+    def _student(rng, n):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return {
+            "full_name": f"{first} {last}",
+            "local": f"{first.lower()}.{last.lower()}{n}",
+            "domain": rng.choice(DOMAINS),
+            "phone": f"9{rng.randrange(10**9):09d}",
+            "ability": rng.uniform(0.3, 0.95),
+        }
+
+    @staticmethod
+    def _test(rng, n):
+        questions = rng.randint(50, 200)
+        correct = rng.choice((1, 2, 4))
+        return {
+            "name": f"Bench Test {n + 1}",
+            "max_marks": questions * correct,
+            "negative_marking": {
+                "correct": correct,
+                "wrong": rng.choice((0, -1)),
+                "skip": 0,
+            },
+            "answer_key": {f"q{i}": rng.choice(OPTIONS) for i in range(1, questions + 1)},
+        }
+
+    # -----------------------------------------------------
+    # Identity variants
+    # -----------------------------------------------------
+
+    @staticmethod
+    def email_variant(rng, student):
+        local, domain = student["local"], student["domain"]
+
+        if domain == "gmail.com":
+            roll = rng.random()
+            if roll < 0.2:
+                local = f"{local}+{rng.choice(('prep', 'mock', 'school', 'x'))}"
+            elif roll < 0.3:
+                local = local.replace(".", "")
+
+        email = f"{local}@{domain}"
+        return email.title() if rng.random() < 0.1 else email
+
+    @staticmethod
+    def phone_variant(rng, student):
+        digits = student["phone"]
+        return rng.choice((
+            digits,
+            f"{digits[:5]} {digits[5:]}",
+            f"{digits[:5]}-{digits[5:]}",
+            f"({digits[:3]}) {digits[3:6]}-{digits[6:]}",
+        ))
+
+    def _identity(self, rng, student):
+        roll = rng.random()
+        identity = {"full_name": student["full_name"], "email": None, "phone": None}
+
+        if roll < 0.8:
+            identity["email"] = self.email_variant(rng, student)
+        if roll >= 0.7:
+            identity["phone"] = self.phone_variant(rng, student)
+        return identity
+
+    # -----------------------------------------------------
+    # Attempts
+    # -----------------------------------------------------
+
+    @staticmethod
+    def answers(rng, test, ability):
+        answers = {}
+        for q, correct in test["answer_key"].items():
+            roll = rng.random()
+            if roll < 0.1:
+                answers[q] = "SKIP"
+            elif roll < 0.1 + 0.9 * ability:
+                answers[q] = correct
+            else:
+                answers[q] = rng.choice([o for o in OPTIONS if o != correct])
+        return answers
+
+    @staticmethod
+    def near_copy(rng, answers):
+        """Same answers with at most 5% of them changed (similarity >= 0.95)."""
+        copy = dict(answers)
+        for q in rng.sample(sorted(copy), max(0, len(copy) // 20)):
+            copy[q] = rng.choice(OPTIONS)
+        return copy
+
+    @staticmethod
+    def _timestamp(value):
+        return value.isoformat() + "Z"
+
+    def _event(self, rng, i, student, test, started_at, answers):
+        submitted_at = None
+        if rng.random() >= self.partial_rate:
+            submitted_at = self._timestamp(started_at + timedelta(minutes=rng.randint(20, 90)))
+
+        started = self._timestamp(started_at)
+        if rng.random() < self.malformed_rate:
+            started = started_at.strftime("%d/%m/%Y %H:%M")
+
+        return {
+            "source_event_id": f"bench-{self.seed}-{i}",
+            "student": self._identity(rng, student),
+            "test": {k: test[k] for k in ("name", "max_marks", "negative_marking", "answer_key")},
+            "started_at": started,
+            "submitted_at": submitted_at,
+            "answers": answers,
+        }
+
+    def events(self):
+        """Yield `attempts` event dicts; nothing is kept in memory."""
+        rng = random.Random(self.seed + 1)
+        previous = None
+        i = 0
+
+        while i < self.attempts:
+            if previous and rng.random() < self.near_duplicate_rate:
+                # Re-submission inside the dedup window
+                student, test, started_at, answers = previous
+                started_at += timedelta(minutes=rng.randint(1, 6), seconds=rng.randint(0, 59))
+                answers = self.near_copy(rng, answers)
+            elif previous and rng.random() < self.retake_rate:
+                # Retake, well outside the window
+                student, test, started_at, _ = previous
+                started_at += timedelta(days=rng.randint(1, 14), minutes=rng.randint(0, 600))
+                answers = self.answers(rng, test, student["ability"])
+            else:
+                student = rng.choice(self.students)
+                test = rng.choice(self.tests)
+                started_at = START + timedelta(minutes=rng.randrange(60 * 24 * 60))
+                answers = self.answers(rng, test, student["ability"])
+
+            previous = (student, test, started_at, answers)
+            yield self._event(rng, i, student, test, started_at, answers)
+            i += 1
+
+    def batches(self, size):
+        batch = []
+        for event in self.events():
+            batch.append(event)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic")
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m or a number of attempts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="NDJSON file; stdout when omitted")
+    args = parser.parse_args(argv)
+
+    data = SyntheticData(parse_scale(args.scale), seed=args.seed)
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for event in data.events():
+            out.write(json.dumps(event) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
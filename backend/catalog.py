@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from models import Test, TestDefinition
+from scoring import ScoringPlan, check_marking
+from utils import as_uuid
+
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "60"))
+
+# Session.info key: test ids whose data_version the transaction will bump
+PENDING_BUMPS = "pending_data_version_bumps"
+
+
+class CatalogEntry:
+    __slots__ = ("id", "name", "max_marks", "version", "plan", "loaded_at")
+
+    def __init__(self, test):
+        self.id = test.id
+        self.name = test.name
+        self.max_marks = test.max_marks
+        self.version = test.version or 1
+        self.plan = ScoringPlan(test.answer_key, test.negative_marking)
+        self.loaded_at = time.monotonic()
+
+
+class TestCatalog:
+    """Tests by id and name, each with a precompiled ScoringPlan.
+
+    Entries carry the tests.version they were built from. Anything that
+    changes answer_key or negative_marking bumps the version (see
+    update_answer_key), which drops the local entry immediately; other
+    processes notice on their next revalidation, at most ttl seconds
+    later, or straight away on paths that pass validate=True.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL_SECONDS):
+        self.ttl = ttl
+        self._by_id = {}
+        self._by_name = {}
+        self._listing = None
+        self._listing_loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Cache primitives
+    # -----------------------------
+
+    def put(self, entry):
+        with self._lock:
+            old = self._by_id.get(entry.id)
+            if old is not None and old.name != entry.name:
+                self._by_name.pop(old.name, None)
+            self._by_id[entry.id] = entry
+            self._by_name[entry.name] = entry
+            if old is None:
+                self._listing = None
+        return entry
+
+    def remember(self, test):
+        return self.put(CatalogEntry(test))
+
+    def invalidate(self, test_id):
+        with self._lock:
+            entry = self._by_id.pop(as_uuid(test_id), None)
+            if entry is not None:
+                self._by_name.pop(entry.name, None)
+            self._listing = None
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_name.clear()
+            self._listing = None
+
+    def _fresh(self, entry):
+        return time.monotonic() - entry.loaded_at < self.ttl
+
+    def _revalidate(self, db, entry):
+        version = db.query(Test.version).filter(Test.id == entry.id).scalar()
+
+        if version is None:
+            self.invalidate(entry.id)
+            return None
+        if version != entry.version:
+            return None
+
+        entry.loaded_at = time.monotonic()
+        return entry
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+
+    def get_by_name(self, db, name):
+        entry = self._by_name.get(name)
+
+        if entry is not None and (self._fresh(entry) or self._revalidate(db, entry)):
+            return entry
+
+        test = db.query(Test).filter(Test.name == name).first()
+        return self.remember(test) if test else None
+
+    def get_many_by_name(self, db, names):
+        found = {}
+        missing = []
+
+        for name in names:
+            entry = self._by_name.get(name)
+            if entry is not None and self._fresh(entry):
+                found[name] = entry
+            else:
+                missing.append(name)
+
+        if missing:
+            for test in db.query(Test).filter(Test.name.in_(missing)):
+                found.setdefault(test.name, self.remember(test))
+
+        return found
+
+    def get_by_id(self, db, test_id, validate=False):
+        test_id = as_uuid(test_id)
+        entry = self._by_id.get(test_id)
+
+        if entry is not None:
+            if not validate and self._fresh(entry):
+                return entry
+            if self._revalidate(db, entry):
+                return entry
+
+        test = db.query(Test).filter(Test.id == test_id).first()
+        return self.remember(test) if test else None
+
+    def list_tests(self, db):
+        listing = self._listing
+
+        if listing is not None and time.monotonic() - self._listing_loaded_at < self.ttl:
+            return listing
+
+        listing = [
+            {"id": str(tid), "name": name}
+            for tid, name in db.query(Test.id, Test.name)
+        ]
+
+        with self._lock:
+            self._listing = listing
+            self._listing_loaded_at = time.monotonic()
+
+        return listing
+
+    # -----------------------------
+    # Data versions
+    # -----------------------------
+
+    def bump_data_version(self, db, test_ids):
+        """Mark the tests' attempts/scores/leaderboard as changed.
+
+        Only noted on the session: the tests rows are updated once per
+        transaction, right before it commits (_bump_pending). Every
+        ingest chunk bumps its tests, so the row lock is held for the
+        commit alone rather than for the rest of the transaction, and the
+        new version still becomes visible together with the change.
+        """
+        db.info.setdefault(PENDING_BUMPS, set()).update(
+            tid for tid in test_ids if tid is not None
+        )
+
+    def data_version(self, db, test_id):
+        """Current tests.data_version, or None for an unknown test."""
+        return db.execute(
+            select(Test.data_version).where(Test.id == test_id)
+        ).scalar()
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+
+    def update_answer_key(self, db, test_id, answer_key=None, negative_marking=None):
+        """A partial negative_marking is merged into the current one. The
+        result is checked before anything is written; ValueError if it
+        is incomplete or not all ints. The definition being replaced is
+        kept in test_definitions under its version."""
+        # Locked so two updates can't both replace the same version
+        test = db.query(Test).filter(Test.id == as_uuid(test_id)).with_for_update().first()
+        if not test:
+            return None
+
+        if negative_marking is not None:
+            negative_marking = {**(test.negative_marking or {}), **negative_marking}
+            check_marking(negative_marking)
+
+        db.add(TestDefinition(
+            test_id=test.id,
+            version=test.version or 1,
+            negative_marking=test.negative_marking,
+            answer_key=test.answer_key,
+        ))
+
+        if answer_key is not None:
+            test.answer_key = answer_key
+        if negative_marking is not None:
+            test.negative_marking = negative_marking
+
+        test.version = (test.version or 1) + 1
+        test.data_version = (test.data_version or 0) + 1
+        db.commit()
+
+        self.invalidate(test.id)
+        return self.remember(test)
+
+
+catalog = TestCatalog()
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_pending(session):
+    # Savepoint commits run this too; the bump waits for the real one
+    if session.in_nested_transaction():
+        return
+
+    test_ids = session.info.pop(PENDING_BUMPS, None)
+    if not test_ids:
+        return
+
+    session.execute(
+        update(Test)
+        .where(Test.id.in_(sorted(test_ids)))
+        .values(data_version=Test.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_BUMPS, None)
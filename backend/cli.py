@@ -0,0 +1,178 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from database import SessionLocal, ReadSessionLocal
+import export
+import leaderboard
+import jobs
+import recompute
+from utils import as_uuid
+
+
+# =========================================================
+# Commands
+# =========================================================
+
+def rebuild_leaderboard(args):
+    db = SessionLocal()
+    try:
+        entries = leaderboard.rebuild(db, as_uuid(args.test_id))
+    finally:
+        db.close()
+
+    print(json.dumps({"test_id": args.test_id, "entries": entries}))
+    return 0
+
+
+def check_leaderboard(args):
+    db = SessionLocal()
+    try:
+        mismatches = leaderboard.check_consistency(db, as_uuid(args.test_id))
+    finally:
+        db.close()
+
+    print(json.dumps(
+        {"test_id": args.test_id, "mismatches": mismatches},
+        default=str,
+    ))
+    return 1 if mismatches else 0
+
+
+def recompute_test(args):
+    db = SessionLocal()
+    try:
+        started = recompute.start(db, as_uuid(args.test_id))
+        if started:
+            run, should_execute = started
+            status = recompute.run_status(run)
+    finally:
+        db.close()
+
+    if not started:
+        print(json.dumps({"test_id": args.test_id, "error": "not found"}))
+        return 1
+
+    if not should_execute:
+        print(json.dumps({**status, "error": "already running"}, default=str))
+        return 1
+
+    def progress(run):
+        print(json.dumps({"processed": run.processed, "total": run.total}), file=sys.stderr)
+
+    status = recompute.execute(
+        as_uuid(status["run_id"]),
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        on_progress=progress,
+    )
+    print(json.dumps(status, default=str))
+    return 0
+
+
+def export_attempts(args):
+    filters = {
+        "student_id": as_uuid(args.student_id) if args.student_id else None,
+        "status": args.status,
+        "has_duplicates": args.has_duplicates,
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+        "search": args.search,
+    }
+
+    if args.format not in export.available_formats():
+        print(json.dumps({"error": "parquet export needs pyarrow"}), file=sys.stderr)
+        return 1
+
+    db = ReadSessionLocal()
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in export.stream(
+            db, as_uuid(args.test_id), filters, args.format, args.batch_size
+        ):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+        db.close()
+    return 0
+
+
+def ingest_worker(args):
+    pool = jobs.IngestWorkerPool(
+        workers=args.workers, poll_interval=args.poll_interval
+    )
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop(timeout=30)
+    return 0
+
+
+# =========================================================
+# Entry point
+# =========================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser(
+        "rebuild-leaderboard",
+        help="recreate leaderboard_entries for a test from its attempts",
+    )
+    cmd.add_argument("test_id")
+    cmd.set_defaults(func=rebuild_leaderboard)
+
+    cmd = commands.add_parser(
+        "check-leaderboard",
+        help="compare leaderboard_entries with the reference ranking",
+    )
+    cmd.add_argument("test_id")
+    cmd.set_defaults(func=check_leaderboard)
+
+    cmd = commands.add_parser(
+        "recompute-test",
+        help="rescore every attempt of a test (resumes an unfinished run)",
+    )
+    cmd.add_argument("test_id")
+    cmd.add_argument("--processes", type=int, default=recompute.RECOMPUTE_PROCESSES)
+    cmd.add_argument("--chunk-size", type=int, default=recompute.RECOMPUTE_CHUNK_SIZE)
+    cmd.set_defaults(func=recompute_test)
+
+    cmd = commands.add_parser(
+        "export-attempts",
+        help="stream a test's attempts and scores as CSV or Parquet",
+    )
+    cmd.add_argument("test_id")
+    cmd.add_argument("--format", choices=export.FORMATS, default="csv")
+    cmd.add_argument("--out", help="file to write; stdout when omitted")
+    cmd.add_argument("--batch-size", type=int, default=export.EXPORT_BATCH_SIZE)
+    cmd.add_argument("--student-id")
+    cmd.add_argument("--status")
+    cmd.add_argument(
+        "--has-duplicates",
+        type=lambda v: v.lower() in ("1", "true", "yes"),
+        default=None,
+    )
+    cmd.add_argument("--date-from", type=datetime.fromisoformat)
+    cmd.add_argument("--date-to", type=datetime.fromisoformat)
+    cmd.add_argument("--search")
+    cmd.set_defaults(func=export_attempts)
+
+    cmd = commands.add_parser(
+        "ingest-worker",
+        help="drain queued async ingest jobs (POST /api/ingest/attempts?async=true)",
+    )
+    cmd.add_argument("--workers", type=int, default=max(jobs.INGEST_WORKERS, 1))
+    cmd.add_argument("--poll-interval", type=float, default=jobs.POLL_INTERVAL_SECONDS)
+    cmd.set_defaults(func=ingest_worker)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,184 @@
 import os
-from sqlalchemy import create_engine
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Optional replica for read-only endpoints; unset means read from primary
+READ_REPLICA_URL = os.getenv("READ_REPLICA_URL")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+def pool_options(url, **overrides):
+    """create_engine pool kwargs from the DB_POOL_* settings.
+
+    SQLite gets pre-ping only; its pools are per-file and in-memory
+    databases reject the sizing arguments.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    options.update(overrides)
+    return options
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine)
 
+read_engine = (
+    create_engine(READ_REPLICA_URL, **pool_options(READ_REPLICA_URL))
+    if READ_REPLICA_URL else engine
+)
+ReadSessionLocal = sessionmaker(bind=read_engine)
+
 Base = declarative_base()
+
+
+# =========================================================
+# Async engine (read endpoints)
+# =========================================================
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_url(url):
+    """DATABASE_URL with its driver swapped for the asyncio one."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+if READ_REPLICA_URL:
+    ASYNC_READ_REPLICA_URL = os.getenv("ASYNC_READ_REPLICA_URL") or async_url(READ_REPLICA_URL)
+    async_read_engine = create_async_engine(
+        ASYNC_READ_REPLICA_URL, **pool_options(ASYNC_READ_REPLICA_URL)
+    )
+else:
+    async_read_engine = async_engine
+
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, expire_on_commit=False)
+
+
+# =========================================================
+# Pool metrics
+# =========================================================
+
+ENGINES = {"primary": engine, "async_primary": async_engine.sync_engine}
+if READ_REPLICA_URL:
+    ENGINES["replica"] = read_engine
+    ENGINES["async_replica"] = async_read_engine.sync_engine
+
+POOL_EVENTS = ("connect", "checkout", "checkin", "invalidate")
+
+pool_events = {name: Counter() for name in ENGINES}
+
+
+def _count(name, kind):
+    def listener(*args):
+        pool_events[name][kind] += 1
+    return listener
+
+
+def instrument(name, eng):
+    """Statement count / time for /metrics, and for the request that ran them.
+
+    The start time lives on the statement's execution context, so a
+    statement that fails (no after_cursor_execute) leaves nothing behind
+    on the pooled connection.
+    """
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(name, time.perf_counter() - context.query_started)
+
+    event.listen(eng, "before_cursor_execute", before)
+    event.listen(eng, "after_cursor_execute", after)
+
+
+for _name, _engine in ENGINES.items():
+    for _kind in POOL_EVENTS:
+        event.listen(_engine.pool, _kind, _count(_name, _kind))
+    instrument(_name, _engine)
+
+
+def pool_stats():
+    """Current usage and lifetime event counts of every pool."""
+    stats = {}
+
+    for name, eng in ENGINES.items():
+        pool = eng.pool
+        usage = {"pool": type(pool).__name__}
+
+        # QueuePool-style pools; SQLite's may not have all of these
+        for key in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, key):
+                usage[key] = getattr(pool, key)()
+
+        usage.update({kind: pool_events[name][kind] for kind in POOL_EVENTS})
+        stats[name] = usage
+
+    return stats
+
+
+def _pool_metrics():
+    stats = pool_stats()
+    gauges = [
+        ("db_pool_size", "Configured pool size.", "size"),
+        ("db_pool_checked_out", "Connections currently in use.", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool.", "checkedin"),
+        ("db_pool_overflow", "Connections beyond pool_size (negative: unopened).", "overflow"),
+    ]
+
+    families = [
+        (name, "gauge", doc, [
+            ({"engine": engine_name}, usage[key])
+            for engine_name, usage in stats.items()
+            if key in usage
+        ])
+        for name, doc, key in gauges
+    ]
+    families.append((
+        "db_pool_events_total", "counter", "Pool connect/checkout/checkin/invalidate events.",
+        [
+            ({"engine": engine_name, "event": kind}, usage[kind])
+            for engine_name, usage in stats.items()
+            for kind in POOL_EVENTS
+        ],
+    ))
+    return families
+
+
+metrics.register_collector(_pool_metrics)
@@ -1,6 +1,14 @@
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import timedelta
 
+import numpy as np
+
+import metrics
+
 SIMILARITY_THRESHOLD = 0.92
+DEDUP_WINDOW = timedelta(minutes=7)
 
 
 def calculate_similarity(a1, a2):
@@ -26,7 +34,7 @@ def is_duplicate(new_attempt, existing_attempt):
     # 7 minute rule
     time_diff = abs(new_attempt.started_at - existing_attempt.started_at)
 
-    if time_diff > timedelta(minutes=7):
+    if time_diff > DEDUP_WINDOW:
         return False
 
     similarity = calculate_similarity(
@@ -38,3 +46,125 @@ def is_duplicate(new_attempt, existing_attempt):
         return True
 
     return False
+
+
+# =========================================================
+# Encoded answers
+# =========================================================
+
+class AnswerCodec:
+    """Question ids -> vector positions, answer strings -> codes >= 1.
+
+    An encoded attempt is a uint16 vector with 0 where the question is
+    absent, so calculate_similarity's "keys in both dicts" becomes a mask
+    of non-zero cells. Codes are only comparable between vectors from the
+    same codec.
+    """
+
+    def __init__(self, questions=()):
+        self.positions = {q: i for i, q in enumerate(questions)}
+        self.codes = {}
+
+    def encode(self, answers):
+        positions = self.positions
+        codes = self.codes
+
+        for q in answers:
+            if q not in positions:
+                positions[q] = len(positions)
+
+        values = []
+        for ans in answers.values():
+            code = codes.get(ans)
+            if code is None:
+                code = codes[ans] = len(codes) + 1
+            values.append(code)
+
+        vector = np.zeros(len(positions), dtype=np.uint16)
+        if values:
+            vector[[positions[q] for q in answers]] = values
+        return vector
+
+
+def stack_vectors(vectors):
+    """Stack encoded vectors, zero-padding ones encoded before the codec grew."""
+    width = max(len(v) for v in vectors)
+    matrix = np.zeros((len(vectors), width), dtype=np.uint16)
+    for row, v in zip(matrix, vectors):
+        row[: len(v)] = v
+    return matrix
+
+
+def similarity_many(vector, matrix):
+    """calculate_similarity of one encoded attempt against each matrix row."""
+    if len(vector) < matrix.shape[1]:
+        vector = np.pad(vector, (0, matrix.shape[1] - len(vector)))
+    elif len(vector) > matrix.shape[1]:
+        matrix = np.pad(matrix, ((0, 0), (0, len(vector) - matrix.shape[1])))
+
+    mask = (matrix != 0) & (vector != 0)
+    compared = mask.sum(axis=1)
+    same = ((matrix == vector) & mask).sum(axis=1)
+
+    # Same float64 division as same / compared in calculate_similarity
+    return np.where(compared > 0, same / np.maximum(compared, 1), 0.0)
+
+
+# =========================================================
+# Window index
+# =========================================================
+
+class AttemptWindowIndex:
+    """Attempts per (student_id, test_id), kept sorted by started_at.
+
+    check_and_add() bisects to the ±DEDUP_WINDOW slice, so a new attempt is
+    only compared against attempts that is_duplicate could possibly accept.
+    Each group keeps its own AnswerCodec and the encoded vector of every
+    attempt, so a lookup is one similarity_many call over the slice.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW):
+        self.window = window
+        self._times = defaultdict(list)
+        self._attempts = defaultdict(list)
+        self._vectors = defaultdict(list)
+        self._codecs = defaultdict(AnswerCodec)
+
+    def _insert(self, key, attempt, vector):
+        times = self._times[key]
+        i = bisect_right(times, attempt.started_at)
+        times.insert(i, attempt.started_at)
+        self._attempts[key].insert(i, attempt)
+        self._vectors[key].insert(i, vector)
+
+    def _slice(self, key, started_at):
+        times = self._times.get(key)
+        if not times:
+            return 0, 0
+
+        lo = bisect_left(times, started_at - self.window)
+        hi = bisect_right(times, started_at + self.window)
+        return lo, hi
+
+    def _match(self, key, vector, lo, hi):
+        metrics.DEDUP_CANDIDATES.observe(hi - lo)
+        if lo == hi:
+            return None
+
+        start = time.perf_counter()
+        matrix = stack_vectors(self._vectors[key][lo:hi])
+        hits = np.flatnonzero(similarity_many(vector, matrix) >= SIMILARITY_THRESHOLD)
+        metrics.DEDUP_COMPARE_SECONDS.observe(time.perf_counter() - start)
+        return self._attempts[key][lo + hits[0]] if len(hits) else None
+
+    def add(self, key, attempt):
+        self._insert(key, attempt, self._codecs[key].encode(attempt.answers))
+
+    def check_and_add(self, key, attempt):
+        """Earliest indexed attempt that is_duplicate would accept (or
+        None), then add this one; the attempt is encoded once."""
+        vector = self._codecs[key].encode(attempt.answers)
+        lo, hi = self._slice(key, attempt.started_at)
+        duplicate = self._match(key, vector, lo, hi)
+        self._insert(key, attempt, vector)
+        return duplicate
@@ -0,0 +1,241 @@
+import csv
+import io
+import os
+from datetime import timezone
+
+from sqlalchemy import Text, cast, select
+
+from models import Student, Test, Attempt, AttemptScore
+import attempt_queries
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # csv only
+    pyarrow = None
+
+
+# Rows fetched per round trip from the server-side cursor, and per
+# chunk written to the response / parquet row group
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+FORMATS = ("csv", "parquet")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# (header, column)
+COLUMNS = [
+    ("attempt_id", Attempt.id),
+    ("source_event_id", Attempt.source_event_id),
+    ("student_id", Attempt.student_id),
+    ("student_name", Student.full_name),
+    ("email", Student.email),
+    ("phone", Student.phone),
+    ("test_name", Test.name),
+    ("status", Attempt.status),
+    ("started_at", Attempt.started_at),
+    ("submitted_at", Attempt.submitted_at),
+    ("duplicate_of", Attempt.duplicate_of_attempt_id),
+    ("correct", AttemptScore.correct),
+    ("wrong", AttemptScore.wrong),
+    ("skipped", AttemptScore.skipped),
+    ("accuracy", AttemptScore.accuracy),
+    ("net_correct", AttemptScore.net_correct),
+    ("score", AttemptScore.score),
+    ("computed_at", AttemptScore.computed_at),
+]
+
+HEADER = [name for name, _ in COLUMNS]
+
+UUID_COLUMNS = {"attempt_id", "student_id", "duplicate_of"}
+INT_COLUMNS = {"correct", "wrong", "skipped", "net_correct", "score"}
+# Formatted in Python on every backend (format_timestamp): the database's
+# text form of a timestamp differs from Python's, and so does the driver's
+# value (naive from SQLite, aware from psycopg2)
+TIMESTAMP_COLUMNS = ("started_at", "submitted_at", "computed_at")
+
+_TIMESTAMP_POSITIONS = [HEADER.index(name) for name in TIMESTAMP_COLUMNS]
+
+
+def available_formats():
+    return FORMATS if pyarrow is not None else ("csv",)
+
+
+def statement(test_id, filters, text_columns=()):
+    """One row per attempt of the test, list_attempts filters and order.
+
+    `text_columns` are cast to text by the database, so the driver hands
+    back ready strings instead of values for Python to build and format.
+    """
+    stmt = (
+        select(*[
+            cast(column, Text).label(name) if name in text_columns else column
+            for name, column in COLUMNS
+        ])
+        .select_from(Attempt)
+        .outerjoin(Student, Attempt.student_id == Student.id)
+        .outerjoin(Test, Attempt.test_id == Test.id)
+        .outerjoin(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+    )
+    stmt = attempt_queries.apply_filters(
+        stmt, students_joined=True, **{**filters, "test_id": test_id}
+    )
+    return stmt.order_by(*attempt_queries.page_order())
+
+
+def batches(db, test_id, filters, batch_size=EXPORT_BATCH_SIZE, text_columns=()):
+    """Lists of row tuples, read through a server-side cursor (yield_per),
+    so only one batch is in memory at a time."""
+    result = db.execute(
+        statement(test_id, filters, text_columns).execution_options(yield_per=batch_size)
+    )
+    try:
+        for partition in result.tuples().partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+# =========================================================
+# Writers
+# =========================================================
+
+def format_timestamp(value):
+    """ISO 8601 in UTC, without an offset (timestamps are stored as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _csv_rows(rows):
+    for row in rows:
+        row = list(row)
+        for i in _TIMESTAMP_POSITIONS:
+            row[i] = format_timestamp(row[i])
+        yield row
+
+
+def write_csv(batches):
+    """CSV bytes, one chunk per batch; None is an empty cell."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    writer.writerow(HEADER)
+    for rows in batches:
+        writer.writerows(_csv_rows(rows))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Chunks:
+    """Write-only file for ParquetWriter that hands back what was written
+    since the last drain(); tell() keeps counting so the footer offsets
+    stay right."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def parquet_schema():
+    return pyarrow.schema([
+        ("attempt_id", pyarrow.string()),
+        ("source_event_id", pyarrow.string()),
+        ("student_id", pyarrow.string()),
+        ("student_name", pyarrow.string()),
+        ("email", pyarrow.string()),
+        ("phone", pyarrow.string()),
+        ("test_name", pyarrow.string()),
+        ("status", pyarrow.string()),
+        ("started_at", pyarrow.timestamp("us")),
+        ("submitted_at", pyarrow.timestamp("us")),
+        ("duplicate_of", pyarrow.string()),
+        ("correct", pyarrow.int32()),
+        ("wrong", pyarrow.int32()),
+        ("skipped", pyarrow.int32()),
+        ("accuracy", pyarrow.float64()),
+        ("net_correct", pyarrow.int32()),
+        ("score", pyarrow.int32()),
+        ("computed_at", pyarrow.timestamp("us")),
+    ])
+
+
+def _record_batch(schema, rows, uuids_as_text):
+    columns = []
+    for name, values in zip(HEADER, zip(*rows)):
+        if name in UUID_COLUMNS and not uuids_as_text:
+            values = [str(v) if v is not None else None for v in values]
+        columns.append(pyarrow.array(values, type=schema.field(name).type))
+    return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def write_parquet(batches, uuids_as_text=False):
+    """Parquet bytes, one row group per batch, streamed as each group is
+    written; the footer comes last."""
+    schema = parquet_schema()
+    sink = _Chunks()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+
+    try:
+        for rows in batches:
+            writer.write_batch(_record_batch(schema, rows, uuids_as_text))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def stream(db, test_id, filters, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """Export bytes for `fmt`, generated batch by batch.
+
+    On Postgres the UUIDs (and for CSV the integers) are cast to text in
+    the query, where the result is the same as Python's str(); other
+    databases (SQLite stores UUIDs as bare hex) format them in Python.
+    Timestamps and floats are always formatted in Python, so a CSV reads
+    the same whatever the backend.
+    """
+    in_db = db.get_bind().dialect.name == "postgresql"
+
+    if fmt == "parquet":
+        text_columns = UUID_COLUMNS if in_db else ()
+        return write_parquet(
+            batches(db, test_id, filters, batch_size, text_columns),
+            uuids_as_text=in_db,
+        )
+
+    text_columns = UUID_COLUMNS | INT_COLUMNS if in_db else ()
+    return write_csv(batches(db, test_id, filters, batch_size, text_columns))
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+# Clients must revalidate, which is the cheap If-None-Match round trip
+CACHE_CONTROL = "no-cache"
+
+
+def request_key(request):
+    """Route + query params, order-insensitive."""
+    return request.url.path + "?" + "&".join(
+        f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+    )
+
+
+def make_etag(key, version):
+    digest = hashlib.sha1(f"{key}|{version}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+class ResponseCache:
+    """Serialized JSON bodies keyed by request_key, tagged with a version.
+
+    An entry is served only while its version equals the caller's
+    current one (tests.data_version), so a bump from any process makes
+    it stale at once; ttl and max_size bound memory and the lifetime
+    of entries nobody asks for again. LRU eviction.
+    """
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            cached_version, body, stored_at = entry
+            if cached_version != version or time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (version, body, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+        }
+
+
+response_cache = ResponseCache()
+
+
+async def cached_json(request, version, compute):
+    """304 / cached body / fresh body for a versioned JSON response.
+
+    `compute` is an async callable returning the JSON-able payload; it
+    only runs on a cache miss. version None (e.g. unknown test) skips
+    caching altogether.
+    """
+    if version is None:
+        return await compute()
+
+    key = request_key(request)
+    etag = make_etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key, version)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(await compute())).body
+        response_cache.put(key, version, body)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def content_etag_response(request, payload):
+    """ETag from the payload itself, for small responses that are already
+    cached elsewhere (the /api/tests listing)."""
+    body = JSONResponse(jsonable_encoder(payload)).body
+    etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if etag_matches(request, etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,310 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Student, Attempt
+from catalog import catalog
+import leaderboard
+from logger import logger
+
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "100000"))
+
+# Merges in another process (API worker, cli ingest-worker) only reach
+# this cache when its entries expire
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30"))
+
+
+def _keys(email, phone):
+    keys = []
+    if email:
+        keys.append(("email", email))
+    if phone:
+        keys.append(("phone", phone))
+    return keys
+
+
+def _insert(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(Student)
+    if dialect == "sqlite":
+        return sqlite.insert(Student)
+    raise NotImplementedError(f"student insert not supported on {dialect}")
+
+
+class IdentityResolver:
+    """Normalized email/phone -> student id, backed by a bounded LRU cache.
+
+    Callers pass identities already run through utils.normalize_email /
+    normalize_phone. Misses fall through to the partial unique indexes on
+    students.email and students.phone. Only rows read back from the
+    database are cached, never misses or uncommitted inserts, so creating
+    a student needs no invalidation and a rolled-back insert can't leave a
+    dangling id behind. Merges drop every key of both students here;
+    other processes see them once their entries are older than ttl.
+
+    A cached phone only answers identities without an email: the email
+    may belong to another student that the database would prefer.
+    """
+
+    def __init__(self, max_size=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_student = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------
+    # Cache primitives
+    # -----------------------------
+
+    def _get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None or time.monotonic() - hit[1] >= self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def _put(self, key, sid):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None and old[0] != sid:
+                self._by_student.get(old[0], set()).discard(key)
+
+            self._entries[key] = (sid, time.monotonic())
+            self._by_student.setdefault(sid, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                evicted_key, (evicted_sid, _) = self._entries.popitem(last=False)
+                keys = self._by_student.get(evicted_sid)
+                if keys is not None:
+                    keys.discard(evicted_key)
+                    if not keys:
+                        del self._by_student[evicted_sid]
+
+    def remember(self, sid, email=None, phone=None):
+        for key in _keys(email, phone):
+            self._put(key, sid)
+
+    def invalidate_student(self, sid):
+        with self._lock:
+            for key in self._by_student.pop(sid, set()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_student.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+
+    def _cached(self, email, phone):
+        """Cached id for an identity, or None to go to the database."""
+        if email:
+            return self._get(("email", email))
+        if phone:
+            return self._get(("phone", phone))
+        return None
+
+    def resolve(self, db, email, phone):
+        """Return the student id for an identity, or None. Email wins over phone."""
+        if not email and not phone:
+            return None
+
+        sid = self._cached(email, phone)
+        if sid is not None:
+            return sid
+
+        conditions = []
+        if email:
+            conditions.append(Student.email == email)
+        if phone:
+            conditions.append(Student.phone == phone)
+
+        rows = db.query(Student.id, Student.email, Student.phone).filter(
+            or_(*conditions)
+        ).limit(2).all()
+
+        if not rows:
+            return None
+
+        # Prefer the email match (DECISIONS.md §2: phone is the fallback)
+        rows.sort(key=lambda r: r.email != email)
+        sid = rows[0].id
+        self.remember(sid, rows[0].email, rows[0].phone)
+        return sid
+
+    def resolve_many(self, db, identities):
+        """Resolve (email, phone) pairs in one query; returns {pair: id}."""
+        resolved = {}
+        missing = []
+
+        for email, phone in identities:
+            sid = self._cached(email, phone)
+            if sid is not None:
+                resolved[(email, phone)] = sid
+            elif email or phone:
+                missing.append((email, phone))
+
+        if not missing:
+            return resolved
+
+        emails = {e for e, _ in missing if e}
+        phones = {p for _, p in missing if p}
+
+        conditions = []
+        if emails:
+            conditions.append(Student.email.in_(emails))
+        if phones:
+            conditions.append(Student.phone.in_(phones))
+
+        by_email = {}
+        by_phone = {}
+
+        for sid, email, phone in db.query(
+            Student.id, Student.email, Student.phone
+        ).filter(or_(*conditions)):
+            if email:
+                by_email[email] = sid
+            if phone:
+                by_phone[phone] = sid
+            self.remember(sid, email, phone)
+
+        for email, phone in missing:
+            sid = by_email.get(email) or by_phone.get(phone)
+            if sid is not None:
+                resolved[(email, phone)] = sid
+
+        return resolved
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+
+    def create(self, db, full_name, email, phone):
+        sid = uuid.uuid4()
+        created = self.create_many(
+            db, [{"id": sid, "full_name": full_name, "email": email, "phone": phone}]
+        )
+        return created[sid]
+
+    def create_many(self, db, students):
+        """Insert students; returns {requested id: id in the database}.
+
+        A concurrent ingest may have committed the same email or phone
+        since it was resolved. Those rows are skipped (ON CONFLICT DO
+        NOTHING) and resolved again, so the caller gets the existing
+        student instead of a unique violation.
+        """
+        if not students:
+            return {}
+
+        inserted = set(db.execute(
+            _insert(db).on_conflict_do_nothing().returning(Student.id),
+            students,
+        ).scalars())
+
+        created = {s["id"]: s["id"] for s in students if s["id"] in inserted}
+        skipped = [s for s in students if s["id"] not in inserted]
+        if not skipped:
+            return created
+
+        resolved = self.resolve_many(db, {(s["email"], s["phone"]) for s in skipped})
+        for s in skipped:
+            sid = resolved.get((s["email"], s["phone"]))
+            if sid is None:
+                raise RuntimeError(
+                    f"student {s['email']!r}/{s['phone']!r} conflicted but was not found"
+                )
+            created[s["id"]] = sid
+        return created
+
+    def merge(self, db, source_id, target_id):
+        """Fold source student into target: move attempts, carry over
+        identities the target lacks, delete source. Commits, then drops
+        both students' cache entries."""
+        source = db.query(Student).filter(Student.id == source_id).first()
+        target = db.query(Student).filter(Student.id == target_id).first()
+
+        if not source or not target:
+            return None
+
+        source_pk = source.id
+        target_pk = target.id
+
+        touched_tests = db.execute(
+            select(Attempt.test_id).where(Attempt.student_id == source_pk).distinct()
+        ).scalars().all()
+
+        moved = db.execute(
+            update(Attempt)
+            .where(Attempt.student_id == source_pk)
+            .values(student_id=target_pk)
+        ).rowcount
+
+        email = source.email
+        phone = source.phone
+
+        test_ids = leaderboard.forget_student(db, source_pk)
+        leaderboard.refresh(db, [(tid, target_pk) for tid in test_ids])
+
+        catalog.bump_data_version(db, touched_tests)
+
+        db.delete(source)
+        db.flush()
+
+        carried = False
+        if not target.email and email:
+            target.email = email
+            carried = True
+        if not target.phone and phone:
+            target.phone = phone
+            carried = True
+
+        if carried:
+            # The target's own attempts show the new identity in their
+            # detail view (attempt_queries.detail_version)
+            db.execute(
+                update(Attempt)
+                .where(Attempt.student_id == target_pk)
+                .values(updated_at=datetime.utcnow())
+            )
+
+        db.commit()
+
+        self.invalidate_student(source_pk)
+        self.invalidate_student(target_pk)
+
+        logger.info(
+            "students_merged",
+            extra={
+                "channel": "identity",
+                "context": {
+                    "source_id": str(source_pk),
+                    "target_id": str(target_pk),
+                },
+                "extra_data": {"attempts_moved": moved},
+            },
+        )
+
+        return target
+
+
+identity = IdentityResolver()
@@ -0,0 +1,572 @@
+import asyncio
+import os
+import time
+import uuid
+import zlib
+from collections import defaultdict, namedtuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from models import Test, Attempt, AttemptPayload, AttemptScore
+from utils import normalize_email, normalize_phone, parse_timestamp
+from scoring import score_batch
+from catalog import catalog, CatalogEntry
+from dedup import AttemptWindowIndex, DEDUP_WINDOW
+from identity import identity
+import leaderboard
+import metrics
+import payloads
+from logger import logger
+from schemas import AttemptEvent
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Deadlocks and serialization failures are retried this many times, with
+# a short backoff, before the chunk is reported as chunk_failed
+CHUNK_RETRIES = int(os.getenv("INGEST_CHUNK_RETRIES", "3"))
+CHUNK_RETRY_BACKOFF_SECONDS = 0.05
+
+# deadlock_detected, serialization_failure
+TRANSIENT_SQLSTATES = {"40P01", "40001"}
+
+# An NDJSON record longer than this is treated as a broken stream
+MAX_LINE_BYTES = 1024 * 1024
+
+# Minimal attempt shape needed by dedup.is_duplicate
+Candidate = namedtuple("Candidate", ["id", "started_at", "answers"])
+
+
+# =========================================================
+# Event preparation
+# =========================================================
+
+def _prepare(event):
+    """Normalize identity and timestamps; returns (prepared, reject_reason)."""
+    try:
+        email = normalize_email(event.student.email)
+    except ValueError:
+        return None, "invalid_email"
+
+    phone = normalize_phone(event.student.phone)
+
+    if not email and not phone:
+        return None, "missing_identity"
+
+    try:
+        started_at = parse_timestamp(event.started_at)
+        submitted_at = parse_timestamp(event.submitted_at)
+    except Exception:
+        return None, "malformed_timestamp"
+
+    if started_at is None:
+        return None, "malformed_timestamp"
+
+    return {
+        "event": event,
+        "email": email,
+        "phone": phone,
+        "started_at": started_at,
+        "submitted_at": submitted_at,
+    }, None
+
+
+# =========================================================
+# Set-based resolution
+# =========================================================
+
+def _resolve_students(db, prepared):
+    resolved = identity.resolve_many(
+        db, {(p["email"], p["phone"]) for p in prepared}
+    )
+
+    by_email = {e: sid for (e, _), sid in resolved.items() if e}
+    by_phone = {ph: sid for (_, ph), sid in resolved.items() if ph}
+
+    new_students = []
+
+    for p in prepared:
+        sid = by_email.get(p["email"]) or by_phone.get(p["phone"])
+
+        if sid is None:
+            sid = uuid.uuid4()
+            new_students.append({
+                "id": sid,
+                "full_name": p["event"].student.full_name,
+                "email": p["email"],
+                "phone": p["phone"],
+            })
+
+        if p["email"]:
+            by_email.setdefault(p["email"], sid)
+        if p["phone"]:
+            by_phone.setdefault(p["phone"], sid)
+
+        p["student_id"] = sid
+
+    created = identity.create_many(db, new_students)
+    for p in prepared:
+        p["student_id"] = created.get(p["student_id"], p["student_id"])
+
+
+def _resolve_tests(db, prepared):
+    tests = catalog.get_many_by_name(
+        db, {p["event"].test.name for p in prepared}
+    )
+
+    created = []
+
+    for p in prepared:
+        definition = p["event"].test
+
+        if definition.name not in tests:
+            test = Test(
+                id=uuid.uuid4(),
+                name=definition.name,
+                max_marks=definition.max_marks,
+                negative_marking=definition.negative_marking,
+                answer_key=definition.answer_key,
+                version=1,
+            )
+            db.add(test)
+            tests[definition.name] = CatalogEntry(test)
+            created.append(tests[definition.name])
+
+        p["test"] = tests[definition.name]
+
+    db.flush()
+    return created
+
+
+def _load_candidates(db, prepared):
+    """Window index seeded with stored attempts that could dedup this chunk.
+
+    One query: every (student, test) pair in the chunk, bounded to the
+    chunk's started_at range widened by DEDUP_WINDOW, so long retake
+    histories outside that range are never read.
+    """
+    pairs = {(p["student_id"], p["test"].id) for p in prepared}
+    earliest = min(p["started_at"] for p in prepared) - DEDUP_WINDOW
+    latest = max(p["started_at"] for p in prepared) + DEDUP_WINDOW
+
+    index = AttemptWindowIndex()
+
+    rows = db.query(
+        Attempt.id,
+        Attempt.student_id,
+        Attempt.test_id,
+        Attempt.started_at,
+        Attempt.answers,
+    ).filter(
+        tuple_(Attempt.student_id, Attempt.test_id).in_(pairs),
+        Attempt.started_at.between(earliest, latest),
+    )
+
+    for aid, sid, tid, started_at, answers in rows:
+        index.add((sid, tid), Candidate(aid, started_at, answers))
+
+    return index
+
+
+# =========================================================
+# Chunk processing
+# =========================================================
+
+def _ingest_chunk(db, events):
+    results = [None] * len(events)
+    prepared = []
+
+    for i, event in enumerate(events):
+        p, reason = _prepare(event)
+
+        if reason:
+            logger.info(
+                reason,
+                extra={
+                    "channel": "ingest",
+                    "context": {"source_event_id": event.source_event_id},
+                },
+            )
+            results[i] = {
+                "source_event_id": event.source_event_id,
+                "status": "REJECTED",
+                "reason": reason,
+            }
+            continue
+
+        p["index"] = i
+        prepared.append(p)
+
+    if not prepared:
+        return results, []
+
+    _resolve_students(db, prepared)
+    created_tests = _resolve_tests(db, prepared)
+    candidates = _load_candidates(db, prepared)
+
+    attempt_rows = []
+    payload_rows = []
+    to_score = defaultdict(list)
+    tests = {}
+
+    for p in prepared:
+        event = p["event"]
+        test = p["test"]
+        attempt_id = uuid.uuid4()
+
+        tests[test.id] = test
+
+        new_attempt = Candidate(attempt_id, p["started_at"], event.answers)
+        key = (p["student_id"], test.id)
+
+        # Later events in the same payload dedup against this one too
+        existing = candidates.check_and_add(key, new_attempt)
+        duplicate_of = existing.id if existing else None
+
+        if duplicate_of:
+            status = "DEDUPED"
+
+            logger.info(
+                "dedup_detected",
+                extra={
+                    "channel": "dedup",
+                    "context": {
+                        "attempt_id": event.source_event_id,
+                        "canonical_id": str(duplicate_of),
+                    },
+                },
+            )
+        else:
+            status = "SCORED"
+            to_score[test.id].append((attempt_id, p))
+
+        attempt_rows.append({
+            "id": attempt_id,
+            "student_id": p["student_id"],
+            "test_id": test.id,
+            "source_event_id": event.source_event_id,
+            "started_at": p["started_at"],
+            "submitted_at": p["submitted_at"],
+            "answers": event.answers,
+            "status": status,
+            "duplicate_of_attempt_id": duplicate_of,
+        })
+        payload_rows.append(payloads.compact(attempt_id, event, test))
+
+        results[p["index"]] = {
+            "source_event_id": event.source_event_id,
+            "status": status,
+            "attempt_id": str(attempt_id),
+            "duplicate_of": str(duplicate_of) if duplicate_of else None,
+        }
+
+    score_rows = []
+
+    entry_rows = []
+
+    for test_id, pending in to_score.items():
+        start = time.perf_counter()
+        scores = score_batch(tests[test_id].plan, [p["event"].answers for _, p in pending])
+        metrics.SCORING_SECONDS.labels("batch").observe(time.perf_counter() - start)
+        metrics.SCORED_ATTEMPTS.labels("batch").inc(len(pending))
+
+        for (attempt_id, p), score_data in zip(pending, scores):
+            score_rows.append({"attempt_id": attempt_id, **score_data})
+            entry_rows.append(leaderboard.entry_row(
+                test_id, p["student_id"], attempt_id, p["submitted_at"], score_data
+            ))
+
+            logger.info(
+                "score_computed",
+                extra={
+                    "channel": "scoring",
+                    "context": {
+                        "attempt_id": str(attempt_id),
+                        "score": score_data["score"],
+                    },
+                },
+            )
+
+    if attempt_rows:
+        db.execute(insert(Attempt), attempt_rows)
+        db.execute(insert(AttemptPayload), payload_rows)
+    if score_rows:
+        db.execute(insert(AttemptScore), score_rows)
+        leaderboard.apply_scores(db, entry_rows)
+
+    catalog.bump_data_version(db, tests)
+
+    return results, created_tests
+
+
+def count_results(results):
+    for r in results:
+        metrics.INGEST_EVENTS.labels(r["status"]).inc()
+
+
+def _ingest_each(db, chunk):
+    """_ingest_chunk one event at a time, each in a savepoint, so a bad
+    event is reported on its own instead of failing its neighbours."""
+    results = []
+    created_tests = []
+
+    for event in chunk:
+        savepoint = db.begin_nested()
+        try:
+            event_results, created = _ingest_chunk(db, [event])
+            savepoint.commit()
+        except Exception as exc:
+            savepoint.rollback()
+
+            logger.error(
+                "bulk_ingest_event_failed",
+                extra={
+                    "channel": "ingest",
+                    "context": {"source_event_id": event.source_event_id},
+                    "extra_data": {"error": repr(exc)},
+                },
+            )
+            event_results, created = [{
+                "source_event_id": event.source_event_id,
+                "status": "REJECTED",
+                "reason": "event_failed",
+                "error": repr(exc),
+            }], []
+
+        results.extend(event_results)
+        created_tests.extend(created)
+
+    return results, created_tests
+
+
+def is_transient(exc):
+    """A database error that is worth retrying as is (deadlock victim,
+    serialization failure)."""
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code in TRANSIENT_SQLSTATES
+
+
+def _build_chunk(db, chunk, offset):
+    """(results, created tests) for the chunk, inside the open transaction."""
+    for retried in (False, True):
+        try:
+            return _ingest_chunk(db, chunk)
+        except IntegrityError:
+            if retried:
+                raise
+            # Most likely a student id cached before another process
+            # merged that student away; resolve from the database again
+            db.rollback()
+            identity.clear()
+        except SQLAlchemyError:
+            raise
+        except Exception as exc:
+            db.rollback()
+            identity.clear()
+
+            logger.warning(
+                "bulk_ingest_chunk_retried",
+                extra={
+                    "channel": "ingest",
+                    "context": {"offset": offset, "size": len(chunk)},
+                    "extra_data": {"error": repr(exc)},
+                },
+            )
+            return _ingest_each(db, chunk)
+
+
+def ingest_chunk(db, chunk, offset=0, before_commit=None):
+    """One chunk in one transaction; returns its per-event results.
+
+    before_commit(results) runs inside the chunk's transaction, so
+    anything it writes (job progress) commits or rolls back with the
+    attempts themselves. An integrity error is retried once with the
+    identity cache emptied, a deadlock or serialization failure up to
+    CHUNK_RETRIES times. If building the chunk fails for a reason other
+    than the database, it is retried event by event (_ingest_each) and
+    only the events that still fail are REJECTED.
+    """
+    for attempt in range(CHUNK_RETRIES + 1):
+        try:
+            chunk_results, created_tests = _build_chunk(db, chunk, offset)
+
+            if before_commit:
+                before_commit(chunk_results)
+            db.commit()
+
+            # Only committed tests go into the shared catalog
+            for entry in created_tests:
+                catalog.put(entry)
+
+            count_results(chunk_results)
+            return chunk_results
+        except SQLAlchemyError as exc:
+            db.rollback()
+            # Ids read inside the rolled-back transaction may not exist
+            identity.clear()
+
+            if is_transient(exc) and attempt < CHUNK_RETRIES:
+                logger.warning(
+                    "bulk_ingest_chunk_conflict",
+                    extra={
+                        "channel": "ingest",
+                        "context": {"offset": offset, "size": len(chunk)},
+                        "extra_data": {"attempt": attempt + 1, "error": str(exc)},
+                    },
+                )
+                time.sleep(CHUNK_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                continue
+
+            logger.error(
+                "bulk_ingest_chunk_failed",
+                extra={
+                    "channel": "ingest",
+                    "context": {"offset": offset, "size": len(chunk)},
+                    "extra_data": {"error": str(exc)},
+                },
+            )
+            break
+
+    chunk_results = [
+        {
+            "source_event_id": event.source_event_id,
+            "status": "REJECTED",
+            "reason": "chunk_failed",
+        }
+        for event in chunk
+    ]
+
+    # The failed transaction took before_commit's writes with it
+    if before_commit:
+        before_commit(chunk_results)
+        db.commit()
+
+    count_results(chunk_results)
+    return chunk_results
+
+
+def bulk_ingest(db, events, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Ingest events in set-based chunks, one transaction per chunk.
+
+    Returns one result dict per event, in payload order.
+    """
+    results = []
+
+    for offset in range(0, len(events), chunk_size):
+        results.extend(
+            ingest_chunk(db, events[offset : offset + chunk_size], offset)
+        )
+
+    return results
+
+
+# =========================================================
+# Streaming (NDJSON)
+# =========================================================
+
+async def ndjson_lines(body, compressed=False):
+    """Lines of an NDJSON byte stream, optionally gzip-compressed.
+
+    Only the current partial line is buffered, so memory does not grow
+    with the payload.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+    buffer = b""
+
+    async for data in body:
+        if decompressor:
+            data = decompressor.decompress(data)
+
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"line longer than {MAX_LINE_BYTES} bytes")
+
+        for line in lines:
+            yield line
+
+    if decompressor:
+        buffer += decompressor.flush()
+
+    for line in buffer.split(b"\n"):
+        yield line
+
+
+def _parse_line(line, lineno):
+    """(event, None) or (None, rejected result) for one NDJSON record."""
+    try:
+        return AttemptEvent.model_validate_json(line), None
+    except ValidationError as exc:
+        return None, {
+            "source_event_id": None,
+            "status": "REJECTED",
+            "reason": "invalid_event",
+            "line": lineno,
+            "errors": exc.errors(include_url=False, include_input=False),
+        }
+
+
+async def stream_ingest(db, body, chunk_size=DEFAULT_CHUNK_SIZE, compressed=False):
+    """Ingest an NDJSON stream, yielding (first_line, results) per chunk.
+
+    Records are validated as they arrive and every chunk_size lines go
+    through ingest_chunk (one transaction, off the event loop), so at
+    most one chunk of events is held in memory. Results keep line order;
+    unparseable lines are REJECTED with reason invalid_event.
+    """
+    results = []
+    events = []
+    slots = []
+    first_line = 1
+    lineno = 0
+
+    async def flush():
+        chunk_results = await asyncio.to_thread(
+            ingest_chunk, db, events, first_line - 1
+        )
+        for slot, result in zip(slots, chunk_results):
+            results[slot] = result
+        return results
+
+    async for line in ndjson_lines(body, compressed):
+        lineno += 1
+        if not line.strip():
+            continue
+
+        event, rejected = _parse_line(line, lineno)
+        if rejected:
+            metrics.INGEST_EVENTS.labels("REJECTED").inc()
+            results.append(rejected)
+        else:
+            slots.append(len(results))
+            results.append(None)
+            events.append(event)
+
+        if len(results) >= chunk_size:
+            yield first_line, (await flush() if events else results)
+            results, events, slots = [], [], []
+            first_line = lineno + 1
+
+    if results:
+        yield first_line, (await flush() if events else results)
+
+
+def summarize(results):
+    summary = {"ingested": 0, "scored": 0, "deduped": 0, "rejected": 0}
+
+    for r in results:
+        if r["status"] == "REJECTED":
+            summary["rejected"] += 1
+            continue
+
+        summary["ingested"] += 1
+        if r["status"] == "SCORED":
+            summary["scored"] += 1
+        elif r["status"] == "DEDUPED":
+            summary["deduped"] += 1
+
+    return summary
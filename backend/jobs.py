@@ -0,0 +1,311 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, or_, and_, select, update
+from sqlalchemy.orm import sessionmaker
+
+from database import DATABASE_URL, pool_options, instrument
+from models import IngestJob, IngestJobChunk
+from ingest import ingest_chunk, summarize, DEFAULT_CHUNK_SIZE
+from schemas import AttemptEvent
+from logger import logger
+
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+POLL_INTERVAL_SECONDS = float(os.getenv("INGEST_POLL_INTERVAL", "1"))
+
+# A RUNNING job whose worker has not committed a chunk for this long is
+# considered abandoned and handed to another worker
+JOB_LEASE = timedelta(seconds=int(os.getenv("INGEST_JOB_LEASE_SECONDS", "300")))
+
+EMPTY_SUMMARY = {"ingested": 0, "scored": 0, "deduped": 0, "rejected": 0}
+
+
+class LeaseLost(Exception):
+    """The job was handed to another worker (this one missed its lease)."""
+
+
+# =========================================================
+# Enqueue / status
+# =========================================================
+
+def enqueue(db, events, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Store the validated batch as a QUEUED job; returns the job."""
+    job = IngestJob(
+        id=uuid.uuid4(),
+        status="QUEUED",
+        payload=[event.model_dump() for event in events],
+        chunk_size=chunk_size,
+        total=len(events),
+        processed=0,
+        summary=dict(EMPTY_SUMMARY),
+    )
+    db.add(job)
+    db.commit()
+
+    logger.info(
+        "ingest_job_queued",
+        extra={
+            "channel": "ingest",
+            "context": {"job_id": str(job.id)},
+            "extra_data": {"total": job.total, "chunk_size": chunk_size},
+        },
+    )
+    return job
+
+
+def job_status(db, job_id, include_results=True):
+    job = db.get(IngestJob, job_id)
+    if not job:
+        return None
+
+    status = {
+        "job_id": str(job.id),
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "summary": job.summary,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+    if include_results:
+        rows = db.execute(
+            select(IngestJobChunk.results)
+            .where(IngestJobChunk.job_id == job.id)
+            .order_by(IngestJobChunk.offset)
+        ).scalars()
+        status["results"] = [r for chunk in rows for r in chunk]
+
+    return status
+
+
+# =========================================================
+# Claiming / running
+# =========================================================
+
+def claim(db, worker_id):
+    """Take the oldest runnable job; None if the queue is empty.
+
+    SKIP LOCKED lets several workers claim concurrently without
+    blocking on each other's candidate row (ignored on SQLite).
+    """
+    now = datetime.utcnow()
+
+    job = db.execute(
+        select(IngestJob)
+        .where(
+            or_(
+                IngestJob.status == "QUEUED",
+                and_(
+                    IngestJob.status == "RUNNING",
+                    IngestJob.heartbeat_at < now - JOB_LEASE,
+                ),
+            )
+        )
+        .order_by(IngestJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "RUNNING"
+    job.worker_id = worker_id
+    job.heartbeat_at = now
+    job.started_at = job.started_at or now
+    db.commit()
+    return job
+
+
+def _owned(job_id, worker_id):
+    """UPDATE of the job, fenced on the worker that claimed it."""
+    return update(IngestJob).where(
+        IngestJob.id == job_id,
+        IngestJob.status == "RUNNING",
+        IngestJob.worker_id == worker_id,
+    )
+
+
+def _write_owned(db, stmt):
+    if db.execute(stmt).rowcount != 1:
+        raise LeaseLost()
+
+
+def run(db, job, worker_id):
+    """Process the job's remaining chunks, resuming at job.processed.
+
+    Each chunk's outcomes and the job's progress are written in the
+    chunk's own transaction, so a crashed worker's job resumes exactly
+    after the last committed chunk. Every progress write checks the job
+    is still this worker's; if a stalled worker lost its lease, its
+    chunk rolls back with LeaseLost instead of racing the new owner.
+    """
+    # Read once: touching `job` after a commit would reload the payload
+    job_id, events, chunk_size = job.id, job.payload, job.chunk_size
+    summary = dict(job.summary)
+
+    for offset in range(job.processed, job.total, chunk_size):
+        chunk = [
+            AttemptEvent.model_validate(e)
+            for e in events[offset : offset + chunk_size]
+        ]
+
+        def record(results, offset=offset, size=len(chunk)):
+            # `summary` only moves once the chunk has committed; a failed
+            # or retried transaction calls this again
+            counts = summarize(results)
+            _write_owned(
+                db,
+                _owned(job_id, worker_id).values(
+                    processed=offset + size,
+                    summary={k: summary[k] + counts[k] for k in summary},
+                    heartbeat_at=datetime.utcnow(),
+                ),
+            )
+            db.add(IngestJobChunk(job_id=job_id, offset=offset, results=results))
+
+        results = ingest_chunk(db, chunk, offset, before_commit=record)
+        for k, v in summarize(results).items():
+            summary[k] += v
+
+    _write_owned(
+        db,
+        _owned(job_id, worker_id).values(
+            status="COMPLETED", finished_at=datetime.utcnow()
+        ),
+    )
+    db.commit()
+
+    logger.info(
+        "ingest_job_completed",
+        extra={
+            "channel": "ingest",
+            "context": {"job_id": str(job_id)},
+            "extra_data": summary,
+        },
+    )
+
+
+def fail(db, job_id, worker_id, exc):
+    db.rollback()
+    db.execute(
+        _owned(job_id, worker_id)
+        .values(status="FAILED", error=str(exc), finished_at=datetime.utcnow())
+    )
+    db.commit()
+
+    logger.error(
+        "ingest_job_failed",
+        extra={
+            "channel": "ingest",
+            "context": {"job_id": str(job_id)},
+            "extra_data": {"error": str(exc)},
+        },
+    )
+
+
+# =========================================================
+# Worker pool
+# =========================================================
+
+class IngestWorkerPool:
+    """Threads that drain ingest_jobs.
+
+    The pool has its own engine sized to the worker count, so ingest
+    never waits on (or holds) connections the request handlers use.
+    Throughput scales with `workers`; to keep ingest CPU out of the API
+    process entirely, run the app with INGEST_WORKERS=0 and start
+    `python cli.py ingest-worker --workers N` separately.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS, poll_interval=POLL_INTERVAL_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._engine = None
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+
+        self._engine = create_engine(
+            DATABASE_URL,
+            **pool_options(DATABASE_URL, pool_size=self.workers, max_overflow=0),
+        )
+        instrument("ingest_workers", self._engine)
+        session_factory = sessionmaker(bind=self._engine)
+        self._stop.clear()
+
+        for n in range(self.workers):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{n}"
+            thread = threading.Thread(
+                target=self._loop,
+                args=(session_factory, worker_id),
+                name=f"ingest-worker-{n}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _loop(self, session_factory, worker_id):
+        while not self._stop.is_set():
+            db = session_factory()
+            try:
+                job = claim(db, worker_id)
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                job_id = job.id
+                try:
+                    run(db, job, worker_id)
+                except LeaseLost:
+                    db.rollback()
+                    logger.warning(
+                        "ingest_job_lease_lost",
+                        extra={
+                            "channel": "ingest",
+                            "context": {"job_id": str(job_id), "worker_id": worker_id},
+                        },
+                    )
+                except Exception as exc:
+                    fail(db, job_id, worker_id, exc)
+            except Exception as exc:
+                # DB unreachable etc.; back off and retry
+                logger.error(
+                    "ingest_worker_error",
+                    extra={
+                        "channel": "ingest",
+                        "context": {"worker_id": worker_id},
+                        "extra_data": {"error": str(exc)},
+                    },
+                )
+                self._stop.wait(self.poll_interval)
+            finally:
+                db.close()
+
+
+workers = IngestWorkerPool()
@@ -0,0 +1,518 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, false, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import Attempt, AttemptScore, LeaderboardEntry, LeaderboardRemoval
+from catalog import catalog
+from logger import logger
+from utils import as_uuid
+
+
+# =========================================================
+# Ranking (DECISIONS.md §7)
+# =========================================================
+
+RANK_FIELDS = ("score", "accuracy", "net_correct", "submitted_at")
+
+
+def rank_order(score, accuracy, net_correct, submitted_at):
+    """ORDER BY clauses: best first, earlier submission wins ties."""
+    return [
+        score.desc(),
+        accuracy.desc(),
+        net_correct.desc(),
+        submitted_at.asc().nulls_last(),
+    ]
+
+
+def _better(new, old):
+    """SQL condition: ranking tuple `new` beats `old` (both column holders)."""
+    return or_(
+        new.score > old.score,
+        and_(new.score == old.score, new.accuracy > old.accuracy),
+        and_(
+            new.score == old.score,
+            new.accuracy == old.accuracy,
+            new.net_correct > old.net_correct,
+        ),
+        and_(
+            new.score == old.score,
+            new.accuracy == old.accuracy,
+            new.net_correct == old.net_correct,
+            or_(
+                new.submitted_at < old.submitted_at,
+                and_(new.submitted_at.isnot(None), old.submitted_at.is_(None)),
+            ),
+        ),
+    )
+
+
+def sort_key(row):
+    submitted_at = row["submitted_at"]
+    return (
+        -row["score"],
+        -row["accuracy"],
+        -row["net_correct"],
+        submitted_at is None,
+        submitted_at or datetime.min,
+    )
+
+
+def entry_row(test_id, student_id, attempt_id, submitted_at, score_data):
+    return {
+        "test_id": test_id,
+        "student_id": student_id,
+        "attempt_id": attempt_id,
+        "score": score_data["score"],
+        "accuracy": score_data["accuracy"],
+        "net_correct": score_data["net_correct"],
+        "submitted_at": submitted_at,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+# =========================================================
+# Incremental maintenance
+# =========================================================
+
+def _insert(db, model=LeaderboardEntry):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"leaderboard upsert not supported on {dialect}")
+
+
+def _upsert(db, rows, replacing=None):
+    """Insert entries, or update existing ones the new row beats.
+
+    With `replacing` (an attempt id, or None for "no entry was there"),
+    the stored entry is also overwritten while it still points at that
+    attempt, so a worse attempt can take its place.
+    """
+    stmt = _insert(db)
+    table = LeaderboardEntry.__table__
+
+    where = _better(stmt.excluded, table.c)
+    if replacing is not None:
+        where = or_(table.c.attempt_id == replacing, where)
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.test_id, table.c.student_id],
+        set_={
+            name: stmt.excluded[name]
+            for name in ("attempt_id", *RANK_FIELDS, "updated_at")
+        },
+        where=where,
+    )
+    db.execute(stmt, rows)
+
+
+def _remove(db, *where):
+    """Delete the entries matching `where` and stamp a LeaderboardRemoval
+    for each; returns the deleted (test_id, student_id) pairs."""
+    table = LeaderboardEntry.__table__
+    removed = db.execute(
+        table.delete().where(*where).returning(table.c.test_id, table.c.student_id)
+    ).all()
+
+    if removed:
+        now = datetime.utcnow()
+        stmt = _insert(db, LeaderboardRemoval)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LeaderboardRemoval.test_id, LeaderboardRemoval.student_id],
+            set_={"removed_at": stmt.excluded.removed_at},
+        )
+        db.execute(stmt, [
+            {"test_id": test_id, "student_id": student_id, "removed_at": now}
+            for test_id, student_id in sorted(removed)
+        ])
+    return removed
+
+
+def apply_scores(db, rows):
+    """Fold newly SCORED attempts in; an entry only changes if beaten.
+
+    rows are entry_row() dicts. Several rows for one student collapse to
+    the best before hitting the database, since one upsert statement
+    can't touch the same row twice. They are written in (test_id,
+    student_id) order, so concurrent chunks lock entries in the same
+    order instead of deadlocking.
+    """
+    best = {}
+    for row in rows:
+        key = (row["test_id"], row["student_id"])
+        if key not in best or sort_key(row) < sort_key(best[key]):
+            best[key] = row
+
+    if best:
+        _upsert(db, [best[key] for key in sorted(best)])
+
+
+def refresh(db, pairs):
+    """Re-derive entries for (test_id, student_id) pairs from attempts.
+
+    For changes that can make a student's best attempt worse or remove
+    it: recompute, flag, student merge.
+
+    The entry is read before the attempts and only replaced or deleted
+    while it still points at the attempt read; an apply_scores that
+    committed a better attempt in between is kept (see _upsert).
+    """
+    table = LeaderboardEntry.__table__
+
+    for test_id, student_id in sorted(set(pairs)):
+        current = db.execute(
+            select(LeaderboardEntry.attempt_id).where(
+                LeaderboardEntry.test_id == test_id,
+                LeaderboardEntry.student_id == student_id,
+            )
+        ).scalar()
+
+        best = (
+            db.query(
+                Attempt.id,
+                Attempt.submitted_at,
+                AttemptScore.score,
+                AttemptScore.accuracy,
+                AttemptScore.net_correct,
+            )
+            .join(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+            .filter(
+                Attempt.test_id == test_id,
+                Attempt.student_id == student_id,
+                Attempt.status == "SCORED",
+            )
+            .order_by(*rank_order(
+                AttemptScore.score,
+                AttemptScore.accuracy,
+                AttemptScore.net_correct,
+                Attempt.submitted_at,
+            ))
+            .first()
+        )
+
+        if best is None:
+            if current is not None:
+                _remove(
+                    db,
+                    table.c.test_id == test_id,
+                    table.c.student_id == student_id,
+                    table.c.attempt_id == current,
+                )
+            continue
+
+        _upsert(
+            db,
+            [entry_row(test_id, student_id, best.id, best.submitted_at, best._asdict())],
+            replacing=current,
+        )
+
+
+def forget_student(db, student_id):
+    """Drop a student's entries; returns the test ids they were on."""
+    removed = _remove(db, LeaderboardEntry.__table__.c.student_id == student_id)
+    return [test_id for test_id, _ in removed]
+
+
+# =========================================================
+# Rebuild / consistency
+# =========================================================
+
+def rebuild(db, test_id):
+    """Recreate every entry of a test from attempts in one INSERT .. SELECT."""
+    ranked = (
+        select(
+            Attempt.test_id,
+            Attempt.student_id,
+            Attempt.id.label("attempt_id"),
+            AttemptScore.score,
+            AttemptScore.accuracy,
+            AttemptScore.net_correct,
+            Attempt.submitted_at,
+            func.row_number().over(
+                partition_by=Attempt.student_id,
+                order_by=rank_order(
+                    AttemptScore.score,
+                    AttemptScore.accuracy,
+                    AttemptScore.net_correct,
+                    Attempt.submitted_at,
+                ),
+            ).label("rn"),
+        )
+        .join(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+        .where(Attempt.test_id == test_id, Attempt.status == "SCORED")
+        .subquery()
+    )
+
+    columns = ["test_id", "student_id", "attempt_id", *RANK_FIELDS]
+
+    _remove(db, LeaderboardEntry.__table__.c.test_id == test_id)
+
+    inserted = db.execute(
+        LeaderboardEntry.__table__.insert().from_select(
+            columns,
+            select(*[ranked.c[name] for name in columns]).where(ranked.c.rn == 1),
+        )
+    ).rowcount
+
+    catalog.bump_data_version(db, [test_id])
+    db.commit()
+
+    logger.info(
+        "leaderboard_rebuilt",
+        extra={
+            "channel": "leaderboard",
+            "context": {"test_id": str(test_id)},
+            "extra_data": {"entries": inserted},
+        },
+    )
+    return inserted
+
+
+def legacy_ranking(db, test_id):
+    """The original in-Python ranking, kept as the reference algorithm."""
+    rows = (
+        db.query(Attempt, AttemptScore)
+        .join(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+        .filter(Attempt.test_id == test_id, Attempt.status == "SCORED")
+        .all()
+    )
+
+    best = {}
+
+    for attempt, score in rows:
+        row = {
+            "student_id": attempt.student_id,
+            "attempt_id": attempt.id,
+            "score": score.score,
+            "accuracy": score.accuracy,
+            "net_correct": score.net_correct,
+            "submitted_at": attempt.submitted_at,
+        }
+        sid = attempt.student_id
+        if sid not in best or sort_key(row) < sort_key(best[sid]):
+            best[sid] = row
+
+    return sorted(best.values(), key=sort_key)
+
+
+def check_consistency(db, test_id):
+    """Compare the table against legacy_ranking; returns mismatch dicts.
+
+    Attempts tied on the whole ranking tuple are interchangeable, so
+    entries are compared on student and ranking values, not attempt id.
+    """
+    expected = {
+        r["student_id"]: tuple(r[f] for f in RANK_FIELDS)
+        for r in legacy_ranking(db, test_id)
+    }
+    actual = {
+        e.student_id: tuple(getattr(e, f) for f in RANK_FIELDS)
+        for e in db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.test_id == test_id
+        )
+    }
+
+    mismatches = []
+    for sid in expected.keys() | actual.keys():
+        if expected.get(sid) != actual.get(sid):
+            mismatches.append({
+                "student_id": str(sid),
+                "expected": expected.get(sid),
+                "actual": actual.get(sid),
+            })
+    return mismatches
+
+
+# =========================================================
+# Keyset cursors
+# =========================================================
+
+def encode_cursor(row):
+    """Opaque cursor for the position right after a page's last row."""
+    submitted_at = row["submitted_at"]
+    raw = json.dumps([
+        row["score"],
+        row["accuracy"],
+        row["net_correct"],
+        submitted_at.isoformat() if submitted_at else None,
+        str(row["student_id"]),
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        score, accuracy, net_correct, submitted_at, student_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        return {
+            "score": int(score),
+            "accuracy": float(accuracy),
+            "net_correct": int(net_correct),
+            "submitted_at": (
+                datetime.fromisoformat(submitted_at) if submitted_at else None
+            ),
+            "student_id": as_uuid(student_id),
+        }
+    except (TypeError, ValueError, json.JSONDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _after(cols, cursor):
+    """Rows strictly after `cursor` in rank_order + student_id order."""
+    if cursor["submitted_at"] is None:
+        # NULLS LAST: only other NULL submissions can follow
+        submitted_later = false()
+        submitted_same = cols.submitted_at.is_(None)
+    else:
+        submitted_later = or_(
+            cols.submitted_at > cursor["submitted_at"],
+            cols.submitted_at.is_(None),
+        )
+        submitted_same = cols.submitted_at == cursor["submitted_at"]
+
+    # The leading bound is redundant, but it is what lets the planner
+    # seek the (test_id, score, ...) index instead of filtering the OR
+    return and_(cols.score <= cursor["score"], or_(
+        cols.score < cursor["score"],
+        and_(
+            cols.score == cursor["score"],
+            or_(
+                cols.accuracy < cursor["accuracy"],
+                and_(
+                    cols.accuracy == cursor["accuracy"],
+                    or_(
+                        cols.net_correct < cursor["net_correct"],
+                        and_(
+                            cols.net_correct == cursor["net_correct"],
+                            or_(
+                                submitted_later,
+                                and_(
+                                    submitted_same,
+                                    cols.student_id > cursor["student_id"],
+                                ),
+                            ),
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    ))
+
+
+def _page_order(cols):
+    return [
+        *rank_order(cols.score, cols.accuracy, cols.net_correct, cols.submitted_at),
+        cols.student_id.asc(),
+    ]
+
+
+def _serialize(rows):
+    return [
+        {
+            "student_id": str(r.student_id),
+            "attempt_id": str(r.attempt_id),
+            "score": r.score,
+            "accuracy": r.accuracy,
+            "net_correct": r.net_correct,
+            "submitted_at": r.submitted_at,
+        }
+        for r in rows
+    ]
+
+
+def _paginate(db, stmt, cols, page, page_size, cursor):
+    stmt = stmt.order_by(*_page_order(cols))
+
+    if cursor is not None:
+        stmt = stmt.where(_after(cols, cursor))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+
+    # One extra row tells us whether there is a next page
+    rows = db.execute(stmt.limit(page_size + 1)).all()
+    data = _serialize(rows[:page_size])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        next_cursor = encode_cursor(data[-1])
+
+    return data, next_cursor
+
+
+# =========================================================
+# Reads
+# =========================================================
+
+def page(db, test_id, page, page_size, cursor=None):
+    """Page of leaderboard_entries; returns (total, data, next_cursor)."""
+    total = db.query(func.count()).select_from(LeaderboardEntry).filter(
+        LeaderboardEntry.test_id == test_id
+    ).scalar()
+
+    cols = LeaderboardEntry.__table__.c
+    stmt = select(
+        cols.student_id,
+        cols.attempt_id,
+        cols.score,
+        cols.accuracy,
+        cols.net_correct,
+        cols.submitted_at,
+    ).where(cols.test_id == test_id)
+
+    data, next_cursor = _paginate(db, stmt, cols, page, page_size, cursor)
+    return total, data, next_cursor
+
+
+def live_page(db, test_id, page, page_size, cursor=None):
+    """Same page computed from attempts with a window function.
+
+    Best attempt per student and the §7 ordering both run in the
+    database; only page_size + 1 rows come back.
+    """
+    ranked = (
+        select(
+            Attempt.student_id,
+            Attempt.id.label("attempt_id"),
+            AttemptScore.score,
+            AttemptScore.accuracy,
+            AttemptScore.net_correct,
+            Attempt.submitted_at,
+            func.row_number().over(
+                partition_by=Attempt.student_id,
+                order_by=rank_order(
+                    AttemptScore.score,
+                    AttemptScore.accuracy,
+                    AttemptScore.net_correct,
+                    Attempt.submitted_at,
+                ),
+            ).label("rn"),
+        )
+        .join(AttemptScore, Attempt.id == AttemptScore.attempt_id)
+        .where(Attempt.test_id == test_id, Attempt.status == "SCORED")
+        .subquery()
+    )
+
+    total = db.execute(
+        select(func.count()).select_from(ranked).where(ranked.c.rn == 1)
+    ).scalar()
+
+    cols = ranked.c
+    stmt = select(
+        cols.student_id,
+        cols.attempt_id,
+        cols.score,
+        cols.accuracy,
+        cols.net_correct,
+        cols.submitted_at,
+    ).where(cols.rn == 1)
+
+    data, next_cursor = _paginate(db, stmt, cols, page, page_size, cursor)
+    return total, data, next_cursor
@@ -1,23 +1,221 @@
-
+import atexit
 import logging
 import json
-from datetime import datetime
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:  # plain json fallback
+    orjson = None
+
+
+# "queue": records go to a background writer thread; "sync": written inline
+LOG_MODE = os.getenv("LOG_MODE", "queue")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+
+
+def _parse_rates(spec):
+    """"score_computed=0.01,http=1" -> {"score_computed": 0.01, "http": 1.0}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        rates[key.strip()] = float(value)
+    return rates
+
+
+# Keyed by message or channel; message wins when both are listed
+LOG_SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+# Max records per second, same keys
+LOG_RATE_LIMITS = _parse_rates(os.getenv("LOG_RATE_LIMITS", ""))
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, default=str)
+
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         log_record = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # Time of the logging call, not of the (possibly later) write
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc)
+            .replace(tzinfo=None)
+            .isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "channel": getattr(record, "channel", "app"),
             "context": getattr(record, "context", {}),
             "extra": getattr(record, "extra_data", {})
         }
-        return json.dumps(log_record)
+        return dumps(log_record)
+
+
+# =========================================================
+# Sampling / rate limits
+# =========================================================
+
+class SamplingFilter(logging.Filter):
+    """Drops records per LOG_SAMPLE_RATES / LOG_RATE_LIMITS before they
+    are queued. Warnings and errors always pass."""
+
+    def __init__(self, rates=None, limits=None):
+        super().__init__()
+        self.rates = rates if rates is not None else LOG_SAMPLE_RATES
+        self.limits = limits if limits is not None else LOG_RATE_LIMITS
+        self._windows = {}
+        self.dropped = 0
+
+    def _rule(self, table, record):
+        """(matched key, value), or (None, None) when nothing is listed."""
+        for key in (record.msg, getattr(record, "channel", "app")):
+            rule = table.get(key)
+            if rule is not None:
+                return key, rule
+        return None, None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        _, rate = self._rule(self.rates, record)
+        if rate is not None and random.random() >= rate:
+            self.dropped += 1
+            return False
+
+        # One budget per rule: a channel limit covers all its messages
+        key, limit = self._rule(self.limits, record)
+        if limit is not None:
+            second = int(time.monotonic())
+            window, count = self._windows.get(key, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= limit:
+                self.dropped += 1
+                return False
+            self._windows[key] = (window, count + 1)
+
+        return True
+
+
+# =========================================================
+# Background writer
+# =========================================================
+
+class QueueHandler(logging.Handler):
+    """Hands records to a BackgroundWriter without formatting them.
+
+    Only the message args are resolved here, since they may be mutated
+    before the writer thread gets to the record. A full queue drops the
+    record rather than blocking the request.
+    """
+
+    def __init__(self, log_queue, max_size=LOG_QUEUE_SIZE):
+        super().__init__()
+        self.queue = log_queue
+        self.max_size = max_size
+        self.dropped = 0
+
+    def emit(self, record):
+        try:
+            if record.args:
+                record.msg = record.getMessage()
+                record.args = None
+
+            # SimpleQueue has no bound of its own; qsize() is cheap
+            if self.queue.qsize() >= self.max_size:
+                self.dropped += 1
+                return
+
+            self.queue.put(record)
+        except Exception:
+            self.handleError(record)
+
+
+class BackgroundWriter:
+    """Thread that formats queued records and writes them in batches:
+    one write + flush per batch of up to LOG_BATCH_SIZE lines. A record
+    that fails to format is dropped (counted in `failed`); it must not
+    take the thread, and every later log line, down with it."""
+
+    _STOP = object()
+
+    def __init__(self, log_queue, stream=None, formatter=None, batch_size=LOG_BATCH_SIZE):
+        self.queue = log_queue
+        self.stream = stream or sys.stderr
+        self.formatter = formatter or JsonFormatter()
+        self.batch_size = batch_size
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Write everything queued so far, then end the thread."""
+        if self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def _format(self, record):
+        try:
+            return self.formatter.format(record)
+        except Exception:
+            self.failed += 1
+            return None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(record is self._STOP for record in batch)
+            lines = [
+                line
+                for line in (
+                    self._format(record) for record in batch if record is not self._STOP
+                )
+                if line is not None
+            ]
+
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+
+            if stop:
+                return
+
 
 logger = logging.getLogger("assessment")
 logger.setLevel(logging.INFO)
 
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
+sampler = SamplingFilter()
+logger.addFilter(sampler)
+
+if LOG_MODE == "queue":
+    # Lock-free put, unlike queue.Queue's condition variable
+    log_queue = queue.SimpleQueue()
+    handler = QueueHandler(log_queue)
+    writer = BackgroundWriter(log_queue)
+    writer.start()
+    atexit.register(writer.stop)
+else:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+
 logger.addHandler(handler)
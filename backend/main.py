@@ -1,28 +1,66 @@
+import json
 import uuid
 import time
+import zlib
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional, List, Dict
 
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
-
-from database import SessionLocal
-from models import Student, Test, Attempt, AttemptScore, Flag
-from utils import normalize_email, normalize_phone
-from scoring import compute_score
-from dedup import is_duplicate
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+
+from database import (
+    SessionLocal,
+    ReadSessionLocal,
+    AsyncReadSessionLocal,
+    async_engine,
+    async_read_engine,
+    pool_stats,
+)
+from models import Test, Attempt, AttemptPayload, AttemptScore, Flag, RecomputeRun
+from utils import normalize_email, normalize_phone, as_uuid
+from scoring import score_plan
+from catalog import catalog
+from dedup import is_duplicate, DEDUP_WINDOW
+from identity import identity
+import leaderboard as leaderboard_entries
+import ranking
+import analytics
+import attempt_queries
+import export
+from ingest import bulk_ingest, stream_ingest, summarize, DEFAULT_CHUNK_SIZE
+import jobs
+import metrics
+import payloads
+from http_cache import cached_json, content_etag_response, response_cache
+import recompute
 from logger import logger
-from schemas import AttemptEvent, FlagRequest
+from schemas import AttemptEvent, FlagRequest, MergeRequest, AnswerKeyUpdate
 
 
 # =========================================================
 # App Setup
 # =========================================================
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # INGEST_WORKERS=0 leaves async ingest to `cli.py ingest-worker`
+    jobs.workers.start()
+    yield
+    jobs.workers.stop(timeout=10)
+    # asyncpg connections belong to this event loop
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,7 +78,8 @@ app.add_middleware(
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     request_id = str(uuid.uuid4())
-    start_time = time.time()
+    start_time = time.perf_counter()
+    db_usage, db_token = metrics.track_request_db()
 
     logger.info(
         "request_started",
@@ -56,9 +95,21 @@ async def log_requests(request: Request, call_next):
         },
     )
 
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.reset_request_db(db_token)
+
+    elapsed = time.perf_counter() - start_time
+    duration = round(elapsed * 1000, 2)
+
+    # Route template, not the path, so ids do not become label values
+    route = request.scope.get("route")
+    route = route.path if route else "unmatched"
 
-    duration = round((time.time() - start_time) * 1000, 2)
+    metrics.REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(elapsed)
+    metrics.DB_QUERIES_PER_REQUEST.labels(route).observe(db_usage[0])
+    metrics.DB_SECONDS_PER_REQUEST.labels(route).observe(db_usage[1])
 
     logger.info(
         "request_completed",
@@ -88,6 +139,33 @@ def get_db():
         db.close()
 
 
+async def get_read_db():
+    """Read-only endpoints: READ_REPLICA_URL when set, else the primary.
+
+    Asyncio engine, so a slow query never pins a threadpool thread. The
+    query helpers stay sync and run through run_sync, which drives them
+    on the event loop via greenlets. Anything that writes (ingest,
+    recompute, flag, merge) uses get_db and the primary.
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+@app.get("/api/health/db")
+def db_health():
+    return pool_stats()
+
+
+@app.get("/api/health/cache")
+def cache_health():
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 
 
 
@@ -96,7 +174,29 @@ def get_db():
 # =========================================================
 
 @app.post("/api/ingest/attempts")
-def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
+def ingest_attempts(
+    payload: List[AttemptEvent],
+    bulk: bool = False,
+    run_async: bool = Query(False, alias="async"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+
+    if run_async:
+        job = jobs.enqueue(db, payload, chunk_size=chunk_size)
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": str(job.id), "status": job.status, "total": job.total},
+            headers={"Location": f"/api/ingest/jobs/{job.id}"},
+        )
+
+    if bulk:
+        results = bulk_ingest(db, payload, chunk_size=chunk_size)
+        return {
+            "message": "Ingested successfully",
+            "summary": summarize(results),
+            "results": results,
+        }
 
     for event in payload:
 
@@ -104,22 +204,16 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
         email = normalize_email(event.student.email)
         phone = normalize_phone(event.student.phone)
 
-        student = db.query(Student).filter(
-            (Student.email == email) | (Student.phone == phone)
-        ).first()
+        student_id = identity.resolve(db, email, phone)
 
-        if not student:
-            student = Student(
-                full_name=event.student.full_name,
-                email=email,
-                phone=phone,
+        if not student_id:
+            student_id = identity.create(
+                db, event.student.full_name, email, phone
             )
-            db.add(student)
             db.commit()
-            db.refresh(student)
 
         # Create or fetch test
-        test = db.query(Test).filter(Test.name == event.test.name).first()
+        test = catalog.get_by_name(db, event.test.name)
 
         if not test:
             test = Test(
@@ -131,6 +225,7 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
             db.add(test)
             db.commit()
             db.refresh(test)
+            test = catalog.remember(test)
 
         # Parse timestamps safely
         try:
@@ -147,28 +242,36 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
                     "context": {"source_event_id": event.source_event_id},
                 },
             )
+            metrics.INGEST_EVENTS.labels("REJECTED").inc()
             continue
 
         attempt = Attempt(
-            student_id=student.id,
+            id=uuid.uuid4(),
+            student_id=student_id,
             test_id=test.id,
             source_event_id=event.source_event_id,
             started_at=started_at,
             submitted_at=submitted_at,
             answers=event.answers,
-            raw_payload=event.dict(),
             status="INGESTED",
         )
 
-        # Dedup
-        existing_attempts = db.query(Attempt).filter(
+        # Dedup: only attempts inside the 7 minute window can match
+        existing_attempts = db.query(
+            Attempt.id, Attempt.started_at, Attempt.answers
+        ).filter(
             and_(
-                Attempt.student_id == student.id,
+                Attempt.student_id == student_id,
                 Attempt.test_id == test.id,
+                Attempt.started_at.between(
+                    started_at - DEDUP_WINDOW, started_at + DEDUP_WINDOW
+                ),
             )
-        ).all()
+        ).order_by(Attempt.started_at).all()
 
         duplicate_found = False
+        metrics.DEDUP_CANDIDATES.observe(len(existing_attempts))
+        compare_started = time.perf_counter()
 
         for existing in existing_attempts:
             similarity = is_duplicate(attempt, existing)
@@ -189,15 +292,25 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
                 )
                 break
 
+        if existing_attempts:
+            metrics.DEDUP_COMPARE_SECONDS.observe(time.perf_counter() - compare_started)
+
         db.add(attempt)
+        db.add(AttemptPayload(**payloads.compact(attempt.id, event, test)))
+        # A scored attempt bumps once, with its score below
+        if duplicate_found:
+            catalog.bump_data_version(db, [test.id])
         db.commit()
         db.refresh(attempt)
 
         # Scoring
         if not duplicate_found:
-            start_score_time = time.time()
+            start_score_time = time.perf_counter()
 
-            score_data = compute_score(test, event.answers)
+            score_data = score_plan(test.plan, event.answers)
+            score_time = time.perf_counter() - start_score_time
+            metrics.SCORING_SECONDS.labels("single").observe(score_time)
+            metrics.SCORED_ATTEMPTS.labels("single").inc()
 
             logger.info(
                 "score_computed",
@@ -207,11 +320,7 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
                         "attempt_id": str(attempt.id),
                         "score": score_data["score"],
                     },
-                    "extra_data": {
-                        "duration_ms": round(
-                            (time.time() - start_score_time) * 1000, 2
-                        )
-                    },
+                    "extra_data": {"duration_ms": round(score_time * 1000, 2)},
                 },
             )
 
@@ -229,11 +338,90 @@ def ingest_attempts(payload: List[AttemptEvent], db: Session = Depends(get_db)):
             )
 
             attempt.status = "SCORED"
+
+            leaderboard_entries.apply_scores(db, [
+                leaderboard_entries.entry_row(
+                    test.id, student_id, attempt.id, submitted_at, score_data
+                )
+            ])
+            catalog.bump_data_version(db, [test.id])
             db.commit()
 
+        metrics.INGEST_EVENTS.labels(attempt.status).inc()
+
     return {"message": "Ingested successfully"}
 
 
+class RequestBodyStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator reads the request body.
+
+    The stock class listens for http.disconnect on `receive` while
+    streaming, which would swallow the request body messages the
+    generator is still reading; a disconnect surfaces from
+    request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/api/ingest/attempts/stream")
+async def ingest_attempts_stream(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+):
+    """NDJSON AttemptEvents in (gzip with Content-Encoding: gzip), one
+    NDJSON line of results out per committed chunk, then a summary line."""
+    compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+
+    async def chunks():
+        # Owned here, not via get_db: it must outlive the handler
+        db = SessionLocal()
+        totals = summarize([])
+        try:
+            async for first_line, results in stream_ingest(
+                db, request.stream(), chunk_size, compressed
+            ):
+                summary = summarize(results)
+                for k, v in summary.items():
+                    totals[k] += v
+
+                yield json.dumps({
+                    "first_line": first_line,
+                    "summary": summary,
+                    "results": results,
+                }) + "\n"
+        except (ValueError, zlib.error) as exc:
+            yield json.dumps({"error": str(exc), "summary": totals}) + "\n"
+            return
+        finally:
+            db.close()
+
+        yield json.dumps({"done": True, "summary": totals}) + "\n"
+
+    return RequestBodyStreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/api/ingest/jobs/{job_id}")
+def ingest_job(
+    job_id: str,
+    results: bool = True,
+    db: Session = Depends(get_db),
+):
+    try:
+        job_id = as_uuid(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    status = jobs.job_status(db, job_id, include_results=results)
+    if not status:
+        raise HTTPException(status_code=404)
+
+    return status
+
+
 # =========================================================
 # Recompute
 # =========================================================
@@ -248,9 +436,11 @@ def recompute_attempt(attempt_id: str, db: Session = Depends(get_db)):
     if attempt.status == "DEDUPED":
         raise HTTPException(status_code=400)
 
-    test = db.query(Test).filter(Test.id == attempt.test_id).first()
+    test = catalog.get_by_id(db, attempt.test_id, validate=True)
 
-    score_data = compute_score(test, attempt.answers)
+    with metrics.SCORING_SECONDS.labels("single").time():
+        score_data = score_plan(test.plan, attempt.answers)
+    metrics.SCORED_ATTEMPTS.labels("single").inc()
 
     existing = db.query(AttemptScore).filter(
         AttemptScore.attempt_id == attempt.id
@@ -263,11 +453,54 @@ def recompute_attempt(attempt_id: str, db: Session = Depends(get_db)):
         db.add(AttemptScore(attempt_id=attempt.id, **score_data))
 
     attempt.status = "SCORED"
+
+    leaderboard_entries.refresh(db, [(attempt.test_id, attempt.student_id)])
+    catalog.bump_data_version(db, [attempt.test_id])
     db.commit()
 
     return {"message": "Recomputed successfully"}
 
 
+@app.post("/api/tests/{test_id}/recompute")
+def recompute_test(
+    test_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    try:
+        test_id = as_uuid(test_id)
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    started = recompute.start(db, test_id)
+    if not started:
+        raise HTTPException(status_code=404)
+
+    run, should_execute = started
+    if should_execute:
+        background_tasks.add_task(recompute.execute, run.id)
+
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(recompute.run_status(run)),
+        headers={"Location": f"/api/tests/{test_id}/recompute/{run.id}"},
+        background=background_tasks,
+    )
+
+
+@app.get("/api/tests/{test_id}/recompute/{run_id}")
+def recompute_test_status(test_id: str, run_id: str, db: Session = Depends(get_db)):
+    try:
+        run = db.get(RecomputeRun, as_uuid(run_id))
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    if not run or str(run.test_id) != test_id:
+        raise HTTPException(status_code=404)
+
+    return recompute.run_status(run)
+
+
 # =========================================================
 # Flag
 # =========================================================
@@ -285,17 +518,43 @@ def flag_attempt(
 
     db.add(Flag(attempt_id=attempt.id, reason=flag_data.reason))
     attempt.status = "FLAGGED"
+    # Set even when it was FLAGGED already, for the detail view's version
+    attempt.updated_at = datetime.utcnow()
+
+    leaderboard_entries.refresh(db, [(attempt.test_id, attempt.student_id)])
+    catalog.bump_data_version(db, [attempt.test_id])
     db.commit()
 
     return {"message": "Attempt flagged successfully"}
 
 
+# =========================================================
+# Merge Students
+# =========================================================
+
+@app.post("/api/students/{student_id}/merge")
+def merge_students(
+    student_id: str,
+    merge_data: MergeRequest,
+    db: Session = Depends(get_db),
+):
+
+    if student_id == merge_data.into_student_id:
+        raise HTTPException(status_code=400)
+
+    target = identity.merge(db, student_id, merge_data.into_student_id)
+    if not target:
+        raise HTTPException(status_code=404)
+
+    return {"message": "Students merged successfully", "student_id": str(target.id)}
+
+
 # =========================================================
 # List Attempts
 # =========================================================
 
 @app.get("/api/attempts")
-def list_attempts(
+async def list_attempts(
     test_id: Optional[str] = None,
     student_id: Optional[str] = None,
     status: Optional[str] = None,
@@ -305,66 +564,121 @@ def list_attempts(
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern="^(exact|estimated|cached|none)$"),
+    db: AsyncSession = Depends(get_read_db),
 ):
 
-    query = db.query(Attempt).options(
-        joinedload(Attempt.student),
-        joinedload(Attempt.test),
-        joinedload(Attempt.score),
-        joinedload(Attempt.flags),
-    )
-
-    if test_id:
-        query = query.filter(Attempt.test_id == test_id)
-    if student_id:
-        query = query.filter(Attempt.student_id == student_id)
-    if status:
-        query = query.filter(Attempt.status == status)
-    if has_duplicates is not None:
-        query = query.filter(
-            Attempt.duplicate_of_attempt_id.isnot(None)
-            if has_duplicates
-            else Attempt.duplicate_of_attempt_id.is_(None)
-        )
-    if date_from:
-        query = query.filter(Attempt.started_at >= date_from)
-    if date_to:
-        query = query.filter(Attempt.started_at <= date_to)
-    if search:
-        query = query.join(Student).filter(
-            or_(
-                Student.full_name.ilike(f"%{search}%"),
-                Student.email.ilike(f"%{search}%"),
-                Student.phone.ilike(f"%{search}%"),
-            )
-        )
-
-    total = query.count()
+    try:
+        filters = {
+            "test_id": as_uuid(test_id) if test_id else None,
+            "student_id": as_uuid(student_id) if student_id else None,
+            "status": status,
+            "has_duplicates": has_duplicates,
+            "date_from": date_from,
+            "date_to": date_to,
+            "search": search,
+        }
+        after = attempt_queries.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400)
 
-    attempts = (
-        query.order_by(Attempt.started_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    total = await db.run_sync(attempt_queries.count, filters, count)
+    rows, next_cursor = await db.run_sync(
+        attempt_queries.list_page, filters, page, page_size, after
     )
 
-    return {
+    # Only str / int / bool / None: rendered as is, skipping jsonable_encoder
+    return JSONResponse({
         "total": total,
         "page": page,
         "page_size": page_size,
-        "data": [
-            {
-                "attempt_id": str(a.id),
-                "student": a.student.full_name if a.student else None,
-                "test": a.test.name if a.test else None,
-                "status": a.status,
-                "score": a.score.score if a.score else None,
-                "has_duplicates": a.duplicate_of_attempt_id is not None,
-            }
-            for a in attempts
-        ],
-    }
+        "next_cursor": next_cursor,
+        "data": attempt_queries.page_items(rows),
+    })
+
+
+@app.get("/api/attempts/{attempt_id}")
+async def attempt_detail(
+    request: Request,
+    attempt_id: str,
+    fields: Optional[str] = Query(None, description="answers,raw_payload,breakdown"),
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    try:
+        attempt_id = as_uuid(attempt_id)
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    try:
+        selected = attempt_queries.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    version = await db.run_sync(attempt_queries.detail_version, attempt_id)
+    if version is None:
+        raise HTTPException(status_code=404)
+
+    async def compute():
+        return await db.run_sync(attempt_queries.detail, attempt_id, selected)
+
+    return await cached_json(request, version, compute)
+
+
+# =========================================================
+# Export Attempts
+# =========================================================
+
+@app.get("/api/tests/{test_id}/export")
+async def export_attempts(
+    test_id: str,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    student_id: Optional[str] = None,
+    status: Optional[str] = None,
+    has_duplicates: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    search: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    try:
+        test_id = as_uuid(test_id)
+        filters = {
+            "student_id": as_uuid(student_id) if student_id else None,
+            "status": status,
+            "has_duplicates": has_duplicates,
+            "date_from": date_from,
+            "date_to": date_to,
+            "search": search,
+        }
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+    if format not in export.available_formats():
+        raise HTTPException(status_code=400, detail="parquet export needs pyarrow")
+
+    if await db.run_sync(catalog.data_version, test_id) is None:
+        raise HTTPException(status_code=404)
+
+    # Sync session on the read engine, owned by the generator: Starlette
+    # iterates it in the threadpool, one batch per step, so the cursor
+    # stays open exactly as long as the response
+    def body():
+        export_db = ReadSessionLocal()
+        try:
+            yield from export.stream(export_db, test_id, filters, format)
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        body(),
+        media_type=export.MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="attempts-{test_id}.{format}"',
+        },
+    )
 
 
 # =========================================================
@@ -372,73 +686,140 @@ def list_attempts(
 # =========================================================
 
 @app.get("/api/leaderboard")
-def leaderboard(
+async def leaderboard(
+    request: Request,
     test_id: str,
-    page: int = Query(1),
-    page_size: int = Query(10),
-    db: Session = Depends(get_db),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    source: str = Query("table", pattern="^(table|live)$"),
+    db: AsyncSession = Depends(get_read_db),
 ):
 
-    rows = (
-        db.query(Attempt, AttemptScore)
-        .join(AttemptScore, Attempt.id == AttemptScore.attempt_id)
-        .filter(Attempt.test_id == test_id, Attempt.status == "SCORED")
-        .all()
+    try:
+        test_id = as_uuid(test_id)
+        after = leaderboard_entries.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+    read_page = (
+        leaderboard_entries.live_page if source == "live"
+        else leaderboard_entries.page
     )
 
-    best = {}
-
-    for attempt, score in rows:
-        sid = attempt.student_id
-        candidate = {"attempt": attempt, "score": score}
-
-        if sid not in best:
-            best[sid] = candidate
-        else:
-            existing = best[sid]
-            if (
-                score.score > existing["score"].score
-                or (
-                    score.score == existing["score"].score
-                    and score.accuracy > existing["score"].accuracy
-                )
-                or (
-                    score.score == existing["score"].score
-                    and score.accuracy == existing["score"].accuracy
-                    and score.net_correct > existing["score"].net_correct
-                )
-                or (
-                    score.score == existing["score"].score
-                    and score.accuracy == existing["score"].accuracy
-                    and score.net_correct == existing["score"].net_correct
-                    and attempt.submitted_at < existing["attempt"].submitted_at
-                )
-            ):
-                best[sid] = candidate
-
-    leaderboard_list = [
-        {
-            "student_id": str(v["attempt"].student_id),
-            "attempt_id": str(v["attempt"].id),
-            "score": v["score"].score,
-            "accuracy": v["score"].accuracy,
-            "net_correct": v["score"].net_correct,
-            "submitted_at": v["attempt"].submitted_at,
+    async def compute():
+        total, data, next_cursor = await db.run_sync(
+            read_page, test_id, page, page_size, after
+        )
+        return {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "data": data,
         }
-        for v in best.values()
-    ]
 
-    leaderboard_list.sort(
-        key=lambda x: (-x["score"], -x["accuracy"], -x["net_correct"], x["submitted_at"])
-    )
+    version = await db.run_sync(catalog.data_version, test_id)
+    return await cached_json(request, version, compute)
 
-    total = len(leaderboard_list)
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "data": leaderboard_list[(page - 1) * page_size : page * page_size],
-    }
+
+@app.get("/api/tests/{test_id}/rank/{student_id}")
+async def student_rank(
+    request: Request,
+    test_id: str,
+    student_id: str,
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    try:
+        test_id = as_uuid(test_id)
+        student_id = as_uuid(student_id)
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+    version = await db.run_sync(catalog.data_version, test_id)
+    if version is None:
+        raise HTTPException(status_code=404)
+
+    def lookup():
+        rank_db = ReadSessionLocal()
+        try:
+            return ranking.student_rank(rank_db, test_id, student_id, version)
+        finally:
+            rank_db.close()
+
+    async def compute():
+        found = await run_in_threadpool(lookup)
+        if found is None:
+            raise HTTPException(status_code=404)
+        return found
+
+    return await cached_json(request, version, compute)
+
+
+@app.get("/api/tests/{test_id}/percentiles")
+async def score_percentiles(
+    request: Request,
+    test_id: str,
+    bins: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    try:
+        test_id = as_uuid(test_id)
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+    version = await db.run_sync(catalog.data_version, test_id)
+    if version is None:
+        raise HTTPException(status_code=404)
+
+    def lookup():
+        rank_db = ReadSessionLocal()
+        try:
+            return ranking.score_distribution(rank_db, test_id, version, bins)
+        finally:
+            rank_db.close()
+
+    async def compute():
+        return await run_in_threadpool(lookup)
+
+    return await cached_json(request, version, compute)
+
+
+# =========================================================
+# Item Analytics
+# =========================================================
+
+@app.get("/api/tests/{test_id}/analytics")
+async def item_analytics(
+    request: Request,
+    test_id: str,
+    db: AsyncSession = Depends(get_read_db),
+):
+
+    try:
+        test_id = as_uuid(test_id)
+    except ValueError:
+        raise HTTPException(status_code=400)
+
+    version = await db.run_sync(catalog.data_version, test_id)
+    if version is None:
+        raise HTTPException(status_code=404)
+
+    # A full build encodes every attempt's answers: numpy work that
+    # belongs in the threadpool, with its own sync read session
+    def build():
+        analytics_db = ReadSessionLocal()
+        try:
+            return analytics.item_analytics(analytics_db, test_id)
+        finally:
+            analytics_db.close()
+
+    async def compute():
+        return {"test_id": str(test_id), **await run_in_threadpool(build)}
+
+    return await cached_json(request, version, compute)
 
 
 # =========================================================
@@ -446,8 +827,37 @@ def leaderboard(
 # =========================================================
 
 @app.get("/api/tests")
-def list_tests(db: Session = Depends(get_db)):
-    return [
-        {"id": str(t.id), "name": t.name}
-        for t in db.query(Test).all()
-    ]
+async def list_tests(request: Request, db: AsyncSession = Depends(get_read_db)):
+    return content_etag_response(request, await db.run_sync(catalog.list_tests))
+
+
+# =========================================================
+# Update Answer Key
+# =========================================================
+
+@app.put("/api/tests/{test_id}/answer-key")
+def update_answer_key(
+    test_id: str,
+    key_data: AnswerKeyUpdate,
+    db: Session = Depends(get_db),
+):
+
+    try:
+        test_id = as_uuid(test_id)
+    except ValueError:
+        raise HTTPException(status_code=404)
+
+    try:
+        test = catalog.update_answer_key(
+            db,
+            test_id,
+            answer_key=key_data.answer_key,
+            negative_marking=key_data.negative_marking,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    if not test:
+        raise HTTPException(status_code=404)
+
+    return {"message": "Answer key updated successfully", "version": test.version}
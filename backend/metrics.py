@@ -0,0 +1,316 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Seconds; the default Prometheus client buckets plus a few sub-ms ones
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class _Shards:
+    """Per-thread value arrays, summed when scraped.
+
+    Each thread only ever writes its own list, so observe() / inc() take
+    no lock; the lock is taken once per thread (first write) and on scrape.
+    Lists of finished threads are kept so their counts are not lost.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def mine(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self.size
+            with self._lock:
+                self._all.append(values)
+            self._local.values = values
+            return values
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._all)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self.size
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+        if not self.labelnames:
+            self._children[()] = self._child()
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _label_text(self, values, extra=()):
+        pairs = [*zip(self.labelnames, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.mine()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def _samples(self, values, child):
+        yield f"{self.name}{self._label_text(values)} {_number(child.value())}"
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket, +Inf, then the sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        values = self._shards.mine()
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def _samples(self, values, child):
+        totals = child._shards.totals()
+        cumulative = 0
+
+        for bound, count in zip((*self.buckets, "+Inf"), totals):
+            cumulative += count
+            le = bound if bound == "+Inf" else _number(bound)
+            yield f"{self.name}_bucket{self._label_text(values, [('le', le)])} {cumulative}"
+
+        yield f"{self.name}_sum{self._label_text(values)} {_number(totals[-1])}"
+        yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# =========================================================
+# Registry
+# =========================================================
+
+_metrics = []
+_collectors = []
+
+
+def counter(name, documentation, labelnames=()):
+    metric = Counter(name, documentation, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, documentation, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collect):
+    """collect() -> [(name, type, help, [(labels dict, value), ...])],
+    called on every scrape; for values that are read, not counted
+    (pool usage)."""
+    _collectors.append(collect)
+
+
+def render():
+    """Everything registered, in the Prometheus text format (0.0.4)."""
+    lines = []
+
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    for collect in _collectors:
+        for name, kind, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{text}}} {_number(value)}" if text else f"{name} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# =========================================================
+# Metrics
+# =========================================================
+
+REQUEST_LATENCY = histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template.",
+    ("method", "route", "status"),
+)
+
+INGEST_EVENTS = counter(
+    "ingest_events_total",
+    "Ingested events by outcome.",
+    ("status",),
+)
+
+DEDUP_CANDIDATES = histogram(
+    "dedup_candidates",
+    "Stored attempts inside the dedup window of a new attempt.",
+    buckets=SIZE_BUCKETS,
+)
+DEDUP_COMPARE_SECONDS = histogram(
+    "dedup_compare_seconds",
+    "Time comparing one new attempt against its dedup candidates.",
+)
+
+SCORING_SECONDS = histogram(
+    "scoring_seconds",
+    "Time scoring one attempt (single) or one batch of attempts (batch).",
+    ("mode",),
+)
+SCORED_ATTEMPTS = counter(
+    "scored_attempts_total",
+    "Attempts scored, by mode.",
+    ("mode",),
+)
+
+ANALYTICS_REFRESH_SECONDS = histogram(
+    "item_analytics_refresh_seconds",
+    "Time bringing a test's item statistics up to date (incremental or full).",
+    ("mode",),
+)
+
+RANK_INDEX_SYNC_SECONDS = histogram(
+    "rank_index_sync_seconds",
+    "Time bringing a test's rank index up to date (incremental or full).",
+    ("mode",),
+)
+
+DB_QUERIES = counter(
+    "db_queries_total",
+    "Statements executed, by engine.",
+    ("engine",),
+)
+DB_QUERY_SECONDS = histogram(
+    "db_query_duration_seconds",
+    "Statement execution time, by engine.",
+    ("engine",),
+)
+DB_QUERIES_PER_REQUEST = histogram(
+    "http_request_db_queries",
+    "Statements executed while serving one request.",
+    ("route",),
+    buckets=SIZE_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = histogram(
+    "http_request_db_seconds",
+    "Statement time while serving one request.",
+    ("route",),
+)
+
+
+# =========================================================
+# Per-request DB usage
+# =========================================================
+
+# [statements, seconds] for the request being served; copied into
+# threadpool threads and SQLAlchemy's greenlets with the context
+_request_db = ContextVar("request_db", default=None)
+
+
+def track_request_db():
+    """Start counting statements for the current request; returns the
+    accumulator and the token for reset()."""
+    usage = [0, 0.0]
+    return usage, _request_db.set(usage)
+
+
+def reset_request_db(token):
+    _request_db.reset(token)
+
+
+def record_query(engine_name, seconds):
+    DB_QUERIES.labels(engine_name).inc()
+    DB_QUERY_SECONDS.labels(engine_name).observe(seconds)
+
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += seconds
@@ -5,11 +5,14 @@ from sqlalchemy import (
     Column,
     String,
     Integer,
+    BigInteger,
     ForeignKey,
     DateTime,
     JSON,
     Float,
-    Text
+    Text,
+    Index,
+    LargeBinary,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -32,6 +35,43 @@ class Student(Base):
 
     attempts = relationship("Attempt", back_populates="student")
 
+    # Identity lookups (see identity.py) hit these instead of scanning
+    __table_args__ = (
+        Index(
+            "uq_students_email",
+            email,
+            unique=True,
+            postgresql_where=email.isnot(None),
+            sqlite_where=email.isnot(None),
+        ),
+        Index(
+            "uq_students_phone",
+            phone,
+            unique=True,
+            postgresql_where=phone.isnot(None),
+            sqlite_where=phone.isnot(None),
+        ),
+        # Substring search (search.py); needs the pg_trgm extension
+        Index(
+            "ix_students_full_name_trgm",
+            full_name,
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_students_email_trgm",
+            email,
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_students_phone_trgm",
+            phone,
+            postgresql_using="gin",
+            postgresql_ops={"phone": "gin_trgm_ops"},
+        ),
+    )
+
 
 # ==============================
 # Test
@@ -45,10 +85,36 @@ class Test(Base):
     max_marks = Column(Integer, nullable=False)
     negative_marking = Column(JSON, nullable=False)
     answer_key = Column(JSON, nullable=True)
+    # Bumped whenever answer_key / negative_marking change (see catalog.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Bumped by anything that changes the test's attempts, scores or
+    # leaderboard; response ETags derive from it (see http_cache.py)
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
     attempts = relationship("Attempt", back_populates="test")
 
+    __table_args__ = (
+        Index("ix_tests_name", name),
+    )
+
+
+class TestDefinition(Base):
+    """A test's answer key and marking scheme as they were at `version`,
+    kept when catalog.update_answer_key replaces them, so an attempt
+    ingested against that version restores its own (payloads.restore).
+    name and max_marks never change."""
+
+    __tablename__ = "test_definitions"
+
+    test_id = Column(UUID(as_uuid=True), ForeignKey("tests.id"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+
+    negative_marking = Column(JSON, nullable=False)
+    answer_key = Column(JSON, nullable=True)
+
+    replaced_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
 
 # ==============================
 # Attempt
@@ -68,7 +134,6 @@ class Attempt(Base):
     submitted_at = Column(DateTime(timezone=True), nullable=True)
 
     answers = Column(JSON, nullable=False)
-    raw_payload = Column(JSON, nullable=False)
 
     status = Column(String, default="INGESTED")
 
@@ -78,6 +143,10 @@ class Attempt(Base):
         nullable=True
     )
 
+    # Stamped on every write to the row (status, duplicate_of, student);
+    # part of the detail view's cache version (attempt_queries.detail_version)
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relationships
     student = relationship("Student", back_populates="attempts")
     test = relationship("Test", back_populates="attempts")
@@ -93,6 +162,60 @@ class Attempt(Base):
         back_populates="attempt"
     )
 
+    __table_args__ = (
+        # Dedup candidate lookup: ±7 minute range scan per student/test
+        Index(
+            "ix_attempts_student_test_started",
+            student_id,
+            test_id,
+            started_at,
+        ),
+        # GET /api/attempts keyset pages, newest first, per filter
+        Index("ix_attempts_started_id", started_at.desc().nulls_last(), id.desc()),
+        Index("ix_attempts_test_started_id", test_id, started_at.desc().nulls_last(), id.desc()),
+        Index("ix_attempts_student_started_id", student_id, started_at.desc().nulls_last(), id.desc()),
+        Index("ix_attempts_status_started_id", status, started_at.desc().nulls_last(), id.desc()),
+        Index(
+            "ix_attempts_test_status_started_id",
+            test_id,
+            status,
+            started_at.desc().nulls_last(),
+            id.desc(),
+        ),
+        # Duplicate thread of the detail view
+        Index(
+            "ix_attempts_duplicate_of",
+            duplicate_of_attempt_id,
+            postgresql_where=duplicate_of_attempt_id.isnot(None),
+        ),
+    )
+
+
+# ==============================
+# AttemptPayload
+# ==============================
+
+class AttemptPayload(Base):
+    """The ingested event, compressed and kept out of attempts (payloads.py).
+
+    Only the detail view reads it; list, leaderboard and dedup queries
+    never touch this table.
+    """
+
+    __tablename__ = "attempt_payloads"
+
+    attempt_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("attempts.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    # tests.version the attempt was ingested against
+    test_version = Column(Integer, nullable=True)
+
+    encoding = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
 
 # ==============================
 # AttemptScore
@@ -116,7 +239,7 @@ class AttemptScore(Base):
 
     explanation = Column(JSON, nullable=False)
 
-    computed_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    computed_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 🚨 THIS WAS MISSING (CRITICAL)
     attempt = relationship("Attempt", back_populates="score")
@@ -135,4 +258,145 @@ class Flag(Base):
     reason = Column(Text)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
-    attempt = relationship("Attempt", back_populates="flags")
\ No newline at end of file
+    attempt = relationship("Attempt", back_populates="flags")
+
+
+# ==============================
+# LeaderboardEntry
+# ==============================
+
+class LeaderboardEntry(Base):
+    """Best SCORED attempt per student per test (see leaderboard.py)."""
+
+    __tablename__ = "leaderboard_entries"
+
+    test_id = Column(UUID(as_uuid=True), ForeignKey("tests.id"), primary_key=True)
+    student_id = Column(UUID(as_uuid=True), ForeignKey("students.id"), primary_key=True)
+    attempt_id = Column(UUID(as_uuid=True), ForeignKey("attempts.id"), nullable=False)
+
+    score = Column(Integer, nullable=False)
+    accuracy = Column(Float, nullable=False)
+    net_correct = Column(Integer, nullable=False)
+    submitted_at = Column(DateTime(timezone=True), nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+    __table_args__ = (
+        # DECISIONS.md §7 ranking, so a page is an index range scan
+        Index(
+            "ix_leaderboard_entries_rank",
+            test_id,
+            score.desc(),
+            accuracy.desc(),
+            net_correct.desc(),
+            submitted_at,
+            student_id,
+        ),
+        # Entries changed since a rank index last synced (ranking.py)
+        Index("ix_leaderboard_entries_updated", test_id, updated_at),
+    )
+
+
+class LeaderboardRemoval(Base):
+    """Last time an entry was deleted from leaderboard_entries (flag,
+    merge, rebuild), so rank indexes (ranking.py) can drop it without
+    reloading the test. One row per test and student, restamped."""
+
+    __tablename__ = "leaderboard_removals"
+
+    test_id = Column(UUID(as_uuid=True), ForeignKey("tests.id"), primary_key=True)
+    # No foreign key: a merged-away student is deleted after its removals
+    student_id = Column(UUID(as_uuid=True), primary_key=True)
+
+    removed_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_leaderboard_removals_removed", test_id, removed_at),
+    )
+
+
+
+# ==============================
+# IngestJob
+# ==============================
+
+class IngestJob(Base):
+    """An async ingest batch, drained by the worker pool in jobs.py."""
+
+    __tablename__ = "ingest_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # QUEUED -> RUNNING -> COMPLETED | FAILED
+    status = Column(String, nullable=False, default="QUEUED")
+
+    payload = Column(JSON, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+
+    total = Column(Integer, nullable=False)
+    processed = Column(Integer, nullable=False, default=0)
+    summary = Column(JSON, nullable=False)
+    error = Column(Text, nullable=True)
+
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    chunks = relationship(
+        "IngestJobChunk",
+        back_populates="job",
+        order_by="IngestJobChunk.offset",
+    )
+
+    __table_args__ = (
+        # Workers claim the oldest QUEUED (or abandoned RUNNING) job
+        Index("ix_ingest_jobs_status_created", status, created_at),
+    )
+
+
+class IngestJobChunk(Base):
+    """Per-event outcomes of one committed chunk of an IngestJob."""
+
+    __tablename__ = "ingest_job_chunks"
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("ingest_jobs.id"), primary_key=True)
+    offset = Column(Integer, primary_key=True)
+
+    results = Column(JSON, nullable=False)
+
+    job = relationship("IngestJob", back_populates="chunks")
+
+
+# ==============================
+# RecomputeRun
+# ==============================
+
+class RecomputeRun(Base):
+    """Progress of a whole-test rescore (see recompute.py)."""
+
+    __tablename__ = "recompute_runs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    test_id = Column(UUID(as_uuid=True), ForeignKey("tests.id"), nullable=False)
+    # tests.version the run scores against
+    test_version = Column(Integer, nullable=False)
+
+    # RUNNING -> COMPLETED | FAILED | SUPERSEDED
+    status = Column(String, nullable=False, default="RUNNING")
+
+    total = Column(Integer, nullable=False)
+    processed = Column(Integer, nullable=False, default=0)
+    # Attempts are rescored in id order; resume after this one
+    last_attempt_id = Column(UUID(as_uuid=True), nullable=True)
+    error = Column(Text, nullable=True)
+
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_recompute_runs_test_created", test_id, created_at),
+    )
@@ -0,0 +1,68 @@
+import json
+import zlib
+
+
+# encoding column value; lets the format change without a rewrite
+ENCODING = "zlib-json-1"
+
+COMPRESSION_LEVEL = 6
+
+
+def _encode(doc):
+    return zlib.compress(
+        json.dumps(doc, separators=(",", ":"), default=str).encode(),
+        COMPRESSION_LEVEL,
+    )
+
+
+def _decode(encoding, data):
+    if encoding != ENCODING:
+        raise ValueError(f"unknown payload encoding {encoding!r}")
+    return json.loads(zlib.decompress(data))
+
+
+def _same_definition(definition, entry):
+    return (
+        definition.max_marks == entry.max_marks
+        and definition.negative_marking == entry.plan.config
+        and (definition.answer_key or {}) == dict(entry.plan.items)
+    )
+
+
+def compact(attempt_id, event, entry):
+    """attempt_payloads row for an event ingested against catalog `entry`.
+
+    The answers live in attempts.answers and the test definition in
+    tests, so neither is stored again; the definition is kept only when
+    the event's differs from the stored test (it was ignored at ingest).
+    """
+    doc = event.model_dump(exclude={"test", "answers"})
+    if not _same_definition(event.test, entry):
+        doc["test"] = event.test.model_dump()
+
+    return {
+        "attempt_id": attempt_id,
+        "test_version": entry.version,
+        "encoding": ENCODING,
+        "data": _encode(doc),
+    }
+
+
+def restore(payload, answers, definition):
+    """The event as it was ingested (AttemptEvent.model_dump() shape).
+
+    `definition` is the test's name / max_marks / negative_marking /
+    answer_key at payload.test_version, used unless the event carried its
+    own. None when that version's definition is no longer known; the
+    event's "test" is then None too rather than a definition it never had.
+    """
+    doc = _decode(payload.encoding, payload.data)
+
+    return {
+        "source_event_id": doc["source_event_id"],
+        "student": doc["student"],
+        "test": doc.get("test") or definition,
+        "started_at": doc["started_at"],
+        "submitted_at": doc["submitted_at"],
+        "answers": answers,
+    }
@@ -0,0 +1,276 @@
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from models import LeaderboardEntry, LeaderboardRemoval
+import metrics
+from leaderboard import sort_key
+
+
+# Entries updated (and removals stamped) this long before the last one
+# seen are read again on sync, so a transaction that stamped its rows
+# before another one but committed after it is still picked up
+RANK_SYNC_OVERLAP_SECONDS = float(os.getenv("RANK_SYNC_OVERLAP_SECONDS", "30"))
+
+# More changed entries than len / this: re-sort instead of moving one by one
+RESORT_FRACTION = 16
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+# Sorts after every student id, to bisect past a whole tie group
+_LAST_ID = uuid.UUID(int=(1 << 128) - 1)
+
+
+def rank_key(row):
+    """DECISIONS.md §7 ranking tuple, then student_id like the leaderboard
+    pages, so the position in the sorted keys is the leaderboard rank."""
+    return (*sort_key(row), row["student_id"])
+
+
+# =========================================================
+# Order-statistic index
+# =========================================================
+
+class RankIndex:
+    """One test's leaderboard_entries as a sorted list of rank keys.
+
+    Lookups are bisects, O(log n). Changed entries are moved one by one
+    (a bisect plus a memmove of the list), or the list is re-sorted when
+    a large share of it changed.
+    """
+
+    def __init__(self, rows):
+        self.keys = []
+        self.entries = {}
+        self.watermark = None
+        self.data_version = None
+        self.lock = threading.Lock()
+        self.apply(rows)
+
+    def _advance(self, stamp):
+        if stamp is not None and (self.watermark is None or stamp > self.watermark):
+            self.watermark = stamp
+
+    def remove(self, rows):
+        """Drop entries named by (student_id, removed_at) rows, if present."""
+        for student_id, removed_at in rows:
+            self._advance(removed_at)
+            old = self.entries.pop(student_id, None)
+            if old is not None:
+                del self.keys[bisect_left(self.keys, old[0])]
+
+    def apply(self, rows):
+        """Insert or replace entries (LeaderboardEntry column rows)."""
+        keys, entries = self.keys, self.entries
+        resort = len(rows) > len(keys) // RESORT_FRACTION
+
+        for row in rows:
+            row = row._asdict()
+            key = rank_key(row)
+            old = entries.get(row["student_id"])
+            entries[row["student_id"]] = (key, row)
+            self._advance(row["updated_at"])
+
+            if resort:
+                continue
+            if old is not None:
+                del keys[bisect_left(keys, old[0])]
+            insort(keys, key)
+
+        if resort:
+            keys[:] = sorted(key for key, _ in entries.values())
+
+    def __len__(self):
+        return len(self.keys)
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+
+    def rank(self, student_id):
+        """(rank, entry row, percentile) or None when not ranked.
+
+        rank is the student's position on the leaderboard. percentile is
+        the share of students ranked below plus half of those tied on the
+        whole ranking tuple (the student included).
+        """
+        found = self.entries.get(student_id)
+        if found is None:
+            return None
+
+        key, row = found
+        n = len(self.keys)
+        position = bisect_left(self.keys, key)
+
+        tied_from = bisect_left(self.keys, key[:-1])
+        tied_to = bisect_right(self.keys, (*key[:-1], _LAST_ID))
+        percentile = ((n - tied_to) + (tied_to - tied_from) / 2) / n * 100
+
+        return position + 1, row, round(percentile, 2)
+
+    def _at_least(self, score):
+        """Entries scoring >= score."""
+        return bisect_right(self.keys, (-score, math.inf))
+
+    def score_at(self, percentile):
+        """Nearest-rank percentile of the scores."""
+        n = len(self.keys)
+        k = max(1, math.ceil(percentile / 100 * n))
+        return -self.keys[n - k][0]
+
+    def distribution(self, bins):
+        """Score percentiles and an equal-width histogram over the range."""
+        n = len(self.keys)
+        if not n:
+            return {"total": 0, "min": None, "max": None, "percentiles": {}, "histogram": []}
+
+        low, high = -self.keys[-1][0], -self.keys[0][0]
+        width = (high - low) / bins if high > low else 1
+
+        histogram = []
+        for i in range(bins):
+            start = low + i * width
+            end = low + (i + 1) * width
+            last = i == bins - 1 or end >= high
+            count = self._at_least(start) - (0 if last else self._at_least(end))
+            histogram.append({
+                "from": round(start, 2),
+                "to": high if last else round(end, 2),
+                "count": count,
+            })
+            if last:
+                break
+
+        return {
+            "total": n,
+            "min": low,
+            "max": high,
+            "percentiles": {f"p{p}": self.score_at(p) for p in PERCENTILES},
+            "histogram": histogram,
+        }
+
+
+# =========================================================
+# Sync with leaderboard_entries
+# =========================================================
+
+def _entries(test_id):
+    cols = LeaderboardEntry.__table__.c
+    return select(
+        cols.student_id,
+        cols.attempt_id,
+        cols.score,
+        cols.accuracy,
+        cols.net_correct,
+        cols.submitted_at,
+        cols.updated_at,
+    ).where(cols.test_id == test_id)
+
+
+def _removals(test_id):
+    cols = LeaderboardRemoval.__table__.c
+    return select(cols.student_id, cols.removed_at).where(cols.test_id == test_id)
+
+
+class RankIndexCache:
+    """RankIndex per test, brought up to date when data_version moves.
+
+    Since the last sync, entries deleted (leaderboard_removals, stamped by
+    flag, merge and rebuild) are dropped, then entries upserted
+    (updated_at) are applied in place; both are index range scans, so a
+    sync reads only what changed. A student removed and ranked again in
+    the same window ends up ranked.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db, test_id, data_version):
+        index = RankIndex(db.execute(_entries(test_id)).all())
+        index.data_version = data_version
+
+        with self._lock:
+            if test_id not in self._indexes and len(self._indexes) >= self.max_size:
+                self._indexes.clear()
+            self._indexes[test_id] = index
+        return index
+
+    def get(self, db, test_id, data_version):
+        """Up-to-date RankIndex for data_version (from catalog.data_version)."""
+        start = time.perf_counter()
+        index = self._indexes.get(test_id)
+
+        if index is not None and index.data_version == data_version:
+            return index
+
+        if index is None or index.watermark is None:
+            index = self._load(db, test_id, data_version)
+            metrics.RANK_INDEX_SYNC_SECONDS.labels("full").observe(time.perf_counter() - start)
+            return index
+
+        since = index.watermark - timedelta(seconds=RANK_SYNC_OVERLAP_SECONDS)
+        removed = db.execute(
+            _removals(test_id).where(LeaderboardRemoval.removed_at > since)
+        ).all()
+        changed = db.execute(
+            _entries(test_id).where(LeaderboardEntry.updated_at > since)
+        ).all()
+
+        with index.lock:
+            index.remove(removed)
+            index.apply(changed)
+            index.data_version = max(index.data_version, data_version)
+
+        metrics.RANK_INDEX_SYNC_SECONDS.labels("incremental").observe(time.perf_counter() - start)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+rank_indexes = RankIndexCache()
+
+
+# =========================================================
+# Reads
+# =========================================================
+
+def student_rank(db, test_id, student_id, data_version):
+    index = rank_indexes.get(db, test_id, data_version)
+
+    with index.lock:
+        found = index.rank(student_id)
+        total = len(index)
+
+    if found is None:
+        return None
+
+    rank, row, percentile = found
+    return {
+        "test_id": str(test_id),
+        "student_id": str(student_id),
+        "rank": rank,
+        "total": total,
+        "percentile": percentile,
+        "attempt_id": str(row["attempt_id"]),
+        "score": row["score"],
+        "accuracy": row["accuracy"],
+        "net_correct": row["net_correct"],
+        "submitted_at": row["submitted_at"],
+    }
+
+
+def score_distribution(db, test_id, data_version, bins):
+    index = rank_indexes.get(db, test_id, data_version)
+
+    with index.lock:
+        return {"test_id": str(test_id), **index.distribution(bins)}
@@ -0,0 +1,345 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import SessionLocal
+from models import Test, Attempt, AttemptScore, RecomputeRun
+from scoring import ScoringPlan, score_batch, init_pool_plan, score_pool_chunk
+from catalog import catalog
+import leaderboard
+import metrics
+from logger import logger
+
+
+RECOMPUTE_CHUNK_SIZE = int(os.getenv("RECOMPUTE_CHUNK_SIZE", "5000"))
+RECOMPUTE_PROCESSES = int(os.getenv("RECOMPUTE_PROCESSES", str(os.cpu_count() or 1)))
+
+# A RUNNING run without a heartbeat for this long was abandoned (crash,
+# restart) and may be resumed by the next POST / CLI invocation
+RECOMPUTE_LEASE = timedelta(seconds=int(os.getenv("RECOMPUTE_LEASE_SECONDS", "300")))
+
+SCORE_FIELDS = ("correct", "wrong", "skipped", "accuracy", "net_correct", "score", "explanation")
+
+
+# =========================================================
+# Runs
+# =========================================================
+
+class RunSuperseded(Exception):
+    """The run is no longer RUNNING for the test's current key (a newer
+    key or run replaced it); nothing it scores may be written."""
+
+def _rescorable(test_id):
+    return (
+        Attempt.test_id == test_id,
+        or_(Attempt.status.is_(None), Attempt.status != "DEDUPED"),
+    )
+
+
+def _take_over(db, run):
+    """Claim a failed or abandoned run; False if it is still being worked on."""
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(RecomputeRun)
+        .where(
+            RecomputeRun.id == run.id,
+            or_(
+                RecomputeRun.status == "FAILED",
+                RecomputeRun.heartbeat_at < now - RECOMPUTE_LEASE,
+            ),
+        )
+        .values(status="RUNNING", error=None, finished_at=None, heartbeat_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def start(db, test_id):
+    """(run, should_execute) for a rescore of the test; None if no such test.
+
+    An unfinished (or failed) run for the current answer key is resumed
+    rather than restarted; if its worker is still alive it is returned
+    as is.
+    """
+    test = db.get(Test, test_id)
+    if not test:
+        return None
+
+    latest = db.execute(
+        select(RecomputeRun)
+        .where(RecomputeRun.test_id == test.id)
+        .order_by(RecomputeRun.created_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+    if latest and latest.status in ("RUNNING", "FAILED"):
+        if latest.test_version == test.version:
+            return latest, _take_over(db, latest)
+
+        # The key changed again; its scores are about to be overwritten
+        if latest.status == "RUNNING":
+            latest.status = "SUPERSEDED"
+            latest.finished_at = datetime.utcnow()
+
+    total = db.execute(
+        select(func.count()).select_from(Attempt).where(*_rescorable(test.id))
+    ).scalar()
+
+    run = RecomputeRun(
+        test_id=test.id,
+        test_version=test.version,
+        status="RUNNING",
+        total=total,
+        processed=0,
+        heartbeat_at=datetime.utcnow(),
+    )
+    db.add(run)
+    db.commit()
+    return run, True
+
+
+def run_status(run):
+    return {
+        "run_id": str(run.id),
+        "test_id": str(run.test_id),
+        "test_version": run.test_version,
+        "status": run.status,
+        "total": run.total,
+        "processed": run.processed,
+        "error": run.error,
+        "created_at": run.created_at,
+        "finished_at": run.finished_at,
+    }
+
+
+# =========================================================
+# Execution
+# =========================================================
+
+def _upsert_scores(db, rows):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(AttemptScore)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(AttemptScore)
+    else:
+        raise NotImplementedError(f"score upsert not supported on {dialect}")
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AttemptScore.attempt_id],
+        set_={
+            name: stmt.excluded[name]
+            for name in (*SCORE_FIELDS, "computed_at")
+        },
+    )
+    db.execute(stmt, rows)
+
+
+def _fence(db, run_id, test_id, test_version, **values):
+    """Update the run while it is still RUNNING against the test's current
+    key, or roll back and raise RunSuperseded.
+
+    The update locks the run row first, so a start() superseding the run
+    waits for the transaction or is seen by it.
+    """
+    current = select(Test.id).where(Test.id == test_id, Test.version == test_version)
+    updated = db.execute(
+        update(RecomputeRun)
+        .where(
+            RecomputeRun.id == run_id,
+            RecomputeRun.status == "RUNNING",
+            current.exists(),
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    if updated != 1:
+        db.rollback()
+        raise RunSuperseded(run_id)
+
+
+def _write_chunk(db, run_id, test_id, test_version, ids, scores):
+    """Scores and run progress for one chunk, in one transaction.
+
+    Only attempts still waiting for a score (INGESTED, DECISIONS.md §4)
+    become SCORED; FLAGGED ones keep their status and stay off the
+    leaderboard. Raises RunSuperseded, writing nothing, once the run is
+    superseded.
+    """
+    now = datetime.utcnow()
+
+    _fence(
+        db, run_id, test_id, test_version,
+        processed=RecomputeRun.processed + len(ids),
+        last_attempt_id=ids[-1],
+        heartbeat_at=now,
+    )
+
+    _upsert_scores(db, [
+        {"attempt_id": attempt_id, **score_data, "computed_at": now}
+        for attempt_id, score_data in zip(ids, scores)
+    ])
+
+    db.execute(
+        update(Attempt)
+        .where(
+            Attempt.id.in_(ids),
+            or_(Attempt.status.is_(None), Attempt.status == "INGESTED"),
+        )
+        .values(status="SCORED")
+    )
+
+    catalog.bump_data_version(db, [test_id])
+    db.commit()
+
+
+def _chunks(db, test_id, after, chunk_size):
+    """(ids, answer maps) per chunk, in id order, after `after`.
+
+    yield_per streams the rows through a server-side cursor, so only one
+    chunk of answers is in memory on this side.
+    """
+    stmt = (
+        select(Attempt.id, Attempt.answers)
+        .where(*_rescorable(test_id))
+        .order_by(Attempt.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if after is not None:
+        stmt = stmt.where(Attempt.id > after)
+
+    for rows in db.execute(stmt).partitions():
+        yield [r.id for r in rows], [r.answers for r in rows]
+
+
+def execute(
+    run_id,
+    processes=RECOMPUTE_PROCESSES,
+    chunk_size=RECOMPUTE_CHUNK_SIZE,
+    on_progress=None,
+):
+    """Rescore every non-DEDUPED attempt of the run's test.
+
+    Chunks are scored in a process pool while the next ones are read,
+    written back in id order with one bulk upsert each, and the run's
+    resume point commits with the chunk. The leaderboard is rebuilt once
+    at the end. A run superseded midway stops at its next write.
+    """
+    db = SessionLocal()
+    reader = SessionLocal()
+    pool = None
+
+    try:
+        run = db.get(RecomputeRun, run_id)
+        test = db.get(Test, run.test_id)
+        test_id, test_version, after = run.test_id, run.test_version, run.last_attempt_id
+
+        if test.version != run.test_version:
+            # A newer key arrived; the run started for it replaces this one
+            run.status = "SUPERSEDED"
+            run.finished_at = datetime.utcnow()
+            db.commit()
+            return run_status(run)
+
+        if processes > 1 and run.total - run.processed > chunk_size:
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                # No fork: the parent is a threaded server holding DB connections
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_pool_plan,
+                initargs=(test.answer_key, test.negative_marking),
+            )
+        else:
+            plan = ScoringPlan(test.answer_key, test.negative_marking)
+
+        pending = deque()
+
+        def drain(limit):
+            while len(pending) > limit:
+                ids, scored = pending.popleft()
+                _write_chunk(
+                    db, run_id, test_id, test_version, ids,
+                    scored.result() if pool else scored,
+                )
+                if on_progress:
+                    db.refresh(run)
+                    on_progress(run)
+
+        for ids, answer_maps in _chunks(reader, test_id, after, chunk_size):
+            if pool:
+                pending.append((ids, pool.submit(score_pool_chunk, answer_maps)))
+            else:
+                with metrics.SCORING_SECONDS.labels("batch").time():
+                    pending.append((ids, score_batch(plan, answer_maps)))
+            metrics.SCORED_ATTEMPTS.labels("batch").inc(len(ids))
+
+            # Bound the chunks held in memory while workers score
+            drain(processes * 2 if pool else 0)
+
+        drain(0)
+        reader.close()
+
+        # Held until rebuild commits, so a newer run can't start in between
+        _fence(db, run_id, test_id, test_version, heartbeat_at=datetime.utcnow())
+        leaderboard.rebuild(db, test_id)
+
+        _fence(db, run_id, test_id, test_version, status="COMPLETED", finished_at=datetime.utcnow())
+        db.commit()
+        db.refresh(run)
+
+        logger.info(
+            "test_recomputed",
+            extra={
+                "channel": "scoring",
+                "context": {"test_id": str(test_id), "run_id": str(run_id)},
+                "extra_data": {"attempts": run.processed},
+            },
+        )
+        return run_status(run)
+    except RunSuperseded:
+        db.execute(
+            update(RecomputeRun)
+            .where(RecomputeRun.id == run_id, RecomputeRun.status == "RUNNING")
+            .values(status="SUPERSEDED", finished_at=datetime.utcnow())
+        )
+        db.commit()
+        db.refresh(run)
+
+        logger.info(
+            "test_recompute_superseded",
+            extra={
+                "channel": "scoring",
+                "context": {"test_id": str(test_id), "run_id": str(run_id)},
+            },
+        )
+        return run_status(run)
+    except Exception as exc:
+        db.rollback()
+        db.execute(
+            update(RecomputeRun)
+            .where(RecomputeRun.id == run_id)
+            .values(status="FAILED", error=str(exc), finished_at=datetime.utcnow())
+        )
+        db.commit()
+
+        logger.error(
+            "test_recompute_failed",
+            extra={
+                "channel": "scoring",
+                "context": {"run_id": str(run_id)},
+                "extra_data": {"error": str(exc)},
+            },
+        )
+        raise
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        reader.close()
+        db.close()
@@ -30,4 +30,12 @@ class AttemptBatch(RootModel[list[AttemptEvent]]):
 
 
 class FlagRequest(BaseModel):
-    reason: str
\ No newline at end of file
+    reason: str
+
+class MergeRequest(BaseModel):
+    into_student_id: str
+
+
+class AnswerKeyUpdate(BaseModel):
+    answer_key: Optional[Dict[str, str]] = None
+    negative_marking: Optional[Dict[str, int]] = None
@@ -1,15 +1,72 @@
-def compute_score(test, student_answers):
+import numpy as np
+
+
+# Codes used in encoded answer matrices; real options are coded 0..n-1
+SKIP_CODE = -1
+UNKNOWN_CODE = -2
+
+# Weights every negative_marking config needs
+MARKING_FIELDS = ("correct", "wrong", "skip")
+
+
+def check_marking(negative_marking):
+    """Raise ValueError unless every marking weight is present and an int."""
+    bad = [
+        field for field in MARKING_FIELDS
+        if type(negative_marking.get(field)) is not int
+    ]
+    if bad:
+        raise ValueError(f"negative_marking needs integer {', '.join(bad)}")
+
+
+class ScoringPlan:
+    """Answer key and marking weights flattened once per test version."""
+
+    __slots__ = (
+        "questions", "answers", "items", "config", "correct", "wrong", "skip",
+        "option_codes", "key_vector",
+    )
+
+    def __init__(self, answer_key, negative_marking):
+        answer_key = answer_key or {}
+        self.questions = tuple(answer_key.keys())
+        self.answers = tuple(answer_key.values())
+        self.items = tuple(answer_key.items())
+        self.config = negative_marking
+        self.correct = negative_marking["correct"]
+        self.wrong = negative_marking["wrong"]
+        self.skip = negative_marking["skip"]
+
+        self.option_codes = {}
+        for answer in self.answers:
+            self.option_codes.setdefault(answer, len(self.option_codes))
+
+        self.key_vector = np.fromiter(
+            (self.option_codes[a] for a in self.answers),
+            dtype=np.int16,
+            count=len(self.answers),
+        )
+
+        # Student "SKIP" / missing always counts as skipped, as in score_plan
+        self.option_codes["SKIP"] = SKIP_CODE
+        self.option_codes[None] = SKIP_CODE
+
 
-    answer_key = test.answer_key
-    config = test.negative_marking
+def compile_plan(test):
+    return ScoringPlan(test.answer_key, test.negative_marking)
+
+
+def score_plan(plan, student_answers):
+
+    get_answer = student_answers.get
 
     correct = 0
     wrong = 0
     skipped = 0
 
-    for question, correct_answer in answer_key.items():
+    for question, correct_answer in plan.items:
 
-        student_answer = student_answers.get(question)
+        student_answer = get_answer(question)
 
         if student_answer is None or student_answer == "SKIP":
             skipped += 1
@@ -18,15 +75,20 @@ def compute_score(test, student_answers):
         else:
             wrong += 1
 
+    return build_result(plan, correct, wrong, skipped)
+
+
+def build_result(plan, correct, wrong, skipped):
+
     attempted = correct + wrong
 
     accuracy = (correct / attempted * 100) if attempted > 0 else 0
     net_correct = correct - wrong
 
     score = (
-        correct * config["correct"] +
-        wrong * config["wrong"] +
-        skipped * config["skip"]
+        correct * plan.correct +
+        wrong * plan.wrong +
+        skipped * plan.skip
     )
 
     return {
@@ -37,7 +99,7 @@ def compute_score(test, student_answers):
         "net_correct": net_correct,
         "score": score,
         "explanation": {
-            "config": config,
+            "config": plan.config,
             "counts": {
                 "correct": correct,
                 "wrong": wrong,
@@ -45,3 +107,105 @@ def compute_score(test, student_answers):
             }
         }
     }
+
+
+def compute_score(test, student_answers):
+    return score_plan(compile_plan(test), student_answers)
+
+
+def question_breakdown(plan, student_answers):
+    """Per-question outcome and marks, by the same rules as score_plan."""
+    rows = []
+
+    for question, correct_answer in plan.items:
+        student_answer = student_answers.get(question)
+
+        if student_answer is None or student_answer == "SKIP":
+            result, marks = "skipped", plan.skip
+        elif student_answer == correct_answer:
+            result, marks = "correct", plan.correct
+        else:
+            result, marks = "wrong", plan.wrong
+
+        rows.append({
+            "question": question,
+            "answer": student_answer,
+            "correct_answer": correct_answer,
+            "result": result,
+            "marks": marks,
+        })
+
+    return rows
+
+
+# =========================================================
+# Batch scoring
+# =========================================================
+
+def encode_answers(plan, answer_maps):
+    """Encode answer dicts into an (attempts x questions) int16 matrix."""
+    questions = plan.questions
+    lookup = plan.option_codes.get
+
+    flat = (
+        lookup(get_answer(q), UNKNOWN_CODE)
+        for get_answer in (a.get for a in answer_maps)
+        for q in questions
+    )
+
+    matrix = np.fromiter(
+        flat,
+        dtype=np.int16,
+        count=len(answer_maps) * len(questions),
+    )
+    return matrix.reshape(len(answer_maps), len(questions))
+
+
+def count_batch(plan, matrix):
+    """Per-attempt correct / wrong / skipped count vectors."""
+    skipped = (matrix == SKIP_CODE).sum(axis=1)
+    # Key codes are >= 0, so skipped and unknown cells never match
+    correct = (matrix == plan.key_vector).sum(axis=1)
+    wrong = len(plan.questions) - correct - skipped
+    return correct, wrong, skipped
+
+
+def score_batch(plan, answer_maps):
+    """Score many attempts of one test; same dicts as score_plan, in order."""
+    if not answer_maps:
+        return []
+
+    correct, wrong, skipped = count_batch(plan, encode_answers(plan, answer_maps))
+
+    return [
+        build_result(plan, c, w, s)
+        for c, w, s in zip(correct.tolist(), wrong.tolist(), skipped.tolist())
+    ]
+
+
+def batch_parity_mismatches(plan, answer_maps):
+    """Indices where score_batch disagrees with the scalar scorer."""
+    batch = score_batch(plan, answer_maps)
+    return [
+        i
+        for i, (answers, result) in enumerate(zip(answer_maps, batch))
+        if score_plan(plan, answers) != result
+    ]
+
+
+# =========================================================
+# Process pool workers
+# =========================================================
+
+# Compiled once per worker process by init_pool_plan
+_pool_plan = None
+
+
+def init_pool_plan(answer_key, negative_marking):
+    """ProcessPoolExecutor initializer for score_pool_chunk."""
+    global _pool_plan
+    _pool_plan = ScoringPlan(answer_key, negative_marking)
+
+
+def score_pool_chunk(answer_maps):
+    return score_batch(_pool_plan, answer_maps)
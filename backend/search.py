@@ -0,0 +1,54 @@
+import re
+
+from sqlalchemy import or_
+
+from models import Student
+from utils import normalize_email, normalize_phone
+
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+PHONE_RE = re.compile(r"^\+?[\d\s().-]+$")
+
+# Fewer digits than this is treated as a fragment, not a whole number
+MIN_PHONE_DIGITS = 10
+
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def student_search(term):
+    """WHERE clause over students for the list_attempts `search` param.
+
+    A complete email is normalized the same way ingest stores it and
+    matched exactly against the unique index, so gmail aliases find their
+    student. A phone number is reduced to its digits. Written with its
+    country code ("+91 98765-43210") it is the whole stored number and is
+    matched exactly against the unique phone index; without one
+    ("9876543210") it is matched as a substring, so it still finds the
+    stored "919876543210", and also like any other term, since it may as
+    well be part of a name or email ("1234567890@school.org"). Anything
+    else is a case-insensitive substring match on name/email/phone, which
+    the pg_trgm GIN indexes serve on Postgres; SQLite runs the same
+    expression as lower() LIKE without an index.
+    """
+    term = term.strip()
+
+    if EMAIL_RE.match(term):
+        return Student.email == normalize_email(term)
+
+    pattern = f"%{escape_like(term)}%"
+    text_match = or_(
+        Student.full_name.ilike(pattern, escape="\\"),
+        Student.email.ilike(pattern, escape="\\"),
+        Student.phone.ilike(pattern, escape="\\"),
+    )
+
+    if PHONE_RE.match(term):
+        digits = normalize_phone(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            if term.startswith("+"):
+                return Student.phone == digits
+            return or_(Student.phone.like(f"%{digits}%"), text_match)
+
+    return text_match
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy.schema import CreateTable
+
+# The backend modules import each other top level (`import catalog`), and
+# database.py builds its engines from DATABASE_URL at import time
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_DB_FILE = Path(tempfile.mkdtemp()) / "tests.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("READ_REPLICA_URL", None)
+
+
+@pytest.fixture
+def db():
+    from database import Base, SessionLocal, engine
+    from catalog import catalog
+    from identity import identity
+
+    # Tables only: the Postgres-tuned indexes (NULLS LAST, trigram) don't
+    # build on SQLite, and the tests don't need them
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(table))
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+        catalog.clear()
+        identity.clear()
@@ -0,0 +1,153 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import analytics
+from catalog import catalog
+import ingest
+from models import Attempt, AttemptScore
+from schemas import AttemptEvent
+from test_ingest import event
+
+START = datetime(2026, 1, 1, 10, 0)
+
+KEY = {"q1": "A", "q2": "B", "q3": "C", "q4": "D", "q5": "A"}
+DEFINITION = {
+    "name": "T5",
+    "max_marks": 20,
+    "negative_marking": {"correct": 4, "wrong": -1, "skip": 0},
+    "answer_key": KEY,
+}
+
+
+def _scored(db, answers):
+    """Ingest one attempt per answer map, scored a minute apart."""
+    ingest.ingest_chunk(db, [event(i, answers=a) for i, a in enumerate(answers)])
+    rows = db.query(AttemptScore).join(Attempt).order_by(Attempt.source_event_id).all()
+    for i, score in enumerate(rows):
+        score.computed_at = START + timedelta(minutes=i)
+    db.commit()
+    return catalog.get_by_id(db, rows[0].attempt.test_id), rows
+
+
+@pytest.mark.parametrize("computed_at", [
+    START + timedelta(minutes=1),  # inside the overlap, below the watermark
+    START - timedelta(hours=1),  # before the overlap
+])
+def test_rescore_at_or_below_the_watermark_rebuilds(db, computed_at):
+    entry, rows = _scored(db, [{"q1": "A", "q2": "B"}, {"q1": "A", "q2": "C"}, {"q1": "D"}])
+    stats = analytics.build(db, entry)
+
+    rows[0].score, rows[0].computed_at = 2, computed_at
+    db.commit()
+
+    assert analytics.advance(db, entry, stats) is None
+
+
+def test_scores_read_again_in_the_overlap_are_not_counted_twice(db):
+    entry, rows = _scored(db, [{"q1": "A", "q2": "B"}, {"q1": "A", "q2": "C"}])
+    stats = analytics.build(db, entry)
+
+    advanced = analytics.advance(db, entry, stats)
+
+    assert advanced.attempts == 2
+    assert advanced.report() == stats.report()
+
+
+def _random_answers(n, seed=3):
+    rng = random.Random(seed)
+    # "E" is never in the key; missing questions are skips
+    choices = ["A", "B", "C", "D", "E", "SKIP", None]
+    return [
+        {q: a for q in KEY if (a := rng.choice(choices)) is not None}
+        for _ in range(n)
+    ]
+
+
+def _ingest(db, answers, first=0):
+    ingest.ingest_chunk(db, [
+        AttemptEvent.model_validate({
+            **event(first + i).model_dump(), "test": DEFINITION, "answers": a,
+        })
+        for i, a in enumerate(answers)
+    ])
+
+
+def _report(db):
+    return analytics.build(db, catalog.get_by_name(db, "T5")).report()
+
+
+def test_report_matches_a_direct_computation(db):
+    answers = _random_answers(60)
+    _ingest(db, answers)
+    scores = np.array([
+        s for (s,) in db.query(AttemptScore.score).join(Attempt).order_by(Attempt.source_event_id)
+    ], dtype=float)
+    ordered = [answers[int(e[1:])] for e in sorted(f"e{i}" for i in range(60))]
+
+    report = _report(db)
+    assert report["attempts"] == 60
+    for i, (q, correct) in enumerate(KEY.items()):
+        item = report["questions"][i]
+        given = [a.get(q) for a in ordered]
+        hits = np.array([g == correct for g in given], dtype=float)
+
+        assert item["question"] == q
+        assert item["correct_answer"] == correct
+        assert item["p_value"] == round(hits.mean(), 4)
+        assert item["skip_rate"] == round(sum(g in (None, "SKIP") for g in given) / 60, 4)
+        # Point-biserial is Pearson's r against a 0/1 variable
+        assert item["discrimination"] == pytest.approx(np.corrcoef(hits, scores)[0, 1], abs=1e-4)
+        assert item["options"] == {
+            o: round(given.count(o) / 60, 4) for o in "ABCDE" if o in given
+        }
+
+
+def test_discrimination_is_null_when_everyone_answers_alike(db):
+    _ingest(db, [{"q1": "A", "q2": "C"}, {"q1": "A", "q2": "B"}])
+
+    items = _report(db)["questions"]
+    assert items[0]["p_value"] == 1.0
+    assert items[0]["discrimination"] is None
+    assert items[2]["p_value"] == 0.0
+    assert items[2]["discrimination"] is None
+    assert items[1]["discrimination"] == 1.0
+
+
+def test_batches_and_advance_add_up_to_a_build(db):
+    _ingest(db, _random_answers(30))
+    entry = catalog.get_by_name(db, "T5")
+    stats = analytics.build(db, entry, batch_size=7)
+
+    _ingest(db, _random_answers(25, seed=4), first=30)
+    advanced = analytics.advance(db, entry, stats, batch_size=4)
+
+    assert advanced is not None
+    assert advanced.attempts == 55
+    assert advanced.report() == analytics.build(db, entry).report()
+
+
+def test_flagged_attempt_is_rebuilt_not_kept(db):
+    _ingest(db, _random_answers(10))
+    entry = catalog.get_by_name(db, "T5")
+    stats = analytics.build(db, entry)
+
+    db.query(Attempt).filter_by(source_event_id="e3").one().status = "FLAGGED"
+    db.commit()
+
+    assert analytics.advance(db, entry, stats) is None
+    assert analytics.item_analytics(db, entry.id)["attempts"] == 9
+
+
+def test_new_answer_key_starts_over(db):
+    _ingest(db, _random_answers(10))
+    entry = catalog.get_by_name(db, "T5")
+    assert analytics.item_analytics(db, entry.id)["test_version"] == 1
+
+    catalog.update_answer_key(db, entry.id, answer_key={**KEY, "q1": "E"})
+
+    report = analytics.item_analytics(db, entry.id)
+    assert report["test_version"] == 2
+    assert report["questions"][0]["correct_answer"] == "E"
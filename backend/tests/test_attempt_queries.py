@@ -0,0 +1,137 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import attempt_queries
+from benchmarks.list_projection import lean_page, orm_page
+import models
+from models import Attempt, AttemptScore, Flag, Student
+
+
+def test_cursor_walk_matches_offset_pages(db):
+    rng = random.Random(9)
+    start = datetime(2026, 1, 1, 10, 0)
+    for i in range(50):
+        db.add(Attempt(
+            id=uuid.uuid4(),
+            test_id=uuid.uuid4(),
+            source_event_id=f"e{i}",
+            # Repeated and missing start times: ties on started_at go by id,
+            # NULLs come last
+            started_at=None if i % 9 == 0 else start + timedelta(minutes=rng.randint(0, 10)),
+            answers={},
+            status="SCORED",
+        ))
+    db.commit()
+
+    walked, cursor = [], None
+    while True:
+        rows, next_cursor = attempt_queries.list_page(
+            db, {}, 1, 7, attempt_queries.decode_cursor(cursor) if cursor else None
+        )
+        walked += rows
+        if not next_cursor:
+            break
+        cursor = next_cursor
+
+    paged = []
+    for page in range(1, 9):
+        paged += attempt_queries.list_page(db, {}, page, 7)[0]
+
+    assert len(walked) == 50
+    assert [r[0] for r in walked] == [r[0] for r in paged]
+    assert [r[1] for r in walked][-6:] == [None] * 6
+
+
+def test_detail_version_follows_the_attempt_not_the_test(db):
+    test_id = uuid.uuid4()
+    attempt, other = (
+        Attempt(id=uuid.uuid4(), test_id=test_id, source_event_id=f"e{i}",
+                started_at=datetime(2026, 1, 1, 10, i), answers={}, status="INGESTED")
+        for i in range(2)
+    )
+    db.add_all([attempt, other])
+    db.commit()
+
+    def version():
+        return attempt_queries.detail_version(db, attempt.id)
+
+    before = version()
+    other.status = "FLAGGED"
+    db.commit()
+    assert version() == before
+
+    db.add(Attempt(id=uuid.uuid4(), test_id=test_id, source_event_id="dup",
+                   started_at=datetime(2026, 1, 1, 10, 0), answers={},
+                   status="DEDUPED", duplicate_of_attempt_id=attempt.id))
+    db.commit()
+    joined = version()
+    assert joined != before
+
+    db.add(AttemptScore(attempt_id=attempt.id, correct=1, wrong=0, skipped=0,
+                        accuracy=1.0, net_correct=1, score=4, explanation={}))
+    db.commit()
+    assert version() != joined
+
+    assert attempt_queries.detail_version(db, uuid.uuid4()) is None
+
+
+@pytest.fixture
+def mixed_attempts(db):
+    tests = [
+        models.Test(id=uuid.uuid4(), name=name, max_marks=8,
+                    negative_marking={"correct": 4, "wrong": -1, "skip": 0})
+        for name in ("Mock 1", "Ünit \"2\"")
+    ]
+    students = [
+        Student(id=uuid.uuid4(), full_name=name, email=f"s{i}@x.com")
+        for i, name in enumerate(["Asha Sharma", "Łukasz O'Brien", "李雷", "Ravi\tSharma"])
+    ]
+    db.add_all(tests + students)
+
+    attempts = []
+    start = datetime(2026, 1, 1, 10, 0)
+    for i in range(40):
+        attempt = Attempt(
+            id=uuid.uuid4(),
+            # Some attempts with neither student nor test
+            student_id=None if i % 13 == 0 else students[i % 4].id,
+            test_id=None if i % 17 == 0 else tests[i % 2].id,
+            source_event_id=f"e{i}",
+            started_at=None if i % 11 == 0 else start + timedelta(minutes=i // 3),
+            answers={},
+            status=("SCORED", "FLAGGED", "DEDUPED", "INGESTED")[i % 4],
+            duplicate_of_attempt_id=attempts[i - 1].id if i % 4 == 2 else None,
+        )
+        attempts.append(attempt)
+        db.add(attempt)
+        db.flush()
+        if i % 4 == 0:
+            db.add(AttemptScore(attempt_id=attempt.id, correct=1, wrong=1, skipped=0,
+                                accuracy=0.5, net_correct=0, score=i - 20, explanation={}))
+        if i % 4 == 1:
+            # Two flags: joinedload repeats the attempt row
+            db.add_all([Flag(attempt_id=attempt.id, reason=r) for r in ("a", "b")])
+    db.commit()
+    return tests
+
+
+def test_list_projection_renders_the_orm_body_byte_for_byte(db, mixed_attempts):
+    none = {
+        "test_id": None, "student_id": None, "status": None, "has_duplicates": None,
+        "date_from": None, "date_to": None, "search": None,
+    }
+    cases = [
+        none,
+        {**none, "test_id": mixed_attempts[1].id},
+        {**none, "status": "FLAGGED"},
+        {**none, "has_duplicates": True},
+        {**none, "search": "sharma"},
+    ]
+    for filters in cases:
+        for page in range(1, 6):
+            assert lean_page(db, filters, page, 9) == orm_page(db, filters, page, 9)
+    # UTF-8 as is, quotes escaped, on both paths
+    assert '"test":"Ünit \\"2\\""'.encode() in lean_page(db, none, 1, 40)
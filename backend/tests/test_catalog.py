@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from catalog import catalog
+import models
+
+
+MARKING = {"correct": 4, "wrong": -1, "skip": 0}
+
+
+@pytest.fixture
+def test_row(db):
+    test = models.Test(
+        name="T1",
+        max_marks=8,
+        negative_marking=dict(MARKING),
+        answer_key={"q1": "A", "q2": "B"},
+    )
+    db.add(test)
+    db.commit()
+    return test
+
+
+def _stored(db, test_id):
+    db.expire_all()
+    return db.query(models.Test.version, models.Test.data_version, models.Test.negative_marking).filter(
+        models.Test.id == test_id
+    ).one()
+
+
+def test_partial_marking_is_merged(db, test_row):
+    entry = catalog.update_answer_key(db, test_row.id, negative_marking={"wrong": -2})
+
+    assert entry.plan.correct == 4
+    assert entry.plan.wrong == -2
+    assert entry.plan.skip == 0
+    assert _stored(db, test_row.id).negative_marking == {**MARKING, "wrong": -2}
+
+
+@pytest.mark.parametrize("marking", [
+    {"wrong": "-1"},
+    {"wrong": 1.5},
+    {"skip": None},
+    {"correct": True},
+])
+def test_invalid_marking_is_rejected_before_commit(db, test_row, marking):
+    before = _stored(db, test_row.id)
+
+    with pytest.raises(ValueError):
+        catalog.update_answer_key(
+            db, test_row.id, answer_key={"q1": "C"}, negative_marking=marking
+        )
+
+    db.rollback()
+    assert _stored(db, test_row.id) == before
+    assert catalog.get_by_id(db, test_row.id).plan.answers == ("A", "B")
+
+
+def test_incomplete_stored_marking_is_rejected(db, test_row):
+    test_row.negative_marking = {"correct": 4}
+    db.commit()
+
+    with pytest.raises(ValueError, match="wrong, skip"):
+        catalog.update_answer_key(db, test_row.id, negative_marking={"correct": 2})
+
+
+def test_endpoint_returns_422_for_invalid_marking(db, test_row):
+    import main
+
+    client = TestClient(main.app)
+    url = f"/api/tests/{test_row.id}/answer-key"
+
+    response = client.put(url, json={"negative_marking": {"wrong": 0.5}})
+    assert response.status_code == 422
+
+    catalog.clear()
+    db.add(models.Test(name="T2", max_marks=4, negative_marking={"correct": 4}, answer_key={}))
+    db.commit()
+    other = db.query(models.Test).filter(models.Test.name == "T2").one()
+    response = client.put(
+        f"/api/tests/{other.id}/answer-key", json={"negative_marking": {"wrong": -1}}
+    )
+    assert response.status_code == 422
+    assert "skip" in response.json()["detail"]
+    assert _stored(db, other.id).version == 1
+
+    response = client.put(url, json={"negative_marking": {"skip": -1}})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert client.put("/api/tests/not-a-uuid/answer-key", json={}).status_code == 404
+
+
+def test_data_version_bumps_once_per_transaction(db, test_row):
+    before = _stored(db, test_row.id).data_version
+
+    catalog.bump_data_version(db, [test_row.id])
+    catalog.bump_data_version(db, [test_row.id, None])
+    savepoint = db.begin_nested()
+    catalog.bump_data_version(db, [test_row.id])
+    savepoint.commit()
+    assert _stored(db, test_row.id).data_version == before
+
+    db.commit()
+    assert _stored(db, test_row.id).data_version == before + 1
+
+    catalog.bump_data_version(db, [test_row.id])
+    db.rollback()
+    db.commit()
+    assert _stored(db, test_row.id).data_version == before + 1
@@ -0,0 +1,99 @@
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+from dedup import (
+    DEDUP_WINDOW, SIMILARITY_THRESHOLD, AnswerCodec, AttemptWindowIndex,
+    calculate_similarity, is_duplicate, similarity_many, stack_vectors,
+)
+
+
+Attempt = namedtuple("Attempt", "id started_at answers")
+
+QUESTIONS = [f"q{i}" for i in range(25)]
+START = datetime(2026, 1, 1, 10, 0)
+
+
+def near_copy(rng, answers):
+    """answers with a few changed, dropped or added questions, so the
+    similarity lands around the threshold (24/25, 23/25 = 0.92, 22/25)."""
+    answers = dict(answers)
+    for q in rng.sample(QUESTIONS, rng.choice([0, 1, 2, 2, 3])):
+        answers[q] = rng.choice("ABCDE")
+    for q in rng.sample(QUESTIONS, rng.choice([0, 0, 1])):
+        answers.pop(q, None)
+    if rng.random() < 0.2:
+        answers[f"x{rng.randint(0, 3)}"] = rng.choice("AB")
+    if rng.random() < 0.05:
+        answers = {}
+    return answers
+
+
+def random_attempts(rng, n):
+    base = {q: rng.choice(["A", "B", "C", "D", "SKIP"]) for q in QUESTIONS}
+    attempts = []
+    for i in range(n):
+        # Half-minute steps, so differences of exactly DEDUP_WINDOW occur
+        started_at = START + timedelta(seconds=30 * rng.randint(0, 40))
+        attempts.append(Attempt(i, started_at, near_copy(rng, base)))
+    return attempts
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_similarity_many_matches_calculate_similarity(seed):
+    rng = random.Random(seed)
+    attempts = random_attempts(rng, 30)
+    codec = AnswerCodec()
+    vectors = [codec.encode(a.answers) for a in attempts]
+    matrix = stack_vectors(vectors)
+
+    for attempt, vector in zip(attempts, vectors):
+        expected = [calculate_similarity(attempt.answers, b.answers) for b in attempts]
+        assert similarity_many(vector, matrix).tolist() == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_window_index_matches_is_duplicate(seed):
+    rng = random.Random(seed)
+    index = AttemptWindowIndex()
+    seen = []
+    edges = 0
+
+    for attempt in random_attempts(rng, 60):
+        # Earliest accepted attempt; equal start times keep insertion order
+        expected = next(
+            (old for old in sorted(seen, key=lambda a: a.started_at)
+             if is_duplicate(attempt, old)),
+            None,
+        )
+        assert index.check_and_add("key", attempt) == expected
+        seen.append(attempt)
+
+        edges += any(
+            abs(attempt.started_at - old.started_at) == DEDUP_WINDOW
+            and calculate_similarity(attempt.answers, old.answers) >= SIMILARITY_THRESHOLD
+            for old in seen[:-1]
+        )
+
+    assert edges, "no attempt pair on the window edge"
+
+
+def test_window_and_threshold_edges():
+    answers = {q: "A" for q in QUESTIONS}
+    at_threshold = {**answers, "q0": "B", "q1": "B"}               # 23/25
+    below = {**answers, "q0": "B", "q1": "B", "q2": "B"}           # 22/25
+    assert calculate_similarity(answers, at_threshold) == SIMILARITY_THRESHOLD
+
+    index = AttemptWindowIndex()
+    first = Attempt(0, START, answers)
+    assert index.check_and_add("k", first) is None
+
+    # Just outside the window, identical answers
+    assert index.check_and_add(
+        "k", Attempt(1, START - DEDUP_WINDOW - timedelta(microseconds=1), answers)
+    ) is None
+    assert index.check_and_add("k", Attempt(2, START + DEDUP_WINDOW, below)) is None
+    assert index.check_and_add("k", Attempt(3, START + DEDUP_WINDOW, at_threshold)) == first
+    assert index.check_and_add("other", Attempt(4, START, answers)) is None
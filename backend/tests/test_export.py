@@ -0,0 +1,63 @@
+import csv
+import io
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import export
+from models import Attempt, AttemptScore
+
+
+def test_format_timestamp_is_the_same_for_naive_and_aware_values():
+    naive = datetime(2026, 1, 1, 10, 3, 0, 250000)
+    aware = naive.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5, minutes=30)))
+
+    assert export.format_timestamp(naive) == "2026-01-01T10:03:00.250000"
+    assert export.format_timestamp(aware) == export.format_timestamp(naive)
+    assert export.format_timestamp(None) is None
+
+
+def _scored_attempt(db):
+    test_id = uuid.uuid4()
+    attempt = Attempt(
+        id=uuid.uuid4(), test_id=test_id, source_event_id="e1",
+        started_at=datetime(2026, 1, 1, 10, 0), answers={}, status="SCORED",
+    )
+    db.add(attempt)
+    db.add(AttemptScore(
+        attempt_id=attempt.id, correct=3, wrong=1, skipped=0, accuracy=1.0,
+        net_correct=2, score=11, explanation={},
+        computed_at=datetime(2026, 1, 1, 11, 0),
+    ))
+    db.commit()
+    return test_id, attempt
+
+
+def test_csv_cells(db):
+    test_id, attempt = _scored_attempt(db)
+
+    body = b"".join(export.stream(db, test_id, {}, "csv")).decode()
+    header, row = list(csv.reader(io.StringIO(body)))
+    cells = dict(zip(header, row))
+
+    assert cells["attempt_id"] == str(attempt.id)
+    assert cells["started_at"] == "2026-01-01T10:00:00"
+    assert cells["submitted_at"] == ""
+    assert cells["computed_at"] == "2026-01-01T11:00:00"
+    assert cells["accuracy"] == "1.0"
+    assert cells["score"] == "11"
+
+
+def test_parquet_types_follow_the_columns(db):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    pyarrow = pytest.importorskip("pyarrow")
+    test_id, attempt = _scored_attempt(db)
+
+    body = b"".join(export.stream(db, test_id, {}, "parquet"))
+    table = parquet.read_table(pyarrow.BufferReader(body))
+
+    assert table.schema.field("score").type == pyarrow.int32()
+    assert table.schema.field("accuracy").type == pyarrow.float64()
+    assert table.column("score").to_pylist() == [11]
+    assert table.column("attempt_id").to_pylist() == [str(attempt.id)]
@@ -0,0 +1,66 @@
+import uuid
+
+import identity as identity_module
+from identity import IdentityResolver, identity
+from models import Student
+
+
+def add_student(db, name, email=None, phone=None):
+    student = Student(id=uuid.uuid4(), full_name=name, email=email, phone=phone)
+    db.add(student)
+    db.commit()
+    return student.id
+
+
+def test_cache_is_bounded_least_recently_used_first():
+    cache = IdentityResolver(max_size=2, ttl=60)
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    cache.remember(a, email="a@x.com")
+    cache.remember(b, email="b@x.com")
+    assert cache._cached("a@x.com", None) == a
+    cache.remember(c, email="c@x.com")
+
+    assert len(cache) == 2
+    assert cache._cached("b@x.com", None) is None
+    assert cache._cached("a@x.com", None) == a
+    assert b not in cache._by_student
+
+
+def test_entries_expire(db, monkeypatch):
+    sid = add_student(db, "A", email="a@x.com")
+    cache = IdentityResolver(ttl=30)
+    now = [1000.0]
+    monkeypatch.setattr(identity_module.time, "monotonic", lambda: now[0])
+
+    assert cache.resolve(db, "a@x.com", None) == sid
+    assert cache.resolve(db, "a@x.com", None) == sid
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    now[0] += 30
+    assert cache.resolve(db, "a@x.com", None) == sid
+    assert cache.misses == 2
+
+
+def test_a_cached_phone_does_not_answer_for_an_email(db):
+    by_phone = add_student(db, "A", phone="+919876543210")
+    by_email = add_student(db, "B", email="b@x.com")
+    identity.resolve(db, None, "+919876543210")
+
+    assert identity.resolve(db, "b@x.com", "+919876543210") == by_email
+    assert identity.resolve(db, None, "+919876543210") == by_phone
+
+
+def test_merge_drops_both_students_from_the_cache(db):
+    source = add_student(db, "A", email="a@x.com", phone="+919876543210")
+    target = add_student(db, "B", email="b@x.com")
+    assert identity.resolve(db, "a@x.com", None) == source
+    assert identity.resolve(db, None, "+919876543210") == source
+
+    identity.merge(db, source, target)
+
+    assert source not in identity._by_student
+    assert identity.resolve(db, None, "+919876543210") == target
+    assert identity.resolve(db, "b@x.com", None) == target
+    # The target kept its own email; the source's is gone with it
+    assert identity.resolve(db, "a@x.com", None) is None
@@ -0,0 +1,96 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+import ingest
+import models
+from models import Attempt, AttemptScore
+from schemas import AttemptEvent
+
+
+def event(i, test="T1", **overrides):
+    return AttemptEvent.model_validate({
+        "source_event_id": f"e{i}",
+        "student": {"full_name": f"S{i}", "email": f"s{i}@x.com"},
+        "test": {
+            "name": test,
+            "max_marks": 8,
+            "negative_marking": {"correct": 4, "wrong": -1, "skip": 0},
+            "answer_key": {"q1": "A", "q2": "B"},
+        },
+        "started_at": "2026-01-01T10:00:00Z",
+        "submitted_at": "2026-01-01T10:30:00Z",
+        "answers": {"q1": "A", "q2": "C"},
+        **overrides,
+    })
+
+
+@pytest.mark.parametrize("second", [IntegrityError("INSERT", {}, Exception()), ValueError("bad")])
+def test_failed_integrity_retry_falls_back_like_the_first_try(db, monkeypatch, second):
+    real = ingest._ingest_chunk
+    failures = [IntegrityError("INSERT", {}, Exception()), second]
+
+    def flaky(db, events):
+        if failures:
+            raise failures.pop(0)
+        return real(db, events)
+
+    monkeypatch.setattr(ingest, "_ingest_chunk", flaky)
+    results = ingest.ingest_chunk(db, [event(0), event(1)])
+
+    if isinstance(second, IntegrityError):
+        # A database error on the retry fails the chunk as a whole
+        assert [r["reason"] for r in results] == ["chunk_failed"] * 2
+        assert db.query(Attempt).count() == 0
+    else:
+        # Anything else goes event by event, as on a first failure
+        assert [r["status"] for r in results] == ["SCORED"] * 2
+        assert db.query(Attempt).count() == 2
+
+
+def _outcomes(db, test_name):
+    """source_event_id -> (status, score, source_event_id duplicated)."""
+    canonical = aliased(Attempt)
+    rows = (
+        db.query(Attempt.source_event_id, Attempt.status, AttemptScore.score, canonical.source_event_id)
+        .join(models.Test, Attempt.test_id == models.Test.id)
+        .outerjoin(AttemptScore, AttemptScore.attempt_id == Attempt.id)
+        .outerjoin(canonical, Attempt.duplicate_of_attempt_id == canonical.id)
+        .filter(models.Test.name == test_name)
+    )
+    return {r[0]: tuple(r[1:]) for r in rows}
+
+
+def test_bulk_report_matches_the_per_event_path(db):
+    import main
+
+    def batch(test):
+        return [
+            event(0, test),
+            # Same student, same answers, 3 minutes later: duplicate
+            event(1, test, student={"full_name": "S0", "email": "S0@x.com"},
+                  started_at="2026-01-01T10:03:00Z"),
+            # Same student, different answers: a second attempt
+            event(2, test, student={"full_name": "S0", "email": "s0@x.com"},
+                  answers={"q1": "B", "q2": "B"}),
+            event(3, test, answers={"q1": "SKIP", "q2": "B"}),
+            event(4, test, started_at="not-a-date"),
+        ]
+
+    response = TestClient(main.app).post(
+        "/api/ingest/attempts", json=[e.model_dump() for e in batch("legacy")]
+    )
+    assert response.status_code == 200
+
+    results = ingest.bulk_ingest(db, batch("bulk"), chunk_size=2)
+    db.expire_all()
+    legacy, bulk = _outcomes(db, "legacy"), _outcomes(db, "bulk")
+
+    assert bulk == legacy
+    assert legacy["e1"] == ("DEDUPED", None, "e0")
+    assert "e4" not in legacy
+    assert {r["source_event_id"]: r["status"] for r in results} == {
+        **{sid: outcome[0] for sid, outcome in bulk.items()},
+        "e4": "REJECTED",
+    }
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+
+import ingest
+import jobs
+from models import Attempt, IngestJob
+from schemas import AttemptEvent
+
+
+def events(n):
+    return [
+        AttemptEvent.model_validate({
+            "source_event_id": f"e{i}",
+            "student": {"full_name": f"S{i}", "email": f"s{i}@x.com"},
+            "test": {
+                "name": "T1",
+                "max_marks": 8,
+                "negative_marking": {"correct": 4, "wrong": -1, "skip": 0},
+                "answer_key": {"q1": "A", "q2": "B"},
+            },
+            "started_at": "2026-01-01T10:00:00Z",
+            "submitted_at": "2026-01-01T10:30:00Z",
+            "answers": {"q1": "A", "q2": "C"},
+        })
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def job(db):
+    jobs.enqueue(db, events(5), chunk_size=2)
+    return jobs.claim(db, "worker-a")
+
+
+def test_run_completes_the_job(db, job):
+    jobs.run(db, job, "worker-a")
+
+    status = jobs.job_status(db, job.id)
+    assert status["status"] == "COMPLETED"
+    assert status["processed"] == 5
+    assert status["summary"] == {"ingested": 5, "scored": 5, "deduped": 0, "rejected": 0}
+    assert [r["status"] for r in status["results"]] == ["SCORED"] * 5
+
+
+def test_worker_that_lost_its_lease_writes_nothing(db, job):
+    # Another worker took the job over while this one was stalled
+    db.execute(update(IngestJob).where(IngestJob.id == job.id).values(worker_id="worker-b"))
+    db.commit()
+
+    with pytest.raises(jobs.LeaseLost):
+        jobs.run(db, job, "worker-a")
+    db.rollback()
+
+    status = jobs.job_status(db, job.id)
+    assert status["status"] == "RUNNING"
+    assert status["processed"] == 0
+    assert db.query(Attempt).count() == 0
+
+
+class Deadlock(Exception):
+    pgcode = "40P01"
+
+
+def test_deadlocked_chunk_is_retried(db, job, monkeypatch):
+    real = ingest._ingest_chunk
+    calls = []
+
+    def flaky(db, chunk):
+        calls.append(len(chunk))
+        if len(calls) == 1:
+            raise OperationalError("INSERT ...", {}, Deadlock())
+        return real(db, chunk)
+
+    monkeypatch.setattr(ingest, "_ingest_chunk", flaky)
+    monkeypatch.setattr(ingest, "CHUNK_RETRY_BACKOFF_SECONDS", 0)
+    jobs.run(db, job, "worker-a")
+
+    status = jobs.job_status(db, job.id)
+    assert calls == [2, 2, 2, 1]
+    assert status["summary"]["scored"] == 5
+    assert db.query(Attempt).count() == 5
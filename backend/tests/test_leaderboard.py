@@ -0,0 +1,119 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import leaderboard
+from models import Attempt, AttemptScore, LeaderboardEntry
+
+
+TEST_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, 10, 0)
+
+
+def add_attempt(db, student_id, score, status="SCORED", submitted_at=START):
+    attempt = Attempt(
+        id=uuid.uuid4(),
+        student_id=student_id,
+        test_id=TEST_ID,
+        source_event_id=str(uuid.uuid4()),
+        started_at=START,
+        submitted_at=submitted_at,
+        answers={},
+        status=status,
+    )
+    db.add(attempt)
+    db.add(AttemptScore(
+        attempt_id=attempt.id, correct=0, wrong=0, skipped=0,
+        accuracy=50.0, net_correct=0, score=score, explanation={},
+    ))
+    db.flush()
+    return attempt
+
+
+def row(attempt, score):
+    return leaderboard.entry_row(
+        TEST_ID, attempt.student_id, attempt.id, attempt.submitted_at,
+        {"score": score, "accuracy": 50.0, "net_correct": 0},
+    )
+
+
+def entry(db, student_id):
+    db.expire_all()
+    return db.query(LeaderboardEntry).filter(
+        LeaderboardEntry.test_id == TEST_ID,
+        LeaderboardEntry.student_id == student_id,
+    ).one_or_none()
+
+
+def test_apply_scores_keeps_the_best(db):
+    sid = uuid.uuid4()
+    low, high = add_attempt(db, sid, 10), add_attempt(db, sid, 20)
+
+    leaderboard.apply_scores(db, [row(low, 10), row(high, 20)])
+    assert entry(db, sid).attempt_id == high.id
+
+    leaderboard.apply_scores(db, [row(low, 10)])
+    assert entry(db, sid).attempt_id == high.id
+
+
+def test_refresh_replaces_and_removes(db):
+    sid = uuid.uuid4()
+    low, high = add_attempt(db, sid, 10), add_attempt(db, sid, 20)
+    leaderboard.apply_scores(db, [row(low, 10), row(high, 20)])
+
+    high.status = "FLAGGED"
+    db.flush()
+    leaderboard.refresh(db, [(TEST_ID, sid)])
+    assert entry(db, sid).attempt_id == low.id
+
+    low.status = "FLAGGED"
+    db.flush()
+    leaderboard.refresh(db, [(TEST_ID, sid)])
+    assert entry(db, sid) is None
+
+
+def test_refresh_write_does_not_undo_a_newer_better_entry(db):
+    sid = uuid.uuid4()
+    old, newer = add_attempt(db, sid, 10), add_attempt(db, sid, 20)
+    leaderboard.apply_scores(db, [row(old, 10)])
+
+    # refresh read the entry (old) and the best attempt (old, now 5), then
+    # apply_scores committed `newer` before refresh wrote
+    leaderboard.apply_scores(db, [row(newer, 20)])
+    leaderboard._upsert(db, [row(old, 5)], replacing=old.id)
+    assert entry(db, sid).attempt_id == newer.id
+
+    # Still pointing at the attempt read: replaced even though worse
+    leaderboard._upsert(db, [row(newer, 15)], replacing=newer.id)
+    assert entry(db, sid).score == 15
+
+
+def test_cursor_pages_match_the_ranking(db):
+    rng = random.Random(8)
+    for _ in range(60):
+        submitted_at = None if rng.random() < 0.15 else START + timedelta(minutes=rng.randint(0, 3))
+        attempt = add_attempt(db, uuid.uuid4(), rng.randint(0, 4), submitted_at=submitted_at)
+        leaderboard.apply_scores(db, [row(attempt, db.get(AttemptScore, attempt.id).score)])
+    db.commit()
+
+    expected = sorted(
+        (
+            {"student_id": e.student_id, "score": e.score, "accuracy": e.accuracy,
+             "net_correct": e.net_correct, "submitted_at": e.submitted_at}
+            for e in db.query(LeaderboardEntry)
+        ),
+        key=lambda r: (*leaderboard.sort_key(r), r["student_id"]),
+    )
+
+    walked, cursor = [], None
+    while True:
+        total, data, next_cursor = leaderboard.page(
+            db, TEST_ID, 1, 7, leaderboard.decode_cursor(cursor) if cursor else None
+        )
+        walked += data
+        if not next_cursor:
+            break
+        cursor = next_cursor
+
+    assert total == 60
+    assert [d["student_id"] for d in walked] == [str(r["student_id"]) for r in expected]
@@ -0,0 +1,61 @@
+import io
+import logging
+import queue
+
+from logger import BackgroundWriter, JsonFormatter, QueueHandler, SamplingFilter
+
+
+def record(msg, channel="app", level=logging.INFO):
+    rec = logging.LogRecord("assessment", level, __file__, 1, msg, None, None)
+    rec.channel = channel
+    return rec
+
+
+def test_channel_limit_is_shared_by_its_messages():
+    sampler = SamplingFilter(rates={}, limits={"ingest": 3, "dedup_detected": 1})
+
+    passed = [sampler.filter(record(f"msg{i}", "ingest")) for i in range(6)]
+    assert passed == [True, True, True, False, False, False]
+
+    # A message rule has its own budget
+    assert sampler.filter(record("dedup_detected", "ingest"))
+    assert not sampler.filter(record("dedup_detected", "ingest"))
+    assert sampler.filter(record("msg0", "ingest", logging.WARNING))
+
+
+class Unprintable:
+    def __str__(self):
+        raise RuntimeError("boom")
+
+
+def test_writer_survives_a_record_that_fails_to_format():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    writer = BackgroundWriter(log_queue, stream=stream, formatter=JsonFormatter())
+    writer.start()
+
+    bad = record("%s")
+    bad.args = (Unprintable(),)
+    log_queue.put(record("before"))
+    log_queue.put(bad)
+    log_queue.put(record("after"))
+    writer.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert [line.split('"message":"')[1].split('"')[0] for line in lines] == ["before", "after"]
+    assert writer.failed == 1
+
+
+def test_handler_does_not_raise_into_the_caller(monkeypatch):
+    log_queue = queue.SimpleQueue()
+    handler = QueueHandler(log_queue)
+    handled = []
+    monkeypatch.setattr(handler, "handleError", handled.append)
+
+    bad = record("%d items")
+    bad.args = ("many",)
+    handler.emit(bad)
+    handler.emit(record("fine"))
+
+    assert handled == [bad]
+    assert log_queue.get_nowait().msg == "fine"
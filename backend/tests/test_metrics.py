@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import metrics
+
+
+def test_failed_statements_leave_no_timing_state(db):
+    from database import engine
+
+    usage, token = metrics.track_request_db()
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+            conn.execute(text("SELECT 1"))
+
+            assert not conn.info.get("query_started")
+    finally:
+        metrics.reset_request_db(token)
+
+    # Failed statements aren't counted; the one that ran timed itself
+    assert usage[0] == 1
+    assert 0 <= usage[1] < 1
+
+
+def test_render_text_format():
+    counter = metrics.Counter("events_total", "Events.", ("status",))
+    counter.labels("SCORED").inc()
+    counter.labels("SCORED").inc(2)
+    counter.labels('say "hi"').inc()
+
+    histogram = metrics.Histogram("work_seconds", "Work.", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert counter.render() == [
+        "# HELP events_total Events.",
+        "# TYPE events_total counter",
+        'events_total{status="SCORED"} 3',
+        'events_total{status="say \\"hi\\""} 1',
+    ]
+    assert histogram.render() == [
+        "# HELP work_seconds Work.",
+        "# TYPE work_seconds histogram",
+        'work_seconds_bucket{le="0.1"} 2',
+        'work_seconds_bucket{le="1"} 3',
+        'work_seconds_bucket{le="+Inf"} 4',
+        "work_seconds_sum 3.65",
+        "work_seconds_count 4",
+    ]
+
+
+def test_endpoint_reports_requests_and_pools(db):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    client.get("/api/tests")
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/tests",status="200"}' in body
+    assert "# TYPE db_pool_checked_out gauge" in body
+    assert 'db_queries_total{engine="primary"}' in body
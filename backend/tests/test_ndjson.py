@@ -0,0 +1,61 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ingest
+from test_ingest import event
+
+
+def lines(body, piece, compressed=False):
+    async def pieces():
+        for i in range(0, len(body), piece):
+            yield body[i:i + piece]
+
+    async def collect():
+        return [line async for line in ingest.ndjson_lines(pieces(), compressed)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("piece", [1, 7, 1000])
+def test_lines_survive_any_split_and_gzip(piece):
+    body = b'{"a": 1}\n{"b": 2}\n\n{"c": 3}'
+
+    assert lines(body, piece) == [b'{"a": 1}', b'{"b": 2}', b"", b'{"c": 3}']
+    assert lines(gzip.compress(body), piece, compressed=True) == lines(body, piece)
+
+
+def test_overlong_line_is_refused(monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_LINE_BYTES", 16)
+    with pytest.raises(ValueError):
+        lines(b"x" * 40, 8)
+
+
+def test_stream_endpoint_commits_in_chunks(db):
+    import main
+
+    records = [event(i).model_dump_json() for i in range(4)]
+    records.insert(2, '{"source_event_id": "broken"}')
+    body = gzip.compress("\n".join(records).encode() + b"\n")
+
+    response = TestClient(main.app).post(
+        "/api/ingest/attempts/stream?chunk_size=2",
+        content=body,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"},
+    )
+    out = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [o.get("first_line") for o in out[:-1]] == [1, 3, 5]
+    assert [[r["status"] for r in o["results"]] for o in out[:-1]] == [
+        ["SCORED", "SCORED"],
+        ["REJECTED", "SCORED"],
+        ["SCORED"],
+    ]
+    assert out[1]["results"][0]["line"] == 3
+    assert out[-1] == {
+        "done": True,
+        "summary": {"ingested": 4, "scored": 4, "deduped": 0, "rejected": 1},
+    }
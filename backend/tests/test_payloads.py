@@ -0,0 +1,123 @@
+import importlib.util
+import json
+import uuid
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+import attempt_queries
+from catalog import catalog
+import ingest
+import models
+import payloads
+from test_ingest import event
+
+
+def _migration(name):
+    path = Path(__file__).resolve().parent.parent / "alembic" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _ingested(db, e):
+    ingest.ingest_chunk(db, [e])
+    attempt = db.query(models.Attempt).filter_by(source_event_id=e.source_event_id).one()
+    return attempt.id, attempt.test_id
+
+
+def _raw(db, attempt_id):
+    return attempt_queries.detail(db, attempt_id, frozenset({"raw_payload"}))
+
+
+def test_restore_uses_the_definition_the_attempt_was_ingested_against(db):
+    e = event(0)
+    attempt_id, test_id = _ingested(db, e)
+
+    catalog.update_answer_key(db, test_id, answer_key={"q1": "C", "q2": "D"},
+                              negative_marking={"wrong": -2})
+    later = event(1)
+    later.test.answer_key = {"q1": "C", "q2": "D"}
+    later.test.negative_marking = {"correct": 4, "wrong": -2, "skip": 0}
+    later_id, _ = _ingested(db, later)
+
+    result = _raw(db, attempt_id)
+    assert result["raw_payload"]["test"] == e.test.model_dump()
+    assert result["raw_payload"]["answers"] == e.answers
+    assert result["payload_test_version"] == 1
+    assert result["test"]["version"] == 2
+    assert not result["raw_payload_lossy"]
+
+    assert _raw(db, later_id)["raw_payload"]["test"] == later.test.model_dump()
+
+
+def test_unknown_replaced_definition_is_marked_lossy(db):
+    e = event(0)
+    attempt_id, test_id = _ingested(db, e)
+    catalog.update_answer_key(db, test_id, answer_key={"q1": "C", "q2": "D"})
+    # As if the key had changed before test_definitions existed
+    db.query(models.TestDefinition).delete()
+    db.commit()
+
+    result = _raw(db, attempt_id)
+    assert result["raw_payload"]["test"] is None
+    assert result["raw_payload"]["source_event_id"] == e.source_event_id
+    assert result["raw_payload_lossy"]
+
+
+def _definition(entry):
+    return {
+        "name": entry.name,
+        "max_marks": entry.max_marks,
+        "negative_marking": entry.plan.config,
+        "answer_key": dict(entry.plan.items),
+    }
+
+
+def test_compact_round_trip(db):
+    e = event(0)
+    _, test_id = _ingested(db, e)
+    entry = catalog.get_by_id(db, test_id)
+
+    row = payloads.compact(uuid.uuid4(), e, entry)
+    assert row["test_version"] == entry.version
+    assert "test" not in json.loads(zlib.decompress(row["data"]))
+
+    restored = payloads.restore(SimpleNamespace(**row), e.answers, _definition(entry))
+    original = e.model_dump()
+    assert restored.keys() == original.keys()
+    for key in ("source_event_id", "student", "test", "answers"):
+        assert restored[key] == original[key]
+    assert restored["started_at"] == str(e.started_at)
+
+
+def test_compact_keeps_a_definition_the_test_does_not_match(db):
+    _, test_id = _ingested(db, event(0))
+    entry = catalog.get_by_id(db, test_id)
+    e = event(1)
+    e.test.answer_key = {"q1": "D", "q2": "D"}
+
+    row = payloads.compact(uuid.uuid4(), e, entry)
+
+    restored = payloads.restore(SimpleNamespace(**row), e.answers, _definition(entry))
+    assert restored["test"] == e.test.model_dump()
+
+
+def test_migration_compacts_stored_payloads():
+    migration = _migration("77f16df42555_attempt_payloads")
+    e = event(0)
+    raw = json.loads(e.model_dump_json())
+    test = SimpleNamespace(**{k: raw["test"][k] for k in ("max_marks", "negative_marking", "answer_key")})
+
+    matching = migration._compact(SimpleNamespace(id=1, raw_payload=raw, version=3, **vars(test)))
+    assert matching["test_version"] == 3
+    assert matching["encoding"] == payloads.ENCODING
+    restored = payloads.restore(SimpleNamespace(**matching), raw["answers"], raw["test"])
+    assert restored == raw
+
+    changed = dict(vars(test), answer_key={"q1": "D"})
+    kept = migration._compact(SimpleNamespace(id=2, raw_payload=raw, version=3, **changed))
+    # The event's own definition survives; its version is unknown
+    assert kept["test_version"] is None
+    assert payloads.restore(SimpleNamespace(**kept), raw["answers"], None) == raw
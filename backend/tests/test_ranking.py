@@ -0,0 +1,39 @@
+import uuid
+
+import leaderboard
+import ranking
+from test_leaderboard import TEST_ID, add_attempt, row
+
+
+def test_sync_applies_removals_in_place(db):
+    cache = ranking.RankIndexCache()
+    students = [uuid.uuid4() for _ in range(4)]
+    attempts = [add_attempt(db, sid, 10 * (i + 1)) for i, sid in enumerate(students)]
+    leaderboard.apply_scores(db, [row(a, 10 * (i + 1)) for i, a in enumerate(attempts)])
+    db.commit()
+
+    index = cache.get(db, TEST_ID, 1)
+    assert len(index) == 4
+
+    # Top scorer flagged, lowest merged away
+    attempts[3].status = "FLAGGED"
+    db.flush()
+    leaderboard.refresh(db, [(TEST_ID, students[3])])
+    leaderboard.forget_student(db, students[0])
+    db.commit()
+
+    assert cache.get(db, TEST_ID, 2) is index
+    assert len(index) == 2
+    assert index.rank(students[3]) is None
+    assert index.rank(students[2])[0] == 1
+
+    # Removed and ranked again within one sync: ranked. The rebuild also
+    # brings back students[0], whose attempt was left SCORED
+    leaderboard.rebuild(db, TEST_ID)
+    attempts[3].status = "SCORED"
+    db.flush()
+    leaderboard.refresh(db, [(TEST_ID, students[3])])
+    db.commit()
+
+    assert cache.get(db, TEST_ID, 3) is index
+    assert [index.rank(sid)[0] for sid in students] == [4, 3, 2, 1]
@@ -0,0 +1,114 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+import leaderboard
+import models
+import recompute
+from models import Attempt, AttemptScore, LeaderboardEntry, RecomputeRun
+from scoring import ScoringPlan, score_batch
+
+
+def test_write_chunk_keeps_flagged_attempts_flagged(db):
+    test = models.Test(
+        name="T1",
+        max_marks=8,
+        negative_marking={"correct": 4, "wrong": -1, "skip": 0},
+        answer_key={"q1": "A", "q2": "B"},
+    )
+    db.add(test)
+    db.flush()
+
+    student_id = uuid.uuid4()
+    attempts = {}
+    for status, answers in [
+        ("SCORED", {"q1": "A", "q2": "C"}),
+        ("FLAGGED", {"q1": "A", "q2": "B"}),
+        ("INGESTED", {"q1": "SKIP"}),
+    ]:
+        attempt = attempts[status] = Attempt(
+            id=uuid.uuid4(),
+            student_id=student_id,
+            test_id=test.id,
+            source_event_id=status,
+            started_at=datetime(2026, 1, 1, 10),
+            submitted_at=datetime(2026, 1, 1, 11),
+            answers=answers,
+            status=status,
+        )
+        db.add(attempt)
+
+    run = RecomputeRun(id=uuid.uuid4(), test_id=test.id, test_version=1, total=3, processed=0)
+    db.add(run)
+    db.commit()
+
+    ids = sorted(a.id for a in attempts.values())
+    by_id = {a.id: a.answers for a in attempts.values()}
+    plan = ScoringPlan(test.answer_key, test.negative_marking)
+    recompute._write_chunk(db, run.id, test.id, 1, ids, score_batch(plan, [by_id[i] for i in ids]))
+    leaderboard.rebuild(db, test.id)
+
+    db.expire_all()
+    assert {a.source_event_id: a.status for a in db.query(Attempt)} == {
+        "SCORED": "SCORED",
+        "FLAGGED": "FLAGGED",
+        "INGESTED": "SCORED",
+    }
+    assert db.query(AttemptScore).count() == 3
+    assert db.get(AttemptScore, attempts["FLAGGED"].id).score == 8
+    assert db.get(RecomputeRun, run.id).processed == 3
+
+    # The flagged attempt has the best score but stays off the leaderboard
+    entry = db.query(LeaderboardEntry).one()
+    assert entry.attempt_id == attempts["SCORED"].id
+
+
+def test_superseded_run_does_not_overwrite_the_new_scores(db):
+    test = models.Test(
+        name="T1",
+        max_marks=4,
+        negative_marking={"correct": 4, "wrong": -1, "skip": 0},
+        answer_key={"q1": "A"},
+    )
+    db.add(test)
+    db.flush()
+    attempt = Attempt(
+        id=uuid.uuid4(), student_id=uuid.uuid4(), test_id=test.id,
+        source_event_id="e1", started_at=datetime(2026, 1, 1, 10),
+        answers={"q1": "A"}, status="SCORED",
+    )
+    db.add(attempt)
+    db.commit()
+
+    run_a, _ = recompute.start(db, test.id)
+    old_scores = score_batch(ScoringPlan(test.answer_key, test.negative_marking), [attempt.answers])
+
+    test.answer_key = {"q1": "B"}
+    test.version = 2
+    db.commit()
+
+    # Key changed, no new run yet: A is already fenced off
+    with pytest.raises(recompute.RunSuperseded):
+        recompute._write_chunk(db, run_a.id, test.id, 1, [attempt.id], old_scores)
+
+    run_b, _ = recompute.start(db, test.id)
+    assert recompute.execute(run_b.id, processes=1)["status"] == "COMPLETED"
+
+    # A's chunk, scored against the old key, arriving after B finished
+    with pytest.raises(recompute.RunSuperseded):
+        recompute._write_chunk(db, run_a.id, test.id, 1, [attempt.id], old_scores)
+
+    db.expire_all()
+    assert db.get(AttemptScore, attempt.id).score == -1
+    assert db.get(RecomputeRun, run_a.id).status == "SUPERSEDED"
+    assert db.get(RecomputeRun, run_b.id).status == "COMPLETED"
+    assert recompute.execute(run_a.id, processes=1)["status"] == "SUPERSEDED"
+
+    # Superseded after its version check passed: stops at the first write
+    run_c = RecomputeRun(test_id=test.id, test_version=2, status="SUPERSEDED", total=1, processed=0)
+    db.add(run_c)
+    db.commit()
+    assert recompute.execute(run_c.id, processes=1)["status"] == "SUPERSEDED"
+    db.expire_all()
+    assert db.get(RecomputeRun, run_c.id).processed == 0
@@ -0,0 +1,91 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from scoring import (
+    ScoringPlan, batch_parity_mismatches, compute_score, score_batch, score_plan,
+)
+
+
+OPTIONS = ["A", "B", "C", "D"]
+
+
+def random_test(rng):
+    questions = [f"q{i}" for i in range(rng.randint(0, 30))]
+    return SimpleNamespace(
+        answer_key={q: rng.choice(OPTIONS) for q in questions},
+        negative_marking={
+            "correct": rng.randint(1, 5),
+            "wrong": rng.randint(-3, 0),
+            "skip": rng.randint(-1, 1),
+        },
+    )
+
+
+def random_answers(rng, answer_key):
+    answers = {}
+    for question in answer_key:
+        kind = rng.random()
+        if kind < 0.1:
+            continue                                    # missing question
+        if kind < 0.2:
+            answers[question] = "SKIP"
+        elif kind < 0.3:
+            answers[question] = None
+        elif kind < 0.4:
+            answers[question] = rng.choice(["E", "", "a", "SKIP ", "AB"])
+        else:
+            answers[question] = rng.choice(OPTIONS)
+
+    for i in range(rng.randint(0, 3)):                  # not in the key
+        answers[f"extra{i}"] = rng.choice(OPTIONS + ["SKIP"])
+    return answers
+
+
+def exact(result):
+    """Result with the type of every number, so 4 and 4.0 differ."""
+    return {
+        key: (type(value), value) if not isinstance(value, dict) else value
+        for key, value in result.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_score_batch_matches_scalar_scorers(seed):
+    rng = random.Random(seed)
+    test = random_test(rng)
+    plan = ScoringPlan(test.answer_key, test.negative_marking)
+    answer_maps = [random_answers(rng, test.answer_key) for _ in range(rng.randint(1, 60))]
+
+    assert batch_parity_mismatches(plan, answer_maps) == []
+
+    batch = score_batch(plan, answer_maps)
+    assert len(batch) == len(answer_maps)
+    for answers, result in zip(answer_maps, batch):
+        assert exact(result) == exact(score_plan(plan, answers))
+        assert exact(result) == exact(compute_score(test, answers))
+
+
+def test_edge_answer_maps():
+    test = SimpleNamespace(
+        answer_key={"q1": "A", "q2": "B", "q3": "C"},
+        negative_marking={"correct": 4, "wrong": -1, "skip": 0},
+    )
+    plan = ScoringPlan(test.answer_key, test.negative_marking)
+    answer_maps = [
+        {},
+        {"q1": "A", "q2": "B", "q3": "C"},
+        {"q1": "SKIP", "q2": None, "q3": "Z"},
+        {"q4": "A", "Q1": "A"},
+        {"q1": "B", "q2": "B", "q3": "skip"},
+    ]
+
+    assert batch_parity_mismatches(plan, answer_maps) == []
+    assert [r["score"] for r in score_batch(plan, answer_maps)] == [0, 12, -1, 0, 2]
+    assert score_batch(plan, []) == []
+
+
+def test_empty_answer_key():
+    plan = ScoringPlan({}, {"correct": 4, "wrong": -1, "skip": 0})
+    assert batch_parity_mismatches(plan, [{"q1": "A"}, {}]) == []
@@ -0,0 +1,38 @@
+import uuid
+
+import pytest
+
+from models import Student
+from search import student_search
+
+
+@pytest.fixture
+def students(db):
+    for name, email, phone in [
+        ("Asha", "asha@gmail.com", "919876543210"),
+        ("Ravi", None, "9876543210"),
+        ("Ravindra", "r.k@x.com", "14155550100"),
+        ("Roll 2024000001", "1234567890@school.org", None),
+    ]:
+        db.add(Student(id=uuid.uuid4(), full_name=name, email=email, phone=phone))
+    db.commit()
+
+
+def names(db, term):
+    return sorted(n for (n,) in db.query(Student.full_name).filter(student_search(term)))
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("+91 98765-43210", ["Asha"]),              # country code: exact
+    ("+1 (415) 555-0100", ["Ravindra"]),
+    ("+98765 43210", ["Ravi"]),
+    ("98765 43210", ["Asha", "Ravi"]),          # bare number: substring
+    ("1234567890", ["Roll 2024000001"]),        # ... or part of an email
+    ("2024000001", ["Roll 2024000001"]),        # ... or a name
+    ("A.SHA+news@gmail.com", ["Asha"]),         # normalized like ingest
+    ("ravi", ["Ravi", "Ravindra"]),
+    ("5550", ["Ravindra"]),                     # short digits: plain substring
+    ("100%", []),
+])
+def test_student_search(db, students, term, expected):
+    assert names(db, term) == expected
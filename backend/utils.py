@@ -1,4 +1,6 @@
 import re
+import uuid
+from datetime import datetime
 
 def normalize_email(email):
     if not email:
@@ -17,3 +19,15 @@ def normalize_phone(phone):
     if not phone:
         return None
     return re.sub(r"\D", "", phone)
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", ""))
+
+
+def as_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
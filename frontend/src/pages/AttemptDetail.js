@@ -4,12 +4,24 @@ import API from "../api";
 function AttemptDetail({ attemptId, goBack }) {
   const [data, setData] = useState(null);
   const [showPayload, setShowPayload] = useState(false);
+  const [payload, setPayload] = useState(null);
 
   const fetchDetail = async () => {
     const res = await API.get(`/api/attempts/${attemptId}`);
     setData(res.data);
   };
 
+  // raw_payload is only sent when asked for
+  const togglePayload = async () => {
+    if (!showPayload && payload === null) {
+      const res = await API.get(`/api/attempts/${attemptId}`, {
+        params: { fields: "raw_payload" }
+      });
+      setPayload(res.data.raw_payload);
+    }
+    setShowPayload(!showPayload);
+  };
+
   const recompute = async () => {
     await API.post(`/api/attempts/${attemptId}/recompute`);
     fetchDetail();
@@ -81,14 +93,14 @@ function AttemptDetail({ attemptId, goBack }) {
       {/* Raw Payload Collapsible */}
       <h3>
         Raw Payload
-        <button onClick={() => setShowPayload(!showPayload)}>
+        <button onClick={togglePayload}>
           {showPayload ? "Hide" : "Show"}
         </button>
       </h3>
 
       {showPayload && (
         <pre style={{ background: "#f4f4f4", padding: "10px" }}>
-          {JSON.stringify(data.raw_payload, null, 2)}
+          {JSON.stringify(payload, null, 2)}
         </pre>
       )}
 
@@ -18,10 +18,15 @@ function Attempts() {
   const pageSize = 10;
   const [totalPages, setTotalPages] = useState(1);
 
+  // cursors[i] is the keyset cursor that loads page i + 1
+  const [cursors, setCursors] = useState([undefined]);
+
   const fetchAttempts = async () => {
     const params = {
       page: page,
       page_size: pageSize,
+      cursor: cursors[page - 1],
+      count: "cached",
       search: filters.search || undefined,
       test_id: filters.test_id || undefined,
       status: filters.status || undefined,
@@ -34,7 +39,17 @@ function Attempts() {
     const res = await API.get("/api/attempts", { params });
 
     setData(res.data.data);
-    setTotalPages(Math.ceil(res.data.total / pageSize));
+    setTotalPages(Math.max(1, Math.ceil(res.data.total / pageSize)));
+
+    const next = [...cursors.slice(0, page)];
+    next[page] = res.data.next_cursor || undefined;
+    setCursors(next);
+  };
+
+  const updateFilters = (changes) => {
+    setFilters({ ...filters, ...changes });
+    setCursors([undefined]);
+    setPage(1);
   };
 
   const fetchTests = async () => {
@@ -69,14 +84,14 @@ function Attempts() {
           placeholder="Search student..."
           value={filters.search}
           onChange={(e) =>
-            setFilters({ ...filters, search: e.target.value })
+            updateFilters({ search: e.target.value })
           }
         />
 
         <select
           value={filters.test_id}
           onChange={(e) =>
-            setFilters({ ...filters, test_id: e.target.value })
+            updateFilters({ test_id: e.target.value })
           }
         >
           <option value="">All Tests</option>
@@ -90,7 +105,7 @@ function Attempts() {
         <select
           value={filters.status}
           onChange={(e) =>
-            setFilters({ ...filters, status: e.target.value })
+            updateFilters({ status: e.target.value })
           }
         >
           <option value="">All Status</option>
@@ -103,7 +118,7 @@ function Attempts() {
         <select
           value={filters.has_duplicates}
           onChange={(e) =>
-            setFilters({ ...filters, has_duplicates: e.target.value })
+            updateFilters({ has_duplicates: e.target.value })
           }
         >
           <option value="">All</option>
@@ -149,7 +164,7 @@ function Attempts() {
         <span> Page {page} of {totalPages} </span>
 
         <button
-          disabled={page === totalPages}
+          disabled={!cursors[page]}
           onClick={() => setPage(page + 1)}
         >
           Next